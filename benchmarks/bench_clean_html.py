@@ -0,0 +1,88 @@
+# benchmarks/bench_clean_html.py
+"""
+step1 title/description 정리 함수 비교
+
+- 정확성: 테스트 코퍼스 전체에서 clean_html_tags(빠른 경로) == BeautifulSoup 결과인지 확인
+- 속도  : 기존 BeautifulSoup 방식 vs clean_html_batch
+
+사용 예:
+    python benchmarks/bench_clean_html.py --n 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import step1_naver_articles as step1  # noqa: E402
+from fake_naver import make_items  # noqa: E402
+
+# 실제 네이버 응답에서 볼 수 있는 형태 + 경계 케이스
+EDGE_CASES = [
+    "",
+    "<b>삼성전자</b>, 3분기 영업이익 &quot;9.1조&quot;",
+    "<B>SK하이닉스</B> HBM &amp; D램 &lt;호조&gt;",
+    "&lt;b&gt;태그처럼 보이는 텍스트&lt;/b&gt;",
+    "코스피 2,500 &gt; 2,400 … &#39;반등&#39; &#x27;기대&#x27;",
+    "<b></b>빈 태그 <b>연속</b><b>태그</b>",
+    "엔티티 아님 & 그냥 앰퍼샌드 &nbsp;공백 &copy; &unknown;",
+    "부등호 a < b 와 <br> 다른 태그 (느린 경로로 가야 함)",
+    "줄바꿈\n과 탭\t포함 <b>제목</b>",
+    "<b>R&D</b> 투자 확대, AT&T; 협력",
+    "&copy 세미콜론 없는 엔티티 &amp",
+    "&#0; &#99999999; 잘못된 숫자 참조",
+    "&amp;amp; 이중 이스케이프",
+]
+
+
+def build_corpus(n: int):
+    corpus = list(EDGE_CASES)
+    queries = ["삼성전자", "SK하이닉스", "LG에너지솔루션", "현대차", "카카오"]
+    i = 0
+    while len(corpus) < n:
+        for item in make_items(queries[i % len(queries)], 1, 100, 100):
+            corpus.append(item["title"])
+            corpus.append(item["description"])
+        i += 1
+    return corpus[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=20000, help="코퍼스 문자열 개수")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.n)
+
+    # 1) 정확성
+    mismatches = [
+        (t, step1._clean_html_tags_bs(t), step1.clean_html_tags(t))
+        for t in corpus
+        if t and step1._clean_html_tags_bs(t) != step1.clean_html_tags(t)
+    ]
+    for text, expected, got in mismatches[:10]:
+        print(f"❌ 불일치: {text!r}\n   bs4 ={expected!r}\n   fast={got!r}")
+    print(f"정확성: {len(corpus) - len(mismatches)}/{len(corpus)} 일치")
+
+    # 2) 속도
+    start = time.perf_counter()
+    legacy = [step1._clean_html_tags_bs(t) if t else "" for t in corpus]
+    legacy_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fast = step1.clean_html_batch(corpus)
+    fast_elapsed = time.perf_counter() - start
+
+    assert legacy == fast
+    print(f"BeautifulSoup    {legacy_elapsed * 1000:9.1f} ms  ({legacy_elapsed / len(corpus) * 1e6:.1f} µs/건)")
+    print(f"clean_html_batch {fast_elapsed * 1000:9.1f} ms  ({fast_elapsed / len(corpus) * 1e6:.1f} µs/건)")
+    print(f"speedup x{legacy_elapsed / fast_elapsed:.1f}")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/bench_extractors.py
+"""
+도메인별 추출기(extractors.py) vs newspaper3k 속도 / 정확도 비교
+
+코퍼스 (셋 중 하나):
+  --corpus DIR      : DIR/*.html + 같은 이름의 .url (기사 URL), .txt (정답 본문, 선택)
+  --from-cache DIR  : step2 HTML 캐시(.http_cache)에 저장된 실제 페이지 (정답 = 캐시에 저장된 추출 본문)
+  (기본)            : benchmarks/fake_articles.py 로 만든 가짜 코퍼스
+
+정확도는 정답 본문과의 어절(공백 단위) F1. 정답이 없으면 newspaper3k 결과를 정답으로 씀.
+
+사용 예:
+    python benchmarks/bench_extractors.py --n 300
+    python benchmarks/bench_extractors.py --from-cache .http_cache
+"""
+
+import argparse
+import glob
+import gzip
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from newspaper import Article, Config  # noqa: E402
+
+import extractors  # noqa: E402
+from fake_articles import make_corpus  # noqa: E402
+from http_cache import CacheEntry, HttpCache  # noqa: E402
+
+
+def load_dir_corpus(path):
+    corpus = []
+    for html_path in sorted(glob.glob(os.path.join(path, "*.html"))):
+        base = html_path[: -len(".html")]
+        with open(html_path, "r", encoding="utf-8") as f:
+            html = f.read()
+        with open(base + ".url", "r", encoding="utf-8") as f:
+            url = f.read().strip()
+        gold = None
+        if os.path.exists(base + ".txt"):
+            with open(base + ".txt", "r", encoding="utf-8") as f:
+                gold = f.read()
+        corpus.append((url, html, gold))
+    return corpus
+
+
+def load_cache_corpus(path):
+    cache = HttpCache(cache_dir=path)
+    rows = sqlite3.connect(os.path.join(path, "index.sqlite3")).execute(
+        "SELECT url, object_hash, text, etag, last_modified, fetched_at FROM entries"
+    ).fetchall()
+    corpus = []
+    for row in rows:
+        entry = CacheEntry(*row)
+        try:
+            with gzip.open(cache._object_path(entry.object_hash), "rt", encoding="utf-8") as f:
+                html = f.read()
+        except OSError:  # 파일이 사라진 항목
+            continue
+        if html:
+            corpus.append((entry.url, html, entry.text or None))
+    return corpus
+
+
+def newspaper_extract(url, html, config):
+    article = Article(url, language="ko", config=config)
+    article.download(input_html=html)
+    article.parse()
+    return (article.text or "").strip()
+
+
+def token_f1(pred: str, gold: str) -> float:
+    p, g = Counter(pred.split()), Counter(gold.split())
+    if not p and not g:
+        return 1.0
+    overlap = sum((p & g).values())
+    if overlap == 0:
+        return 0.0
+    precision = overlap / sum(p.values())
+    recall = overlap / sum(g.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus")
+    parser.add_argument("--from-cache")
+    parser.add_argument("--n", type=int, default=200, help="가짜 코퍼스 크기")
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = load_dir_corpus(args.corpus)
+    elif args.from_cache:
+        corpus = load_cache_corpus(args.from_cache)
+    else:
+        corpus = make_corpus(args.n)
+    print(f"코퍼스: {len(corpus)}건")
+
+    config = Config()
+    config.fetch_images = False
+
+    per_domain = defaultdict(lambda: {"n": 0, "fast_n": 0, "np_sec": 0.0, "fast_sec": 0.0,
+                                      "np_f1": 0.0, "fast_f1": 0.0})
+    for url, html, gold in corpus:
+        host = urlsplit(url).hostname or ""
+        domain = host if extractors.find_extractor(url) else "(newspaper3k 전용)"
+        st = per_domain[domain]
+
+        start = time.perf_counter()
+        np_text = newspaper_extract(url, html, config)
+        st["np_sec"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        fast_text = extractors.extract_registered(url, html)
+        st["fast_sec"] += time.perf_counter() - start
+
+        reference = gold if gold is not None else np_text
+        st["n"] += 1
+        st["np_f1"] += token_f1(np_text, reference)
+        if fast_text is not None:
+            st["fast_n"] += 1
+            st["fast_f1"] += token_f1(fast_text, reference)
+
+    print(f"\n{'도메인':<28}{'건수':>6}{'전용처리':>8}{'newspaper ms/건':>17}{'전용 ms/건':>12}"
+          f"{'speedup':>9}{'F1(np)':>8}{'F1(전용)':>10}")
+    for domain, st in sorted(per_domain.items()):
+        np_ms = st["np_sec"] / st["n"] * 1000
+        fast_ms = st["fast_sec"] / st["n"] * 1000
+        fast_f1 = f"{st['fast_f1'] / st['fast_n']:.3f}" if st["fast_n"] else "-"
+        speedup = f"x{np_ms / fast_ms:.1f}" if st["fast_n"] else "-"
+        print(f"{domain:<28}{st['n']:>6}{st['fast_n']:>8}{np_ms:>17.2f}{fast_ms:>12.2f}"
+              f"{speedup:>9}{st['np_f1'] / st['n']:>8.3f}{fast_f1:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# benchmarks/bench_near_dup.py
+"""
+중복 기사 그룹핑 벤치마크 (near_dup.py MinHash/LSH)
+
+1) 합성 코퍼스 (기본)
+   - 사건(story) 하나를 여러 언론사가 조금씩 다르게 쓴 기사 묶음 + 단독 기사들을 만들어서
+     정답 묶음과 비교 (쌍 단위 precision / recall)
+   - 기사 수를 늘려가며 시간 측정 (거의 선형인지), 작은 n 에서는 모든 쌍을 직접 비교하는 방식(O(n²))과 비교
+
+2) 저장된 실행과 LLM 그룹핑 비교 (--compare)
+   - step3 / step4 결과 파일(json / jsonl / jsonl.gz, groups 포함)을 읽어서 LLM 이 만든 groups 와
+     같은 기사들에 MinHash 그룹핑을 돌린 결과를 비교 (LLM 을 기준으로 쌍 단위 일치율 + 어긋난 예)
+
+사용 예:
+    python benchmarks/bench_near_dup.py --sizes 1000,5000,20000
+    python benchmarks/bench_near_dup.py --compare step3_articles_with_summary_and_groups.jsonl
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import near_dup  # noqa: E402
+from jsonl_io import read_articles, read_groups  # noqa: E402
+from spill_store import article_content  # noqa: E402
+
+COMPANIES = ["삼성전자", "SK하이닉스", "LG에너지솔루션", "현대차", "기아", "네이버", "카카오", "셀트리온",
+             "포스코홀딩스", "한화에어로스페이스", "두산에너빌리티", "HD현대중공업", "삼성바이오로직스", "KB금융"]
+EVENTS = ["영업이익", "매출", "순이익", "수주 잔고", "설비 투자", "배당금", "연구개발비", "해외 판매량"]
+MOVES = ["증가했다", "감소했다", "사상 최대를 기록했다", "시장 예상치를 웃돌았다", "시장 예상치를 밑돌았다"]
+SOURCES = ["회사 측은", "증권가에서는", "업계 관계자는", "애널리스트들은", "시장에서는"]
+VIEWS = ["하반기 업황 개선을 기대했다", "환율 변동성을 우려했다", "신규 수주 확대를 전망했다",
+         "원가 부담이 이어질 것으로 봤다", "주주환원 확대 가능성을 언급했다"]
+FILLERS = ["이날 발표는 장 마감 후 공시를 통해 이뤄졌다.", "자세한 내용은 다음 달 설명회에서 공개된다.",
+           "관련 업종 주가도 함께 움직였다.", "투자자들의 관심이 집중되고 있다."]
+
+
+def make_story(rng: random.Random):
+    """사건 하나: 기업 + 수치가 들어간 문장 6~9개"""
+    company = rng.choice(COMPANIES)
+    sentences = []
+    for _ in range(rng.randint(6, 9)):
+        sentences.append(
+            f"{company}의 {rng.randint(1, 4)}분기 {rng.choice(EVENTS)}은 {rng.randint(100, 99999):,}억원으로 "
+            f"전년 대비 {rng.randint(1, 90)}.{rng.randint(0, 9)}% {rng.choice(MOVES)}"
+        )
+        sentences.append(f"{rng.choice(SOURCES)} {rng.choice(VIEWS)}.")
+    title = f"{company}, {rng.choice(EVENTS)} {rng.randint(1, 99)}% {rng.choice(MOVES)[:-2]}"
+    return title, sentences
+
+
+def rewrite(title, sentences, rng: random.Random):
+    """같은 사건을 다른 언론사가 쓴 것처럼: 문장 일부 빼기 / 순서 조금 바꾸기 / 머리말 / 상투 문장 추가"""
+    kept = [s for s in sentences if rng.random() > 0.15] or sentences[:1]
+    if len(kept) > 3 and rng.random() < 0.5:
+        i = rng.randrange(len(kept) - 1)
+        kept[i], kept[i + 1] = kept[i + 1], kept[i]
+    prefix = rng.choice(["", "[속보] ", "[단독] ", "(종합) "])
+    body = " ".join(kept) + " " + " ".join(rng.sample(FILLERS, 2))
+    return prefix + title, f"({rng.choice(['서울', '세종', '부산'])}=뉴스) 기자 = " + body
+
+
+def make_corpus(n: int, dup_ratio: float = 0.5, max_copies: int = 5, seed: int = 0):
+    """return: (articles [{id, title, url, content}], 정답 묶음 번호 리스트)"""
+    rng = random.Random(seed)
+    articles, labels = [], []
+    story_id = 0
+    while len(articles) < n:
+        title, sentences = make_story(rng)
+        copies = rng.randint(2, max_copies) if rng.random() < dup_ratio else 1
+        for _ in range(min(copies, n - len(articles))):
+            t, body = rewrite(title, sentences, rng)
+            articles.append({"id": len(articles) + 1, "title": t, "url": f"https://news.example.com/{len(articles)}",
+                             "content": body})
+            labels.append(story_id)
+        story_id += 1
+    order = list(range(n))
+    rng.shuffle(order)
+    return [dict(articles[i], id=k + 1) for k, i in enumerate(order)], [labels[i] for i in order]
+
+
+def group_pairs(groups):
+    """groups → 같은 그룹에 든 기사 id 쌍 집합"""
+    pairs = set()
+    for g in groups:
+        ids = sorted(str(i) for i in g.get("article_ids", []))
+        pairs.update(itertools.combinations(ids, 2))
+    return pairs
+
+
+def label_pairs(articles, labels):
+    by_label = {}
+    for a, label in zip(articles, labels):
+        by_label.setdefault(label, []).append(str(a["id"]))
+    pairs = set()
+    for ids in by_label.values():
+        pairs.update(itertools.combinations(sorted(ids), 2))
+    return pairs
+
+
+def precision_recall(predicted: set, reference: set):
+    tp = len(predicted & reference)
+    precision = tp / len(predicted) if predicted else 1.0
+    recall = tp / len(reference) if reference else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def exact_jaccard_groups(articles, threshold: float):
+    """비교용: 모든 쌍의 shingle 자카드를 직접 계산 (O(n²))"""
+    k = near_dup.SHINGLE_SIZE
+    sets = []
+    for a in articles:
+        t = near_dup.normalize_text(near_dup.article_text(a))
+        sets.append({t[i:i + k] for i in range(len(t) - k + 1)})
+    pairs = set()
+    for i, j in itertools.combinations(range(len(articles)), 2):
+        inter = len(sets[i] & sets[j])
+        if inter and inter / len(sets[i] | sets[j]) >= threshold:
+            pairs.add(tuple(sorted((str(articles[i]["id"]), str(articles[j]["id"])))))
+    return pairs
+
+
+def run_synthetic(sizes, exact_limit: int):
+    print(f"MinHash: 서명 {near_dup.NUM_PERM}칸, 띠 {near_dup.BANDS}개 × {near_dup.ROWS}칸, "
+          f"{near_dup.SHINGLE_SIZE}-gram, 임계값 {near_dup.SIMILARITY_THRESHOLD}")
+    print(f"\n{'기사 수':>8} {'그룹핑(초)':>10} {'건/초':>9} {'precision':>10} {'recall':>8} {'F1':>6}   {'전체 쌍 비교(초)':>14}")
+    for n in sizes:
+        articles, labels = make_corpus(n)
+        truth = label_pairs(articles, labels)
+
+        start = time.perf_counter()
+        groups = near_dup.group_near_duplicates(articles)
+        elapsed = time.perf_counter() - start
+        p, r, f1 = precision_recall(group_pairs(groups), truth)
+
+        exact = ""
+        if n <= exact_limit:
+            start = time.perf_counter()
+            exact_jaccard_groups(articles, near_dup.SIMILARITY_THRESHOLD)
+            exact = f"{time.perf_counter() - start:.2f}"
+        print(f"{n:>8} {elapsed:>10.2f} {n / elapsed:>9.0f} {p:>10.3f} {r:>8.3f} {f1:>6.3f}   {exact:>14}")
+
+
+def run_compare(paths, show: int):
+    """저장된 step3/step4 결과의 LLM groups 와 MinHash groups 비교"""
+    total_llm, total_mh, total_tp = 0, 0, 0
+    for path in paths:
+        articles = read_articles(path)
+        llm_groups = read_groups(path)
+        records = [{"id": a.get("id"), "title": a.get("title"), "url": a.get("url"),
+                    "content": article_content(a, near_dup.MAX_SHINGLE_CHARS * 2)} for a in articles]
+        mh_groups = near_dup.group_near_duplicates(records)
+
+        llm_pairs, mh_pairs = group_pairs(llm_groups), group_pairs(mh_groups)
+        p, r, f1 = precision_recall(mh_pairs, llm_pairs)
+        total_llm += len(llm_pairs)
+        total_mh += len(mh_pairs)
+        total_tp += len(llm_pairs & mh_pairs)
+
+        print(f"\n=== {path} ===")
+        print(f"   기사 {len(articles)}건 | LLM 그룹 {len(llm_groups)}개 (쌍 {len(llm_pairs)}) "
+              f"| MinHash 그룹 {len(mh_groups)}개 (쌍 {len(mh_pairs)})")
+        print(f"   LLM 기준 일치율: precision {p:.3f}, recall {r:.3f}, F1 {f1:.3f}")
+
+        titles = {str(a.get("id")): a.get("title") for a in articles}
+        for label, pairs in (("LLM 만 묶음", llm_pairs - mh_pairs), ("MinHash 만 묶음", mh_pairs - llm_pairs)):
+            for i, j in sorted(pairs)[:show]:
+                print(f"   [{label}] {i}: {titles.get(i)}  ↔  {j}: {titles.get(j)}")
+
+    if len(paths) > 1:
+        p = total_tp / total_mh if total_mh else 1.0
+        r = total_tp / total_llm if total_llm else 1.0
+        f1 = 2 * p * r / (p + r) if p + r else 0.0
+        print(f"\n전체: LLM 쌍 {total_llm}, MinHash 쌍 {total_mh}, 공통 {total_tp} → "
+              f"precision {p:.3f}, recall {r:.3f}, F1 {f1:.3f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="MinHash/LSH 중복 그룹핑 벤치마크")
+    parser.add_argument("--sizes", default="500,2000,10000", help="합성 코퍼스 기사 수 (쉼표 구분)")
+    parser.add_argument("--exact-limit", type=int, default=2000, help="이 기사 수 이하에서만 전체 쌍 비교도 측정")
+    parser.add_argument("--compare", nargs="+", help="LLM groups 가 들어 있는 step3/step4 결과 파일")
+    parser.add_argument("--show", type=int, default=5, help="--compare 에서 어긋난 쌍 예시 개수")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        run_compare(args.compare, args.show)
+    else:
+        run_synthetic([int(n) for n in args.sizes.split(",") if n.strip()], args.exact_limit)
+
+
+if __name__ == "__main__":
+    main()
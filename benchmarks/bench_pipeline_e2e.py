@@ -0,0 +1,371 @@
+# benchmarks/bench_pipeline_e2e.py
+"""
+오프라인 end-to-end 벤치마크: step1~5 를 외부 서비스 없이 로컬 가짜 서비스로 끝까지 돌림
+
+  네이버 검색 API  → fake_naver.py (가짜 검색 서버)
+  언론사 기사 페이지 → fake_services.start_article_server (생성 HTML 또는 --corpus-dir 의 녹화 HTML)
+  OpenAI           → fake_services.start_fake_openai (OPENAI_BASE_URL, 지연 시간 조절)
+  FinBERT          → fake_services.StandInClassifier (사전 기반 작은 분류기)
+  MariaDB          → fake_services.connect_sqlite (step5 SQL 을 SQLite 로 실행)
+
+단계별 처리 건수 / 걸린 시간 / 처리량(건/초) / 주요 지연 시간 p50·p95 / 최대 메모리(RSS)를 표로 출력하고
+JSON 리포트로 저장. --baseline 으로 이전 리포트를 주면 처리량이 떨어지거나 메모리가 늘어난 단계를 표시하고
+종료 코드 1 로 끝남 (CI 에서 회귀 확인용).
+
+모든 파일(중간 결과, 체크포인트, 캐시, DB)은 임시 작업 폴더에 만들어서 저장소/실제 상태 파일은 안 건드림.
+필요한 패키지는 실제 파이프라인과 같음 (openai, newspaper3k). transformers / torch / pymysql / API 키 / 네트워크는 불필요.
+
+사용 예:
+    python benchmarks/bench_pipeline_e2e.py --articles 1000
+    python benchmarks/bench_pipeline_e2e.py --articles 100000 --mode pipeline --llm-latency 1.0
+    python benchmarks/bench_pipeline_e2e.py --articles 5000 --baseline bench_e2e_report.json
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_naver import start_fake_naver  # noqa: E402
+from fake_services import (  # noqa: E402
+    StandInClassifier,
+    connect_sqlite,
+    start_article_server,
+    start_fake_openai,
+)
+
+# (단계 이름, 모듈, articles_total 의 stage 라벨, 대표 지연 시간 히스토그램)
+STAGES = [
+    ("step1", "step1_naver_articles", "search", "naver_request_seconds"),
+    ("step2", "step2_articles_with_content", "crawl", "download_seconds"),
+    ("step3", "step3_articles_with_summary_and_groups", "summary", "llm_request_seconds"),
+    ("step4", "step4_articles_with_sentiment", "score", "finbert_inference_seconds"),
+    ("step5", "step5_save_to_db", "save", "db_upsert_seconds"),
+]
+
+NAVER_MAX_PER_QUERY = 1000  # start 는 1000 까지라 키워드 하나로는 1000건 정도가 한계
+DB_FILE = "bench_e2e.sqlite3"
+
+
+# ================================
+# 1. 메모리 측정
+# ================================
+def _proc_status_kb(field: str):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """리눅스면 최대 RSS(VmHWM)를 지금 값으로 초기화 → 단계별 최대값을 따로 잴 수 있음"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    kb = _proc_status_kb("VmHWM")
+    if kb is None:
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # 리눅스는 KB (초기화 불가 → 누적 최대)
+    return kb / 1024
+
+
+def rss_mb() -> float:
+    kb = _proc_status_kb("VmRSS")
+    return kb / 1024 if kb is not None else 0.0
+
+
+def children_peak_rss_mb() -> float:
+    """끝난 자식 프로세스(step2 파싱 프로세스 풀) 중 가장 큰 RSS"""
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+
+# ================================
+# 2. 가짜 서비스 연결
+# ================================
+def setup(args):
+    """가짜 서비스 띄우고 각 단계 모듈이 그쪽을 보게 설정. return: (servers, queries, per_query)"""
+    n_queries = max(1, math.ceil(args.articles / NAVER_MAX_PER_QUERY))
+    per_query = math.ceil(args.articles / n_queries)
+    queries = [f"종목{i}" for i in range(n_queries)]
+
+    naver, naver_url = start_fake_naver(
+        latency=args.naver_latency, total_per_query=per_query, scheme="http", naver_ratio=args.naver_ratio
+    )
+    articles, proxy_url = start_article_server(
+        latency=args.article_latency, corpus_dir=args.corpus_dir, error_rate=args.article_error_rate
+    )
+    openai, openai_url = start_fake_openai(
+        latency=args.llm_latency, per_article=args.llm_per_article, error_rate=args.llm_error_rate,
+        drop_rate=args.llm_drop_rate, truncate_rate=args.llm_truncate_rate,
+    )
+
+    # 키는 가짜 값으로 (실제 키가 있어도 가짜 서버로만 나가게 OPENAI_BASE_URL 을 먼저 설정)
+    os.environ["OPENAI_BASE_URL"] = openai_url
+    os.environ["gpt_key"] = "bench"
+    os.environ["huggingface_api_token"] = "bench"
+
+    import metrics
+    import step1_naver_articles as step1
+    import step2_articles_with_content as step2
+    import step3_articles_with_summary_and_groups as step3
+    import step4_articles_with_sentiment as step4
+    import step5_save_to_db as step5
+
+    metrics.set_verbose(False)
+
+    step1.NAVER_URL = naver_url
+    step1._rate_limiter = step1.NaverRateLimiter(
+        rate_per_sec=args.naver_rate, daily_quota=10**9, state_file=None
+    )
+    step1.QUERIES = queries
+    step1.DISPLAY = per_query
+
+    step2.PER_HOST_RATE = args.per_host_rate
+    session = step2.get_session()
+    session.trust_env = False  # 환경변수 프록시가 있어도 기사 요청은 가짜 기사 서버로
+    session.proxies["http"] = proxy_url
+
+    step3._client = None
+    step4._sentiment_pipe = StandInClassifier(latency=args.model_latency)
+    step5.get_connection = lambda: connect_sqlite(DB_FILE)
+
+    return (naver, articles, openai), queries, per_query
+
+
+# ================================
+# 3. 실행 + 결과 정리
+# ================================
+def stage_items(report: dict, stage_label: str) -> int:
+    series = report["counters"].get("articles_total", {})
+    return int(sum(v for k, v in series.items() if f"stage={stage_label}" in k.split(",")))
+
+
+def stage_result(name, stage_label, latency_metric, report, seconds, peak, rss_before):
+    items = stage_items(report, stage_label)
+    hist = next(iter(report["histograms"].get(latency_metric, {}).values()), None)
+    return {
+        "stage": name,
+        "items": items,
+        "seconds": round(seconds, 3),
+        "throughput": round(items / seconds, 2) if seconds > 0 else 0.0,
+        "latency_metric": latency_metric,
+        "p50": hist["p50"] if hist else None,
+        "p95": hist["p95"] if hist else None,
+        "peak_rss_mb": round(peak, 1),
+        "rss_growth_mb": round(rss_mb() - rss_before, 1),
+        "histograms": report["histograms"],
+        "counters": report["counters"],
+    }
+
+
+def run_sequential(log):
+    import importlib
+
+    import metrics
+
+    results = []
+    for name, module_name, stage_label, latency_metric in STAGES:
+        module = importlib.import_module(module_name)
+        metrics.get_registry().reset()
+        peak_resettable = reset_peak_rss()
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(log):
+            module.main()
+        seconds = time.perf_counter() - start
+        results.append(stage_result(
+            name, stage_label, latency_metric, metrics.get_registry().to_report(),
+            seconds, peak_rss_mb(), rss_before,
+        ))
+        results[-1]["peak_is_cumulative"] = not peak_resettable
+    return results
+
+
+def run_pipelined_mode(args, queries, per_query, log):
+    import metrics
+    from pipeline_stream import run_pipelined
+    from step5_save_to_db import ensure_tables
+
+    metrics.get_registry().reset()
+    reset_peak_rss()
+    rss_before = rss_mb()
+    conn = connect_sqlite(DB_FILE)
+    ensure_tables(conn)
+    options = {k: v for k, v in (("crawl_workers", args.crawl_workers), ("summary_batch", args.summary_batch))
+               if v is not None}
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(log):
+            run_pipelined(queries=queries, display=per_query, db_conn=conn, **options)
+    finally:
+        conn.close()
+    seconds = time.perf_counter() - start
+
+    # 파이프라인 모드는 단계가 겹쳐서 돌기 때문에 단계별 시간 = 전체 시간, 처리량도 전체 기준
+    report = metrics.get_registry().to_report()
+    peak = peak_rss_mb()
+    results = [
+        stage_result(name, stage_label, latency_metric, report, seconds, peak, rss_before)
+        for name, _, stage_label, latency_metric in STAGES
+    ]
+    latency = next(iter(report["histograms"].get("article_latency_seconds", {}).values()), None)
+    return results, latency
+
+
+def print_table(results):
+    print(f"\n{'단계':<6} {'건수':>8} {'시간(초)':>9} {'건/초':>9}  {'대표 지연':<26} {'p50':>8} {'p95':>8} "
+          f"{'최대RSS':>8} {'증가':>7}")
+    for r in results:
+        p50 = f"{r['p50']:.3f}" if r["p50"] is not None else "-"
+        p95 = f"{r['p95']:.3f}" if r["p95"] is not None else "-"
+        print(
+            f"{r['stage']:<6} {r['items']:>8} {r['seconds']:>9.2f} {r['throughput']:>9.1f}  "
+            f"{r['latency_metric']:<26} {p50:>8} {p95:>8} {r['peak_rss_mb']:>7.0f}M {r['rss_growth_mb']:>+6.0f}M"
+        )
+
+
+def compare_with_baseline(report: dict, baseline: dict, tolerance: float):
+    """처리량이 tolerance 보다 더 떨어졌거나 최대 RSS 가 그만큼 늘어난 단계 목록"""
+    if baseline.get("config", {}).get("mode") != report["config"]["mode"]:
+        print(f"⚠️ 기준 리포트 모드({baseline.get('config', {}).get('mode')})가 달라서 비교가 정확하지 않을 수 있음")
+
+    base_stages = {s["stage"]: s for s in baseline.get("stages", [])}
+    regressions = []
+    print(f"\n=== 기준 리포트와 비교 (허용 {tolerance:.0%}) ===")
+    for r in report["stages"]:
+        b = base_stages.get(r["stage"])
+        if not b:
+            continue
+        tp_change = (r["throughput"] / b["throughput"] - 1) if b["throughput"] else 0.0
+        mem_change = (r["peak_rss_mb"] / b["peak_rss_mb"] - 1) if b["peak_rss_mb"] else 0.0
+        bad = tp_change < -tolerance or mem_change > tolerance
+        mark = "❌" if bad else "✅"
+        print(f"   {mark} {r['stage']}: 처리량 {b['throughput']:.1f} → {r['throughput']:.1f} ({tp_change:+.0%}), "
+              f"최대RSS {b['peak_rss_mb']:.0f}M → {r['peak_rss_mb']:.0f}M ({mem_change:+.0%})")
+        if bad:
+            regressions.append(r["stage"])
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="가짜 서비스로 step1~5 end-to-end 벤치마크")
+    parser.add_argument("--articles", type=int, default=1000, help="처리할 기사 수 (100 ~ 100000)")
+    parser.add_argument("--mode", choices=["sequential", "pipeline"], default="sequential")
+    parser.add_argument("--corpus-dir", help="녹화한 기사 HTML(*.html) 폴더 (없으면 생성 HTML)")
+    parser.add_argument("--naver-ratio", type=float, default=0.7, help="네이버 뉴스 레이아웃 기사 비율")
+
+    parser.add_argument("--naver-latency", type=float, default=0.05, help="가짜 네이버 응답 지연(초)")
+    parser.add_argument("--naver-rate", type=float, default=1000, help="step1 초당 요청 한도")
+    parser.add_argument("--article-latency", type=float, default=0.02, help="기사 페이지 응답 지연(초)")
+    parser.add_argument("--article-error-rate", type=float, default=0.0)
+    parser.add_argument("--per-host-rate", type=float, default=1000, help="step2 호스트별 초당 요청 한도")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="LLM 호출당 기본 지연(초)")
+    parser.add_argument("--llm-per-article", type=float, default=0.005, help="LLM 호출에서 기사 1건당 추가 지연(초)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-drop-rate", type=float, default=0.0, help="가짜 LLM 이 응답에서 빼먹는 기사 비율")
+    parser.add_argument("--llm-truncate-rate", type=float, default=0.0, help="가짜 LLM 응답이 중간에 잘리는 확률")
+    parser.add_argument("--model-latency", type=float, default=0.005, help="감정분석 1건 추론 시간(초)")
+
+    parser.add_argument("--crawl-workers", type=int, help="(pipeline 모드) 본문 크롤링 스레드 수")
+    parser.add_argument("--summary-batch", type=int, help="(pipeline 모드) LLM 배치 크기")
+
+    parser.add_argument("--format", choices=["json", "jsonl", "jsonl.gz"], help="중간 파일 형식 (PIPELINE_FORMAT)")
+    parser.add_argument("--bounded", action="store_true",
+                        help="메모리 제한 모드 (spill_store.py, 형식을 안 주면 jsonl)")
+    parser.add_argument("--workdir", help="작업 폴더 (기본: 임시 폴더, 끝나면 삭제)")
+    parser.add_argument("--keep", action="store_true", help="임시 작업 폴더 남기기")
+    parser.add_argument("--report-file", default="bench_e2e_report.json")
+    parser.add_argument("--baseline", help="비교할 이전 리포트(JSON)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="회귀로 볼 처리량 감소/메모리 증가 비율")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report_file = os.path.abspath(args.report_file)
+    baseline = None
+    if args.baseline:
+        # 기준 리포트와 같은 파일에 덮어쓸 수도 있으니 미리 읽어둠
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.bounded:
+        os.environ["PIPELINE_BOUNDED"] = "1"
+        args.format = args.format or "jsonl"
+    if args.format:
+        os.environ["PIPELINE_FORMAT"] = args.format  # jsonl_io 가 import 될 때 읽으므로 단계 모듈보다 먼저
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_e2e_")
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workdir)  # 중간 파일 / 커서 / 체크포인트 / 캐시 / DB 전부 여기에
+
+    servers, queries, per_query = setup(args)
+    log_path = os.path.join(workdir, "bench_steps.log")
+    print(f"기사 {args.articles}건 (키워드 {len(queries)}개 × {per_query}), 모드={args.mode}, 작업 폴더={workdir}")
+    print(f"단계 출력은 {log_path} 에 기록")
+
+    latency = None
+    start = time.perf_counter()
+    try:
+        with open(log_path, "w", encoding="utf-8") as log:
+            if args.mode == "sequential":
+                results = run_sequential(log)
+            else:
+                results, latency = run_pipelined_mode(args, queries, per_query, log)
+        total = time.perf_counter() - start
+        with contextlib.closing(connect_sqlite(DB_FILE)) as conn:
+            saved_rows = conn.count("News")
+    finally:
+        for server in servers:
+            server.shutdown()
+        os.chdir(cwd)
+        if not args.workdir and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results)
+    print(f"\n전체 {total:.2f}초, DB 저장 {saved_rows}건 ({saved_rows / total:.1f}건/초), "
+          f"LLM 호출 {servers[2].request_count}회, 기사 페이지 요청 {servers[1].request_count}회, "
+          f"파싱 프로세스 최대 RSS {children_peak_rss_mb():.0f}M")
+    if latency:
+        print(f"기사 1건 end-to-end 지연: p50 {latency['p50']:.2f}초, p95 {latency['p95']:.2f}초")
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("baseline", "report_file", "workdir", "keep")},
+        "total_seconds": round(total, 3),
+        "saved_rows": saved_rows,
+        "article_latency": latency,
+        "children_peak_rss_mb": round(children_peak_rss_mb(), 1),
+        "stages": results,
+    }
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📈 리포트 저장: {report_file}")
+
+    if baseline:
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ 회귀 의심 단계: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_startup.py
+"""
+시작 시간 측정: 각 모듈 import 에 걸리는 시간 + 그때 같이 올라오는 무거운 패키지
+
+- 모듈마다 새 인터프리터를 띄워서(import 캐시 없이) --repeat 번 측정, 중앙값 출력
+- openai / transformers / torch / pymysql / newspaper 가 import 만으로 올라오는지 확인
+  (lazy 초기화가 깨지면 여기서 바로 보임)
+- gpt_key / huggingface_api_token 없이도 import 가 되는지 같이 확인
+- 비교용으로 무거운 패키지 자체의 import 시간도 측정 (설치돼 있으면)
+
+사용 예:
+    python benchmarks/bench_startup.py --repeat 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = [
+    "run_pipeline",
+    "step1_naver_articles",
+    "step2_articles_with_content",
+    "step3_articles_with_summary_and_groups",
+    "step4_articles_with_sentiment",
+    "step5_save_to_db",
+    "pipeline_stream",
+]
+
+HEAVY = ["openai", "transformers", "torch", "pymysql", "newspaper"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+try:
+    import {module}
+    error = None
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"sec": elapsed, "heavy": heavy, "error": error}}))
+"""
+
+
+def probe(module: str, env: dict) -> dict:
+    code = PROBE.format(module=module, heavy=HEAVY)
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=600
+    )
+    line = out.stdout.strip().splitlines()[-1] if out.stdout.strip() else ""
+    if not line:
+        return {"sec": 0.0, "heavy": [], "error": (out.stderr.strip().splitlines() or ["?"])[-1]}
+    return json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--modules", nargs="*", default=TARGETS)
+    args = parser.parse_args()
+
+    # 키가 없는 환경에서도 import 가 돼야 하므로 관련 환경변수는 지우고 측정
+    env = {k: v for k, v in os.environ.items() if k not in ("gpt_key", "huggingface_api_token")}
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+
+    print(f"=== 모듈 import 시간 (새 프로세스, {args.repeat}회 중앙값) ===")
+    for module in args.modules:
+        runs = [probe(module, env) for _ in range(args.repeat)]
+        errors = {r["error"] for r in runs if r["error"]}
+        ms = statistics.median(r["sec"] for r in runs) * 1000
+        heavy = sorted({m for r in runs for m in r["heavy"]})
+        status = f"❌ {errors.pop()}" if errors else "✅"
+        print(f"   {module:<42} {ms:8.1f} ms  무거운 패키지: {', '.join(heavy) or '없음'}  {status}")
+
+    print("\n=== 참고: 무거운 패키지 자체 import 시간 ===")
+    for module in HEAVY:
+        r = probe(module, env)
+        if r["error"]:
+            print(f"   {module:<42}     (미설치)")
+        else:
+            print(f"   {module:<42} {r['sec'] * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_step1_fetch.py
+"""
+step1 네이버 검색 처리량 벤치마크 (가짜 네이버 서버 사용, 네트워크 불필요)
+
+- legacy : 기존 main() 처럼 키워드를 하나씩, 페이지마다 requests.get (Session 없음)
+- pooled : fetch_many_queries (공용 keep-alive Session + 스레드 풀)
+
+사용 예:
+    python benchmarks/bench_step1_fetch.py --queries 50 --per-query 300 --latency 0.05
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import step1_naver_articles as step1  # noqa: E402
+from fake_naver import start_fake_naver  # noqa: E402
+
+
+def run_legacy(queries, per_query):
+    results = {}
+    for q in queries:
+        items = []
+        start = 1
+        while len(items) < per_query:
+            display = min(step1.NAVER_MAX_DISPLAY, per_query - len(items))
+            page = step1.fetch_naver_news(q, display=display, sort="date", start=start)
+            items.extend(page)
+            if len(page) < display:
+                break
+            start += display
+        results[q] = items
+    return results
+
+
+def run_pooled(queries, per_query, workers):
+    return step1.fetch_many_queries(queries, per_query=per_query, sort="date", max_workers=workers)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--per-query", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.05, help="가짜 서버 응답 지연(초)")
+    parser.add_argument("--workers", type=int, default=step1.MAX_WORKERS)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="가짜 서버가 429를 돌려줄 확률")
+    args = parser.parse_args()
+
+    server, url = start_fake_naver(
+        latency=args.latency, total_per_query=args.per_query, error_rate=args.error_rate
+    )
+    step1.NAVER_URL = url
+    # 처리량 비교가 목적이므로 초당/일일 한도는 풀고, 오늘 사용량 파일도 건드리지 않음
+    step1._rate_limiter = step1.NaverRateLimiter(
+        rate_per_sec=1_000_000, daily_quota=10**9, state_file=None
+    )
+    queries = [f"종목{i}" for i in range(args.queries)]
+
+    # 벤치마크 중에는 요청별 print 가 시간을 잡아먹지 않도록 stdout 을 버림
+    real_stdout = sys.stdout
+    devnull = open(os.devnull, "w")
+    try:
+        sys.stdout = devnull
+        legacy_start = time.perf_counter()
+        legacy = run_legacy(queries, args.per_query)
+        legacy_elapsed = time.perf_counter() - legacy_start
+
+        pooled_start = time.perf_counter()
+        pooled = run_pooled(queries, args.per_query, args.workers)
+        pooled_elapsed = time.perf_counter() - pooled_start
+    finally:
+        sys.stdout = real_stdout
+        devnull.close()
+        server.shutdown()
+
+    if not args.error_rate:
+        assert legacy == pooled, "legacy / pooled 결과가 다름"
+
+    n_items = sum(len(v) for v in pooled.values())
+    print(f"키워드 {args.queries}개 × {args.per_query}개, 서버 지연 {args.latency}s, workers={args.workers}")
+    print(f"legacy  {legacy_elapsed:8.2f}초  ({n_items / legacy_elapsed:,.0f} items/s)")
+    print(f"pooled  {pooled_elapsed:8.2f}초  ({n_items / pooled_elapsed:,.0f} items/s)")
+    print(f"speedup x{legacy_elapsed / pooled_elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    main()
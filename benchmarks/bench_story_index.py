@@ -0,0 +1,163 @@
+# benchmarks/bench_story_index.py
+"""
+스토리 클러스터 인덱스 벤치마크 (story_index.py, 임베딩 모델 없이 합성 벡터로)
+
+- 스토리마다 중심 벡터를 하나 두고, 기사 벡터 = 중심 + 잡음 (같은 스토리 기사끼리 코사인 0.75~0.9 정도)
+- 여러 "날"에 걸쳐 기사가 들어오는 순서로 assign_vectors → 인덱스 크기가 커져도
+    배정 1건 시간 / 비교 후보 수가 얼마나 늘어나는지 (전체 비교면 인덱스 크기에 비례)
+- ANN recall: 표본 기사마다 전체 벡터와 직접 비교한 최근접 스토리와 같은 스토리를 찾았는지
+- 정답 스토리와 비교한 쌍 단위 precision / recall (표본)
+- ID 안정성: 인덱스를 닫고 다시 열어서 같은 URL 을 다시 넣으면 같은 story_id 인지
+
+사용 예:
+    python benchmarks/bench_story_index.py --articles 20000 --dim 768
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+import story_index  # noqa: E402
+
+
+def make_stream(n: int, dim: int, days: int, seed: int = 0):
+    """return: [(day, url, title, 벡터, 정답 스토리)] 날짜 순"""
+    rng = np.random.default_rng(seed)
+    pyrng = random.Random(seed)
+    items = []
+    story = 0
+    while len(items) < n:
+        center = rng.standard_normal(dim).astype(np.float32)
+        center /= np.linalg.norm(center)
+        noise = pyrng.uniform(0.3, 0.55)
+        start = pyrng.randrange(days)
+        length = pyrng.choice([1, 1, 2, 3])  # 스토리가 이어지는 날 수
+        for _ in range(min(pyrng.randint(1, 12), n - len(items))):
+            v = rng.standard_normal(dim).astype(np.float32)
+            v = center + noise * v / np.linalg.norm(v)
+            day = min(days - 1, start + pyrng.randrange(length))
+            items.append((day, f"https://news.example.com/{len(items)}", f"스토리 {story}", v / np.linalg.norm(v), story))
+        story += 1
+    items.sort(key=lambda x: x[0])
+    return items
+
+
+def brute_force_story(index, vec):
+    """검색 대상 전체와 직접 비교한 최근접 (story_id, 코사인)"""
+    rows = index.conn.execute("SELECT slot, story_id FROM articles WHERE slot IS NOT NULL").fetchall()
+    if not rows:
+        return None, 0.0
+    slots = np.array([r[0] for r in rows])
+    sims = index.vectors[slots].astype(np.float32) @ vec
+    best = int(np.argmax(sims))
+    return rows[best][1], float(sims[best])
+
+
+def pair_scores(assigned, truth, sample: int, rng: random.Random):
+    """같은 정답 스토리 쌍 / 같은 story_id 쌍을 표본으로 비교"""
+    by_truth, by_story = {}, {}
+    for i, (t, s) in enumerate(zip(truth, assigned)):
+        by_truth.setdefault(t, []).append(i)
+        by_story.setdefault(s, []).append(i)
+    true_pairs = [p for ids in by_truth.values() for p in itertools.combinations(ids, 2)]
+    pred_pairs = [p for ids in by_story.values() for p in itertools.combinations(ids, 2)]
+    recall_sample = rng.sample(true_pairs, min(sample, len(true_pairs)))
+    precision_sample = rng.sample(pred_pairs, min(sample, len(pred_pairs)))
+    recall = sum(assigned[i] == assigned[j] for i, j in recall_sample) / max(1, len(recall_sample))
+    precision = sum(truth[i] == truth[j] for i, j in precision_sample) / max(1, len(precision_sample))
+    return precision, recall
+
+
+def run(n: int, dim: int, days: int, checks: int, batch_size: int, workdir: str):
+    db_path = os.path.join(workdir, "story_index.sqlite3")
+    vec_path = os.path.join(workdir, "story_vectors.f16")
+    index = story_index.StoryIndex(db_path, vec_path, model_name="synthetic")
+    stream = make_stream(n, dim, days)
+    rng = random.Random(1)
+    check_at = set(rng.sample(range(n), min(checks, n)))
+
+    print(f"SimHash: 테이블 {story_index.TABLES}개 × {story_index.BITS}비트, probe {story_index.PROBES}, "
+          f"임계값 {story_index.STORY_SIMILARITY} | 기사 {n}건, {dim}차원, {days}일")
+    print(f"\n{'누적 기사':>9} {'배정 ms/건':>11} {'후보/건':>9} {'전체 비교 ms/건':>15} {'ANN 일치':>9}")
+
+    assigned, truth = [], []
+    step = max(1, n // 5)
+    ann_hit = ann_total = 0
+    brute_sec, brute_n = 0.0, 0
+    window_start = time.perf_counter()
+    window_candidates = index.stats["candidates"]
+    batch = []  # 실행 1회에 해당하는 묶음 (--batch 건씩 assign_vectors)
+    for i, (day, url, title, vec, label) in enumerate(stream):
+        if i in check_at:
+            check_start = time.perf_counter()
+            expected, sim = brute_force_story(index, vec)
+            brute_sec += time.perf_counter() - check_start
+            brute_n += 1
+            if expected is not None and sim >= story_index.STORY_SIMILARITY:
+                before = index.stats["candidates"]
+                got, got_sim = index._nearest_locked(vec)
+                index.stats["candidates"] = before
+                ann_total += 1
+                ann_hit += got == expected or abs(got_sim - sim) < 1e-3
+            window_start += time.perf_counter() - check_start  # 확인용 전체 비교 시간은 빼고 잼
+        batch.append((url, title, vec))
+        truth.append(label)
+        if len(batch) >= batch_size or (i + 1) % step == 0 or i + 1 == n:
+            assigned.extend(index.assign_vectors(batch))
+            batch = []
+        if (i + 1) % step == 0:
+            elapsed = time.perf_counter() - window_start
+            cands = (index.stats["candidates"] - window_candidates) / step
+            ann = f"{ann_hit / ann_total:.3f}" if ann_total else "-"
+            brute = f"{brute_sec / brute_n * 1000:.2f}" if brute_n else "-"
+            print(f"{i + 1:>9} {elapsed / step * 1000:>11.2f} {cands:>9.1f} {brute:>15} {ann:>9}")
+            brute_sec, brute_n = 0.0, 0
+            window_start = time.perf_counter()
+            window_candidates = index.stats["candidates"]
+
+    p, r = pair_scores(assigned, truth, 20000, rng)
+    print(f"\n정답 스토리 대비 (쌍 표본): precision {p:.3f}, recall {r:.3f}")
+    print(f"스토리 수: 정답 {len(set(truth))}개, 배정 {len(set(assigned))}개")
+    index.report()
+    index.close()
+
+    # ID 안정성: 다시 열어서 같은 기사 다시 배정
+    reopened = story_index.StoryIndex(db_path, vec_path, model_name="synthetic")
+    sample = rng.sample(range(n), min(1000, n))
+    again = reopened.assign_vectors([(stream[i][1], stream[i][2], stream[i][3]) for i in sample])
+    same = sum(a == assigned[i] for a, i in zip(again, sample))
+    print(f"다시 열어서 재배정: {same}/{len(sample)}건 같은 story_id")
+    reopened.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="스토리 클러스터 인덱스 벤치마크 (합성 벡터)")
+    parser.add_argument("--articles", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=200, help="assign_vectors 한 번에 넣는 기사 수 (실행 1회 분량)")
+    parser.add_argument("--checks", type=int, default=500, help="전체 비교로 ANN 결과를 확인할 기사 수")
+    parser.add_argument("--workdir", help="인덱스 파일 폴더 (기본: 임시 폴더)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+        run(args.articles, args.dim, args.days, args.checks, args.batch, args.workdir)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            run(args.articles, args.dim, args.days, args.checks, args.batch, workdir)
+
+
+if __name__ == "__main__":
+    main()
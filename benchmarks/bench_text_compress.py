@@ -0,0 +1,207 @@
+# benchmarks/bench_text_compress.py
+"""
+본문 사전 압축 벤치마크 (text_compress.py)
+
+1) 합성 기사 (기본)
+   - 머리 서명 / 사진 설명 / 관련 기사 안내 / 저작권 문구 + 배경 설명 문장 사이에
+     수치가 든 핵심 문장을 본문 곳곳 (뒷부분 포함) 에 심은 긴 기사들을 만들어서
+     예전 방식(앞 MAX_CONTENT_CHARS 글자 자르기) 과 compress_text 를 비교
+   - 기사당 토큰 수 (step3.estimate_tokens), 핵심 수치 보존율, 남은 상투 문구 수, 처리 속도
+
+0) 상투 문구 제거 확인 (항상 먼저, --check 면 이것만)
+   - 지워야 하는 줄 / 남아야 하는 본문 문장 예시로 strip_boilerplate 결과 확인 (틀리면 AssertionError)
+
+2) 저장된 실행 (--compare)
+   - step2 결과 파일(json / jsonl / jsonl.gz) 의 실제 본문으로 토큰 수 / 처리 속도 비교 + 압축 예시
+
+사용 예:
+    python benchmarks/bench_text_compress.py --check
+    python benchmarks/bench_text_compress.py --articles 2000
+    python benchmarks/bench_text_compress.py --compare step2_naver_articles_crawled.jsonl --show 3
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import text_compress  # noqa: E402
+from jsonl_io import read_articles  # noqa: E402
+from spill_store import article_content  # noqa: E402
+from step3_articles_with_summary_and_groups import (  # noqa: E402
+    COMPRESS_READ_CHARS,
+    MAX_CONTENT_CHARS,
+    MAX_CONTENT_TOKENS,
+    estimate_tokens,
+)
+
+COMPANIES = ["삼성전자", "SK하이닉스", "LG에너지솔루션", "현대차", "네이버", "카카오", "셀트리온", "포스코홀딩스"]
+EVENTS = ["영업이익", "매출", "순이익", "수주 잔고", "설비 투자"]
+# 배경 문장 = 주체 + 내용 (조합이라 기사 안에서 겹치는 문장은 드묾)
+SUBJECTS = ["업계에서는", "금융당국은", "전문가들은", "시장 참가자들은", "정부는", "해외 경쟁사들은",
+            "증권가에서는", "투자자들은", "관계 부처는", "신용평가사들은"]
+CONTENTS = [
+    "최근 글로벌 경기 둔화 우려로 투자 심리가 위축됐다고 평가한다.",
+    "시장 변동성이 커진 만큼 보호 조치를 점검하겠다는 입장이다.",
+    "원자재 가격 상승과 물류비 부담이 여전히 부담 요인이라고 본다.",
+    "금리 흐름과 환율 방향이 당분간 가장 큰 변수가 될 것으로 보고 있다.",
+    "첨단 산업 경쟁력 강화를 위한 지원 방안을 연내 내놓을 예정이다.",
+    "다음 주 발표될 주요 경제 지표에 관심을 기울이고 있다.",
+    "생산 능력 확대와 가격 정책 조정에 나서며 대응하고 있다.",
+    "거래 대금이 줄어든 가운데 관망세가 짙었다고 분석했다.",
+]
+BOILERPLATE = [
+    "▶ 관련기사 더 보기 ▶ 오늘의 주요 뉴스",
+    "▲ 서울 시내 한 사옥 전경. 사진=연합뉴스",
+    "☞ 카카오톡 @뉴스 채널 구독하기",
+    "ⓒ 뉴스 무단전재 및 재배포 금지, AI 학습 이용 금지",
+]
+BOILERPLATE_MARKS = ("▶", "▲", "☞", "ⓒ", "@", "기자 =", "사진=")
+
+# (입력 줄, strip_boilerplate 결과)
+BOILERPLATE_CASES = [
+    # 지워야 하는 것
+    ("▲ 서울 시내 한 사옥 전경. 사진=연합뉴스", ""),
+    ("<저작권자(c) 연합뉴스, 무단 전재-재배포, AI 학습 및 활용 금지>", ""),
+    ("ⓒ 한국경제 무단전재 및 재배포 금지", ""),
+    ("Copyright ⓒ 뉴스 All rights reserved.", ""),
+    ("▶ 관련기사 더 보기 ▶ 오늘의 주요 뉴스", ""),
+    ("☞ 카카오톡 @뉴스 채널 구독하기", ""),
+    ("홍길동 기자 hong@news.example.com", ""),
+    ("(서울=연합뉴스) 홍길동 기자 = 삼성전자가 3분기 실적을 발표했다. ⓒ 뉴스 무단전재 및 재배포 금지",
+     "삼성전자가 3분기 실적을 발표했다."),
+    # 남아야 하는 것 (본문 사실)
+    ("▲매출 300조원 ▲영업이익 40조원 ▲순이익 30조원 등이다.", None),
+    ("반도체 부문이 실적을 견인했다. 한편 음원 저작권자들은 스트리밍 업체를 상대로 재배포 금지 소송을 냈다.", None),
+    ("카카오는 카카오톡 채널 광고 매출이 30% 늘었다고 밝혔다.", None),
+    ("※ 금융위원회는 공매도 금지를 연장했다.", None),
+    ("▶매출 300조원 ▶영업이익 40조원", None),
+]
+
+
+def make_article(rng: random.Random, background: int = 25):
+    """return: (제목, 본문, 핵심 수치 리스트) 핵심 문장 4개를 배경 문장 사이 임의 위치에 (뒷부분 포함)"""
+    company = rng.choice(COMPANIES)
+    title = f"{company}, {rng.choice(EVENTS)} 발표 … 전년 대비 변동"
+    facts, key_sentences = [], []
+    for _ in range(4):
+        value = f"{rng.randint(100, 99999):,}억원"
+        facts.append(value)
+        key_sentences.append(
+            f"{company}의 {rng.randint(1, 4)}분기 {rng.choice(EVENTS)}은 {value}으로 "
+            f"{company} 측은 전년 대비 {rng.randint(1, 90)}% 변동했다고 밝혔다."
+        )
+    lead = key_sentences[0]
+    body = [f"{rng.choice(SUBJECTS)} {rng.choice(CONTENTS)}" for _ in range(background)]
+    for s in key_sentences[1:]:
+        body.insert(rng.randrange(len(body) // 2, len(body) + 1), s)  # 뒷부분에 심기
+    body.insert(rng.randrange(1, 4), BOILERPLATE[1])  # 사진 설명
+
+    lines = [f"(서울=연합뉴스) 홍길동 기자 = {lead}"]
+    for i in range(0, len(body), 3):
+        lines.append(" ".join(body[i:i + 3]))
+    lines += ["", BOILERPLATE[0], BOILERPLATE[2], "홍길동 기자 hong@news.example.com", BOILERPLATE[3]]
+    return title, "\n".join(lines), facts
+
+
+def check_boilerplate():
+    """BOILERPLATE_CASES 확인 (기대값 None = 입력 그대로 남아야 함)"""
+    for line, expected in BOILERPLATE_CASES:
+        got = text_compress.strip_boilerplate(line)
+        want = line if expected is None else expected
+        assert got == want, f"strip_boilerplate({line!r}) = {got!r}, 기대값 {want!r}"
+    print(f"✅ 상투 문구 제거 확인 {len(BOILERPLATE_CASES)}건 통과")
+
+
+def compress(content: str, title: str = "") -> str:
+    return text_compress.compress_text(content, MAX_CONTENT_TOKENS, measure=estimate_tokens, title=title)
+
+
+def head_cut(content: str) -> str:
+    """예전 방식 (step3 사전 압축 끔)"""
+    if len(content) > MAX_CONTENT_CHARS:
+        return content[:MAX_CONTENT_CHARS] + "\n...(이하 생략)"
+    return content
+
+
+def measure(titles, texts, facts_list, cut):
+    start = time.perf_counter()
+    outs = [cut(t, title) for title, t in zip(titles, texts)]
+    elapsed = time.perf_counter() - start
+    tokens = sum(estimate_tokens(o) for o in outs)
+    kept = sum(sum(f in o for f in facts) for o, facts in zip(outs, facts_list))
+    total = sum(len(facts) for facts in facts_list)
+    boiler = sum(o.count(m) for o in outs for m in BOILERPLATE_MARKS)
+    return elapsed, tokens, kept / max(1, total), boiler
+
+
+def run_synthetic(n: int, background: int):
+    rng = random.Random(0)
+    articles = [make_article(rng, background) for _ in range(n)]
+    titles = [title for title, _, _ in articles]
+    texts = [t[:COMPRESS_READ_CHARS] for _, t, _ in articles]
+    facts_list = [f for _, _, f in articles]
+    raw_tokens = sum(estimate_tokens(t) for t in texts)
+
+    print(f"합성 기사 {n}건 | 평균 {sum(map(len, texts)) / n:,.0f}자, 원문 약 {raw_tokens / n:,.0f}토큰/건 "
+          f"| 앞 자르기 {MAX_CONTENT_CHARS}자, 압축 예산 {MAX_CONTENT_TOKENS}토큰")
+    print(f"\n{'방식':<16} {'토큰/건':>8} {'핵심 수치 보존':>14} {'상투 문구/건':>12} {'건/초':>9}")
+    for label, cut in (
+        ("앞부분 자르기", lambda t, title: head_cut(t)),
+        ("사전 압축 (제목 X)", lambda t, title: compress(t)),
+        ("사전 압축", compress),
+    ):
+        elapsed, tokens, kept, boiler = measure(titles, texts, facts_list, cut)
+        print(f"{label:<16} {tokens / n:>8.0f} {kept:>14.1%} {boiler / n:>12.2f} {n / max(elapsed, 1e-9):>9,.0f}")
+
+
+def run_compare(paths, show: int):
+    for path in paths:
+        articles = read_articles(path)
+        pairs = [(a.get("title") or "", article_content(a, COMPRESS_READ_CHARS).strip()) for a in articles]
+        pairs = [(title, t) for title, t in pairs if t]
+        texts = [t for _, t in pairs]
+        if not texts:
+            print(f"\n=== {path} === 본문 없음")
+            continue
+        heads = [head_cut(t) for t in texts]
+        start = time.perf_counter()
+        outs = [compress(t, title) for title, t in pairs]
+        elapsed = time.perf_counter() - start
+        head_tokens = sum(estimate_tokens(h) for h in heads)
+        out_tokens = sum(estimate_tokens(o) for o in outs)
+
+        print(f"\n=== {path} ===")
+        print(f"   기사 {len(texts)}건 | 앞 자르기 약 {head_tokens:,}토큰 → 사전 압축 {out_tokens:,}토큰 "
+              f"({1 - out_tokens / max(1, head_tokens):.0%} 절약) | {len(texts) / max(elapsed, 1e-9):,.0f}건/초")
+        for h, o in list(zip(heads, outs))[:show]:
+            print(f"\n   [앞 자르기] {h[:300]}")
+            print(f"   [사전 압축] {o[:300]}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="본문 사전 압축 벤치마크")
+    parser.add_argument("--articles", type=int, default=2000, help="합성 기사 수")
+    parser.add_argument("--background", type=int, default=25, help="합성 기사 하나의 배경 문장 수 (길이)")
+    parser.add_argument("--compare", nargs="+", help="step2 결과 파일 (실제 본문으로 비교)")
+    parser.add_argument("--show", type=int, default=2, help="--compare 에서 보여줄 예시 수")
+    parser.add_argument("--check", action="store_true", help="상투 문구 제거 확인만 하고 종료")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    check_boilerplate()
+    if args.check:
+        return
+    if args.compare:
+        run_compare(args.compare, args.show)
+    else:
+        run_synthetic(args.articles, args.background)
+
+
+if __name__ == "__main__":
+    main()
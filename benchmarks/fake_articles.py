@@ -0,0 +1,88 @@
+# benchmarks/fake_articles.py
+"""
+벤치마크용 가짜 기사 HTML 코퍼스 생성기.
+
+실제 페이지처럼 메뉴/광고/댓글/사진 설명/기자 바이라인이 섞인 HTML 과,
+그 안의 '정답' 본문 텍스트를 같이 만들어 줌.
+- layout="naver"   : n.news.naver.com 레이아웃 (#dic_area)
+- layout="generic" : 등록된 추출기가 없는 일반 언론사 레이아웃 (newspaper3k 경로)
+"""
+
+import random
+
+SENTENCES = [
+    "삼성전자가 올해 3분기 연결 기준 영업이익이 9조1000억원으로 집계됐다고 밝혔다.",
+    "반도체 부문은 메모리 가격 회복에 힘입어 전 분기 대비 흑자 폭을 크게 늘렸다.",
+    "증권가에서는 고대역폭메모리(HBM) 공급 확대가 실적 개선의 핵심 요인이라고 분석했다.",
+    "다만 스마트폰 수요 둔화와 환율 변동성은 하반기 불확실성으로 꼽힌다.",
+    "회사 측은 평택 신규 라인 투자를 예정대로 진행할 계획이라고 설명했다.",
+    "외국인 투자자는 이날 유가증권시장에서 삼성전자 주식을 3000억원어치 순매수했다.",
+    "업계 관계자는 경쟁사와의 기술 격차를 좁히는 것이 관건이라고 말했다.",
+    "정부는 반도체 산업 지원을 위한 세제 혜택 확대 방안을 검토하고 있다.",
+    "전문가들은 내년 상반기까지 메모리 업황 개선세가 이어질 것으로 내다봤다.",
+    "이번 발표 이후 관련 부품 업체들의 주가도 일제히 상승세를 보였다.",
+]
+
+BOILERPLATE_HEAD = """
+<header><nav><ul><li><a href="/">홈</a></li><li><a href="/economy">경제</a></li>
+<li><a href="/politics">정치</a></li><li><a href="/society">사회</a></li></ul></nav>
+<div class="ad_banner">광고 배너 지금 가입하면 혜택 제공</div></header>
+"""
+
+BOILERPLATE_TAIL = """
+<div class="related"><h3>관련 기사</h3><ul><li><a href="/a/1">다른 기사 제목 하나</a></li>
+<li><a href="/a/2">다른 기사 제목 둘</a></li></ul></div>
+<div class="comments"><p>댓글 0개</p><p>로그인 후 댓글을 작성할 수 있습니다.</p></div>
+<footer><p>회사소개 | 이용약관 | 개인정보처리방침</p><p>Copyright ⓒ 뉴스 All rights reserved.</p></footer>
+"""
+
+
+def make_article(i: int, layout: str = "naver", n_sentences: int = 8, seed: int = 0):
+    """
+    return: (url, html, gold_text)
+    gold_text 는 본문 문장들을 줄바꿈으로 이은 것 (바이라인 포함, 사진 설명 제외).
+    """
+    rng = random.Random(seed * 1_000_003 + i)
+    body = [rng.choice(SENTENCES) for _ in range(n_sentences)]
+    byline = f"홍길동 기자 reporter{i}@news.example.com"
+    gold = "\n".join(body + [byline])
+    title = f"[기사 {i}] {body[0][:30]}"
+
+    if layout == "naver":
+        url = f"https://n.news.naver.com/mnews/article/001/{i:010d}?sid=101"
+        parts = []
+        for j, sent in enumerate(body):
+            parts.append(sent + "<br>")
+            if j == 1:
+                parts.append(
+                    '<span class="end_photo_org"><img src="/p.jpg">'
+                    '<em class="img_desc">사진=연합뉴스 자료사진</em></span>'
+                )
+        parts.append(byline)
+        html = f"""<!DOCTYPE html><html lang="ko"><head><meta charset="utf-8"><title>{title}</title></head>
+<body>{BOILERPLATE_HEAD}
+<div id="ct"><div class="media_end_head"><h2 class="media_end_head_headline">{title}</h2>
+<span class="media_end_head_info_datestamp_time">2024.11.28. 오전 9:03</span></div>
+<div id="newsct_article"><article id="dic_area" class="go_trans _article_content">
+{"".join(parts)}
+</article></div></div>
+{BOILERPLATE_TAIL}</body></html>"""
+    else:
+        url = f"https://www.generic-news{i % 7}.co.kr/news/articleView.html?idxno={i}"
+        paragraphs = "".join(f"<p>{sent}</p>" for sent in body)
+        html = f"""<!DOCTYPE html><html lang="ko"><head><meta charset="utf-8"><title>{title}</title></head>
+<body>{BOILERPLATE_HEAD}
+<div class="article-wrap"><h1 class="headline">{title}</h1>
+<div class="article-body" itemprop="articleBody">{paragraphs}<p>{byline}</p></div></div>
+{BOILERPLATE_TAIL}</body></html>"""
+
+    return url, html, gold
+
+
+def make_corpus(n: int, naver_ratio: float = 0.7, seed: int = 0):
+    """n개 기사: 앞쪽 naver_ratio 비율은 네이버 레이아웃, 나머지는 일반 언론사 레이아웃"""
+    n_naver = int(n * naver_ratio)
+    return [
+        make_article(i, "naver" if i < n_naver else "generic", seed=seed)
+        for i in range(n)
+    ]
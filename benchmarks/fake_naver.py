@@ -0,0 +1,111 @@
+# benchmarks/fake_naver.py
+"""
+벤치마크용 가짜 네이버 뉴스 검색 API 서버.
+
+- /v1/search/news.json 에 query/display/start/sort 파라미터를 받아
+  네이버와 같은 형태의 items 를 돌려줌
+- 실제 API 처럼 느리게 응답하도록 요청마다 latency 만큼 sleep
+- error_rate 확률로 429 (Too Many Requests) 를 돌려줘서 재시도 로직도 같이 확인 가능
+- scheme="http" 로 띄우면 기사 링크도 http:// 로 나감
+  (end-to-end 벤치마크에서 기사 요청을 fake_services 의 기사 서버(프록시)로 돌리기 위함)
+- naver_ratio 비율의 기사는 originallink 를 비워서 네이버 뉴스 주소(link)로 크롤링되게 함
+"""
+
+import json
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import time
+import zlib
+
+KST = timezone(timedelta(hours=9))
+
+
+def make_items(query: str, start: int, display: int, total: int, base_time=None, scheme: str = "https",
+               naver_ratio: float = 0.0):
+    """
+    query 별로 항상 같은 결과가 나오도록 결정적인 가짜 기사 목록 생성.
+    start=1 이 가장 최신 기사 (sort=date 기준).
+    """
+    if base_time is None:
+        base_time = datetime(2024, 11, 28, 9, 0, tzinfo=KST)
+
+    press = zlib.crc32(query.encode()) % 1000  # 키워드별로 URL 이 겹치지 않게
+    items = []
+    for rank in range(start, min(start + display, total + 1)):
+        pub = base_time - timedelta(minutes=rank)
+        on_naver = (rank % 100) < naver_ratio * 100
+        items.append({
+            "title": f"<b>{query}</b> 관련 기사 {rank} &quot;테스트&quot;",
+            "originallink": "" if on_naver else f"{scheme}://news.example.com/{press}/article/{rank}",
+            "link": f"{scheme}://n.news.naver.com/mnews/article/{press:03d}/{rank:010d}",
+            "description": f"{query} 기사 {rank}의 <b>요약</b> 문장 &amp; 설명",
+            "pubDate": pub.strftime("%a, %d %b %Y %H:%M:%S %z"),
+        })
+    return items
+
+
+class FakeNaverHandler(BaseHTTPRequestHandler):
+    # 서버 인스턴스에 latency / total_per_query 를 달아서 사용
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        qs = parse_qs(parsed.query)
+        query = qs.get("query", [""])[0]
+        display = int(qs.get("display", ["10"])[0])
+        start = int(qs.get("start", ["1"])[0])
+
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.request_count += 1
+
+        if random.random() < self.server.error_rate:
+            body = b'{"errorMessage": "Rate limit exceeded.", "errorCode": "012"}'
+            self.send_response(429)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        body = json.dumps({
+            "lastBuildDate": "",
+            "total": self.server.total_per_query,
+            "start": start,
+            "display": display,
+            "items": make_items(query, start, display, self.server.total_per_query, scheme=self.server.scheme,
+                                naver_ratio=self.server.naver_ratio),
+        }, ensure_ascii=False).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_naver(latency: float = 0.05, total_per_query: int = 1000, port: int = 0,
+                     error_rate: float = 0.0, scheme: str = "https", naver_ratio: float = 0.0):
+    """
+    백그라운드 스레드에서 가짜 네이버 서버 시작.
+    return: (server, url) — 끝나면 server.shutdown() 호출
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeNaverHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.total_per_query = total_per_query
+    server.error_rate = error_rate
+    server.scheme = scheme
+    server.naver_ratio = naver_ratio
+    server.request_count = 0
+    server.lock = threading.Lock()
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/search/news.json"
+    return server, url
@@ -0,0 +1,409 @@
+# benchmarks/fake_services.py
+"""
+end-to-end 벤치마크용 로컬 가짜 서비스 모음 (네트워크 / API 키 / GPU / MariaDB 불필요)
+
+- start_article_server : 기사 HTML 서버. step2 세션의 http 프록시로 물려서 쓰므로
+                         기사 URL 의 호스트(n.news.naver.com 등)가 그대로 유지됨
+                         → 도메인 추출기 / 호스트별 간격 제한도 실제와 같은 경로로 동작
+                         corpus_dir 를 주면 녹화해 둔 *.html 파일을, 없으면 fake_articles 로 생성한 HTML 을 돌려줌
+- start_fake_openai    : OpenAI 호환 /v1/chat/completions 서버 (OPENAI_BASE_URL 로 연결)
+                         프롬프트의 articles JSON 을 읽어서 기사마다 요약을, 본문이 같은 기사끼리 그룹을 돌려줌
+                         응답 지연 = latency + per_article × 기사 수
+                         drop_rate 만큼 기사를 응답에서 빼고, truncate_rate 확률로 응답을 중간에서 자름
+                         (step3 의 빠진 기사 재요청 / 잘린 응답 복구 확인용)
+- StandInClassifier    : FinBERT 대신 쓰는 작은 사전 기반 분류기 (transformers pipeline 과 같은 호출/반환 형태)
+- connect_sqlite       : step5 의 MySQL SQL(%s, ON DUPLICATE KEY UPDATE ...)을 SQLite 로 바꿔 실행하는
+                         pymysql 비슷한 커넥션
+"""
+
+import json
+import math
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import date, datetime
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from fake_articles import make_article
+
+
+def _start_server(handler_cls, port: int = 0, **attrs):
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler_cls)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.request_count = 0
+    for k, v in attrs.items():
+        setattr(server, k, v)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _send(handler, status: int, content_type: str, body: bytes, headers=None):
+    handler.send_response(status)
+    handler.send_header("Content-Type", content_type)
+    handler.send_header("Content-Length", str(len(body)))
+    for k, v in (headers or {}).items():
+        handler.send_header(k, v)
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+# ================================
+# 1. 기사 HTML 서버
+# ================================
+def load_corpus_dir(corpus_dir: str):
+    """녹화해 둔 기사 HTML (*.html) 목록. 파일 이름 순으로 정렬해서 항상 같은 순서."""
+    names = sorted(n for n in os.listdir(corpus_dir) if n.endswith((".html", ".htm")))
+    pages = []
+    for name in names:
+        with open(os.path.join(corpus_dir, name), "rb") as f:
+            pages.append(f.read())
+    if not pages:
+        raise ValueError(f"{corpus_dir} 에 .html 파일이 없습니다")
+    return pages
+
+
+class FakeArticleHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        # 프록시로 받으면 path 가 전체 URL (GET http://host/path HTTP/1.1)
+        if self.path.startswith("http"):
+            url = self.path
+        else:
+            url = f"http://{self.headers.get('Host', '')}{self.path}"
+
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.request_count += 1
+
+        if random.random() < self.server.error_rate:
+            _send(self, 503, "text/plain; charset=utf-8", b"temporarily unavailable\n")
+            return
+
+        key = zlib.crc32(url.encode("utf-8"))
+        etag = f'"{key:08x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        if self.server.pages:
+            body = self.server.pages[key % len(self.server.pages)]
+        else:
+            layout = "naver" if urlsplit(url).hostname == "n.news.naver.com" else "generic"
+            _, html, _ = make_article(key, layout, seed=self.server.seed)
+            body = html.encode("utf-8")
+        _send(self, 200, "text/html; charset=utf-8", body, {"ETag": etag})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_article_server(latency: float = 0.02, corpus_dir: str = None, error_rate: float = 0.0,
+                         seed: int = 0, port: int = 0):
+    """
+    return: (server, proxy_url)
+    proxy_url 을 requests 세션 proxies={"http": proxy_url} 로 주면 http:// 기사 요청이 전부 여기로 옴.
+    """
+    pages = load_corpus_dir(corpus_dir) if corpus_dir else None
+    server = _start_server(FakeArticleHandler, port, latency=latency, pages=pages,
+                           error_rate=error_rate, seed=seed)
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# ================================
+# 2. OpenAI 호환 서버
+# ================================
+def parse_prompt_articles(prompt: str):
+    """step3 프롬프트의 'articles:' 뒤 JSON 배열 꺼내기"""
+    pos = prompt.find("articles:")
+    start = prompt.find("[", pos)
+    if pos == -1 or start == -1:
+        return []
+    articles, _ = json.JSONDecoder().raw_decode(prompt, start)
+    return articles
+
+
+def fake_completion(articles, drop_rate: float = 0.0):
+    """기사마다 요약 한 줄 + 본문이 완전히 같은 기사끼리 그룹 (drop_rate 만큼 기사를 빼먹음)"""
+    by_content = {}
+    for a in articles:
+        by_content.setdefault((a.get("content") or "").strip(), []).append(a.get("id"))
+    groups = [
+        {"group_id": i, "article_ids": ids, "reason": "본문이 같은 기사"}
+        for i, ids in enumerate((ids for c, ids in by_content.items() if c and len(ids) >= 2), start=1)
+    ]
+    return {
+        "articles": [
+            {"id": a.get("id"), "summary_ko": f"{(a.get('title') or '')[:40]} 관련 내용을 요약한 문장이다."}
+            for a in articles
+            if random.random() >= drop_rate
+        ],
+        "groups": groups,
+    }
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            _send(self, 404, "application/json", b'{"error": {"message": "not found"}}')
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        prompt = "\n".join(m.get("content") or "" for m in request.get("messages", []))
+        articles = parse_prompt_articles(prompt)
+
+        time.sleep(self.server.latency + self.server.per_article * len(articles))
+        with self.server.lock:
+            self.server.request_count += 1
+            self.server.articles_total += len(articles)
+
+        if random.random() < self.server.error_rate:
+            _send(self, 429, "application/json", b'{"error": {"message": "Rate limit reached", "type": "requests"}}')
+            return
+
+        content = json.dumps(fake_completion(articles, self.server.drop_rate), ensure_ascii=False)
+        if random.random() < self.server.truncate_rate:
+            content = content[:random.randint(1, max(1, len(content) - 1))]  # 출력 한도에 걸린 것처럼
+        # 토큰 수는 대충 한글 2글자 ≈ 1토큰으로 계산
+        body = json.dumps({
+            "id": f"chatcmpl-bench{self.server.request_count}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": len(prompt) // 2,
+                "completion_tokens": len(content) // 2,
+                "total_tokens": (len(prompt) + len(content)) // 2,
+            },
+        }, ensure_ascii=False).encode("utf-8")
+        _send(self, 200, "application/json", body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_openai(latency: float = 0.5, per_article: float = 0.01, error_rate: float = 0.0, port: int = 0,
+                      drop_rate: float = 0.0, truncate_rate: float = 0.0):
+    """
+    return: (server, base_url) — base_url 을 OPENAI_BASE_URL 환경변수로 주면 openai 클라이언트가 여기로 요청
+    """
+    server = _start_server(FakeOpenAIHandler, port, latency=latency, per_article=per_article,
+                           error_rate=error_rate, articles_total=0, drop_rate=drop_rate,
+                           truncate_rate=truncate_rate)
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+# ================================
+# 3. FinBERT 대신 쓰는 분류기
+# ================================
+POSITIVE_WORDS = ("흑자", "상승", "회복", "개선", "확대", "순매수", "혜택", "증가", "호조")
+NEGATIVE_WORDS = ("둔화", "불확실", "우려", "하락", "손실", "적자", "감소", "갈등", "격차")
+
+
+class StandInClassifier:
+    """
+    긍정/부정 단어 개수로 점수를 내는 작은 분류기.
+    transformers text-classification pipeline(top_k=None) 처럼
+    clf(text, truncation=True) → [[{"label": ..., "score": ...} × 3]] 을 돌려줌.
+    latency 로 모델 추론 시간을 흉내 냄 (CPU FinBERT 는 문장 하나에 수십 ms).
+    """
+
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, text, truncation: bool = True, **kwargs):
+        texts = [text] if isinstance(text, str) else list(text)
+        if self.latency:
+            time.sleep(self.latency * len(texts))
+        self.calls += len(texts)
+        return [self._classify(t) for t in texts]
+
+    @staticmethod
+    def _classify(text: str):
+        pos = sum(text.count(w) for w in POSITIVE_WORDS)
+        neg = sum(text.count(w) for w in NEGATIVE_WORDS)
+        logits = {"positive": pos - 0.5 * neg, "negative": neg - 0.5 * pos, "neutral": 0.5}
+        total = sum(math.exp(v) for v in logits.values())
+        return [{"label": k, "score": math.exp(v) / total} for k, v in logits.items()]
+
+
+# ================================
+# 4. step5 용 SQLite 커넥션
+# ================================
+# step5 의 CREATE TABLE 은 MySQL 전용 문법(ENGINE, UNIQUE KEY ...)이라 테이블 이름만 보고 이걸로 대신 실행
+SQLITE_SCHEMA = {
+    "Companies": """
+        CREATE TABLE IF NOT EXISTS Companies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            sector_id INTEGER NULL
+        )""",
+    "News": """
+        CREATE TABLE IF NOT EXISTS News (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            date TEXT NOT NULL,
+            full_text TEXT NOT NULL,
+            url TEXT NOT NULL UNIQUE,
+            company_id INTEGER NULL REFERENCES Companies(id) ON DELETE SET NULL
+        )""",
+    "Sentiments": """
+        CREATE TABLE IF NOT EXISTS Sentiments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            label TEXT NOT NULL,
+            prob_pos REAL NOT NULL,
+            prob_neg REAL NOT NULL,
+            prob_neu REAL NOT NULL,
+            score REAL NOT NULL,
+            date TEXT NOT NULL,
+            news_id INTEGER NOT NULL UNIQUE REFERENCES News(id) ON DELETE CASCADE
+        )""",
+    # work_queue.py (작업 큐 모드)
+    "QueryShards": """
+        CREATE TABLE IF NOT EXISTS QueryShards (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            shard_key TEXT NOT NULL UNIQUE,
+            queries TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            worker_id TEXT NULL,
+            claim_token TEXT NULL,
+            lease_until REAL NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            cursors TEXT NULL,
+            last_error TEXT NULL,
+            updated_at REAL NULL
+        )""",
+    "ArticleClaims": """
+        CREATE TABLE IF NOT EXISTS ArticleClaims (
+            url_hash TEXT NOT NULL PRIMARY KEY,
+            url TEXT NOT NULL,
+            worker_id TEXT NULL,
+            claim_token TEXT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            lease_until REAL NULL,
+            updated_at REAL NULL
+        )""",
+}
+
+# ON DUPLICATE KEY UPDATE → ON CONFLICT(여기 컬럼) DO UPDATE
+UNIQUE_KEYS = {"Companies": "name", "News": "url", "Sentiments": "news_id"}
+
+_CREATE_TABLE = re.compile(r"^\s*CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE)
+_INSERT_TABLE = re.compile(r"INSERT\s+INTO\s+(\w+)", re.IGNORECASE)
+_ON_DUPLICATE = re.compile(r"ON\s+DUPLICATE\s+KEY\s+UPDATE(.*)$", re.IGNORECASE | re.DOTALL)
+_VALUES_ASSIGN = re.compile(r"(\w+)\s*=\s*VALUES\((\w+)\)", re.IGNORECASE)
+_PYFORMAT = re.compile(r"%\((\w+)\)s")
+
+
+@lru_cache(maxsize=64)
+def translate_sql(sql: str) -> str:
+    """
+    pymysql 형식 SQL → SQLite
+    - %(name)s → :name, %s → ?
+    - INSERT IGNORE → INSERT OR IGNORE
+    - ON DUPLICATE KEY UPDATE a = VALUES(a) ... → ON CONFLICT(키) DO UPDATE SET a = excluded.a ... RETURNING id
+      (id = LAST_INSERT_ID(id) 는 RETURNING id 로 대신함)
+    """
+    sql = re.sub(r"--[^\n]*", "", sql)
+    sql = _PYFORMAT.sub(r":\1", sql).replace("%s", "?")
+    sql = re.sub(r"INSERT\s+IGNORE\s+INTO", "INSERT OR IGNORE INTO", sql, flags=re.IGNORECASE)
+    m = _ON_DUPLICATE.search(sql)
+    if m:
+        table = _INSERT_TABLE.search(sql).group(1)
+        sets = ", ".join(f"{col} = excluded.{src}" for col, src in _VALUES_ASSIGN.findall(m.group(1)))
+        sql = f"{sql[:m.start()]}ON CONFLICT({UNIQUE_KEYS[table]}) DO UPDATE SET {sets} RETURNING id"
+    return sql.strip().rstrip(";")
+
+
+def _adapt(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    return value
+
+
+class SqliteCursor:
+    def __init__(self, conn: sqlite3.Connection):
+        self._cur = conn.cursor()
+        self.lastrowid = None
+        self._returned = None
+
+    def execute(self, sql: str, params=None):
+        m = _CREATE_TABLE.match(sql)
+        if m:
+            self._cur.execute(SQLITE_SCHEMA[m.group(1)])
+            return 0
+        if isinstance(params, dict):
+            params = {k: _adapt(v) for k, v in params.items()}
+        elif params is not None:
+            params = tuple(_adapt(v) for v in params)
+        sql = translate_sql(sql)
+        self._cur.execute(sql, params or ())
+        self._returned = None
+        if sql.endswith("RETURNING id"):
+            self._returned = self._cur.fetchone()
+            self.lastrowid = self._returned["id"]
+        else:
+            self.lastrowid = self._cur.lastrowid
+        return self._cur.rowcount
+
+    def fetchone(self):
+        row = self._cur.fetchone()
+        return dict(row) if row is not None else None
+
+    def fetchall(self):
+        return [dict(row) for row in self._cur.fetchall()]
+
+    def close(self):
+        self._cur.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SqliteConnection:
+    """pymysql DictCursor 커넥션 중 step5 / pipeline_stream 이 쓰는 부분만"""
+
+    def __init__(self, path: str):
+        # 파이프라인 모드는 저장 스레드들이 락을 잡고 커넥션 하나를 같이 씀
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+
+    def cursor(self):
+        return SqliteCursor(self._conn)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def ping(self, reconnect: bool = False):
+        pass
+
+    def close(self):
+        self._conn.close()
+
+    def count(self, table: str) -> int:
+        return self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def connect_sqlite(path: str = "bench_e2e.sqlite3") -> SqliteConnection:
+    return SqliteConnection(path)
@@ -0,0 +1,156 @@
+# checkpoint_ledger.py
+"""
+기사별 단계 완료 기록 (SQLite) — 실패한 실행을 처음부터 다시 돌리지 않고 이어서 하기 위한 장부
+
+- articles : 기사(정규화 URL 해시) × 단계(crawl / summary / score / save) 마다
+             입력 해시 + 결과(JSON) + 완료 시각.
+             입력 해시가 같을 때만 완료로 인정 → 본문/요약이 바뀐 기사는 다시 처리
+- run_steps: run_pipeline 순차 모드에서 이번 실행 중 끝난 단계(step1~step5).
+             전체가 끝나면 비움 → 비어 있지 않으면 "중단된 실행이 있음"
+
+--resume (PIPELINE_RESUME=1) 일 때만 기록을 보고 건너뜀. 기록은 항상 남김.
+실패한 기사(본문 없음, 요약 없음, 감정분석 오류, DB 오류)는 기록하지 않으므로 다음에 다시 시도됨.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from url_utils import url_hash
+
+LEDGER_FILE = "checkpoint_ledger.sqlite3"
+
+STAGES = ("crawl", "summary", "score", "save")
+
+_resume = os.getenv("PIPELINE_RESUME") == "1"
+
+
+def resume_enabled() -> bool:
+    return _resume
+
+
+def set_resume(flag: bool):
+    global _resume
+    _resume = bool(flag)
+
+
+def input_hash(*parts) -> str:
+    """단계 입력값들 → 짧은 해시 (입력이 바뀌었는지 비교용)"""
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(str(p if p is not None else "").encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()[:32]
+
+
+class CheckpointLedger:
+    def __init__(self, path: str = LEDGER_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                url_hash    INTEGER NOT NULL,
+                stage       TEXT NOT NULL,
+                url         TEXT NOT NULL,
+                input_hash  TEXT NOT NULL,
+                output      TEXT,
+                finished_at REAL NOT NULL,
+                PRIMARY KEY (url_hash, stage)
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS run_steps (
+                step        TEXT PRIMARY KEY,
+                finished_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+        self.stats = {stage: {"skipped": 0, "recorded": 0} for stage in STAGES}
+
+    # ---------- 기사 단위 ----------
+    def lookup(self, url: str, stage: str, in_hash: str):
+        """
+        url 기사가 같은 입력(in_hash)으로 stage 를 끝냈으면 저장된 결과(dict), 아니면 None.
+        찾으면 skipped 통계 +1.
+        """
+        if not url:
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT input_hash, output FROM articles WHERE url_hash = ? AND stage = ?",
+                (url_hash(url), stage),
+            ).fetchone()
+            if row is None or row[0] != in_hash:
+                return None
+            self.stats[stage]["skipped"] += 1
+        return json.loads(row[1]) if row[1] else {}
+
+    def record(self, url: str, stage: str, in_hash: str, output=None):
+        """url 기사의 stage 완료 기록 (결과는 다음 실행에서 그대로 재사용)"""
+        if not url:
+            return
+        data = json.dumps(output, ensure_ascii=False) if output is not None else None
+        with self.lock:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO articles (url_hash, stage, url, input_hash, output, finished_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (url_hash(url), stage, url, in_hash, data, time.time()),
+            )
+            self.conn.commit()
+            self.stats[stage]["recorded"] += 1
+
+    # ---------- 실행(run) 단위 ----------
+    def finished_steps(self) -> set:
+        with self.lock:
+            return {row[0] for row in self.conn.execute("SELECT step FROM run_steps")}
+
+    def mark_step_done(self, step: str):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO run_steps (step, finished_at) VALUES (?, ?)", (step, time.time())
+            )
+            self.conn.commit()
+
+    def reset_run(self):
+        """새 실행 시작 / 전체 완료 시: 단계 완료 기록 비우기 (기사 단위 기록은 유지)"""
+        with self.lock:
+            self.conn.execute("DELETE FROM run_steps")
+            self.conn.commit()
+
+    def report(self):
+        parts = [
+            f"{stage} 건너뜀 {st['skipped']} / 기록 {st['recorded']}"
+            for stage, st in self.stats.items()
+            if st["skipped"] or st["recorded"]
+        ]
+        if parts:
+            print("📒 체크포인트: " + ", ".join(parts))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_ledger = None
+_init_lock = threading.Lock()
+
+
+def get_ledger() -> CheckpointLedger:
+    global _ledger
+    if _ledger is None:
+        with _init_lock:
+            if _ledger is None:
+                _ledger = CheckpointLedger()
+    return _ledger
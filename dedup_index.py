@@ -0,0 +1,49 @@
+# dedup_index.py
+"""
+실행 간에 유지되는 기사 URL 중복 제거 인덱스 (SQLite)
+
+- 정규화 URL(url_utils.canonicalize_url)의 64비트 해시만 저장 → 수백만 건이어도 수십 MB 수준
+- step1 이 기사를 내보내기 전에 조회해서, 이미 처리한 기사는 크롤링/LLM 단계로 안 넘어가게 함
+"""
+
+import sqlite3
+from datetime import datetime
+
+from url_utils import url_hash
+
+DEDUP_DB_FILE = "dedup_index.sqlite3"
+
+
+class DedupIndex:
+    def __init__(self, path: str = DEDUP_DB_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS seen_urls (
+                url_hash   INTEGER PRIMARY KEY,
+                first_seen TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def contains(self, url: str) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM seen_urls WHERE url_hash = ?", (url_hash(url),)
+        ).fetchone()
+        return row is not None
+
+    def add_many(self, urls):
+        now = datetime.now().isoformat(timespec="seconds")
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO seen_urls (url_hash, first_seen) VALUES (?, ?)",
+                [(url_hash(u), now) for u in urls if u],
+            )
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM seen_urls").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
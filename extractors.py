@@ -0,0 +1,161 @@
+# extractors.py
+"""
+도메인별 기사 본문 추출기 (step2)
+
+네이버 뉴스나 주요 언론사처럼 본문 위치가 정해진 페이지는
+newspaper3k 의 범용 휴리스틱 대신 lxml XPath 로 본문 컨테이너를 바로 꺼냄.
+등록된 도메인이 아니거나 추출 결과가 너무 짧으면 None → 호출하는 쪽에서 newspaper3k 로 처리.
+
+새 언론사 추가:
+    @register_extractor("example.co.kr")
+    def extract_example(tree):
+        return text_of_first(tree, ['//div[@id="article_body"]'])
+"""
+
+import re
+from urllib.parse import urlsplit
+
+import lxml.html
+from lxml import etree
+
+# 추출 결과가 이보다 짧으면 레이아웃이 바뀐 것으로 보고 newspaper3k 로 넘김
+MIN_TEXT_CHARS = 100
+
+# 본문 컨테이너 안에 있어도 본문이 아닌 요소 (사진 설명, 스크립트, 광고 등)
+DROP_XPATHS = [
+    ".//script",
+    ".//style",
+    ".//noscript",
+    ".//iframe",
+    ".//figcaption",
+    './/*[contains(@class, "img_desc")]',
+    './/*[contains(@class, "end_photo_org")]',
+    './/*[contains(@class, "nbd_table")]',
+    './/*[contains(@class, "vod_player_wrap")]',
+]
+
+_EXTRACTORS = {}
+
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+_SPACES = re.compile(r"[ \t\u00a0]+")
+
+
+def register_extractor(*domains):
+    """domains(호스트 또는 상위 도메인)에 추출 함수 등록하는 데코레이터"""
+    def decorator(func):
+        for domain in domains:
+            _EXTRACTORS[domain.lower()] = func
+        return func
+    return decorator
+
+
+def find_extractor(url: str):
+    """URL 호스트에 맞는 추출 함수. 서브도메인은 상위 도메인 등록도 찾아봄 (m.x.com → x.com)."""
+    host = (urlsplit(url).hostname or "").lower()
+    while host:
+        func = _EXTRACTORS.get(host)
+        if func:
+            return func
+        if "." not in host:
+            break
+        host = host.split(".", 1)[1]
+    return None
+
+
+def node_text(node) -> str:
+    """본문 노드 → 텍스트. <br>/<p> 는 줄바꿈으로, 사진 설명 등은 제거."""
+    for xpath in DROP_XPATHS:
+        for bad in node.xpath(xpath):
+            bad.drop_tree()
+    for br in node.xpath(".//br"):
+        br.tail = "\n" + (br.tail or "")
+    for block in node.xpath(".//p | .//div"):
+        block.tail = "\n" + (block.tail or "")
+
+    text = node.text_content()
+    text = _SPACES.sub(" ", text)
+    lines = [line.strip() for line in text.split("\n")]
+    text = "\n".join(lines)
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def text_of_first(tree, xpaths) -> str:
+    """xpaths 중 처음으로 찾아지는 노드들의 텍스트"""
+    for xpath in xpaths:
+        nodes = tree.xpath(xpath)
+        if nodes:
+            return "\n".join(t for t in (node_text(n) for n in nodes) if t)
+    return ""
+
+
+def extract_registered(url: str, html: str):
+    """
+    등록된 추출기로 본문 추출.
+    return: 본문 문자열, 또는 None (등록 안 된 도메인 / 결과가 MIN_TEXT_CHARS 미만)
+    """
+    func = find_extractor(url)
+    if func is None or not html:
+        return None
+    try:
+        tree = lxml.html.fromstring(html)
+    except (ValueError, etree.ParserError):
+        return None
+    text = func(tree)
+    if not text or len(text) < MIN_TEXT_CHARS:
+        return None
+    return text
+
+
+# ================================
+# 네이버 뉴스
+# ================================
+@register_extractor("n.news.naver.com", "news.naver.com", "m.news.naver.com")
+def extract_naver_news(tree):
+    return text_of_first(tree, [
+        '//*[@id="dic_area"]',
+        '//*[@id="newsct_article"]',
+        '//*[@id="articleBodyContents"]',  # 예전 레이아웃
+    ])
+
+
+@register_extractor("entertain.naver.com", "m.entertain.naver.com")
+def extract_naver_entertain(tree):
+    return text_of_first(tree, ['//*[@id="articeBody"]', '//*[@id="dic_area"]'])
+
+
+@register_extractor("sports.naver.com", "m.sports.naver.com", "sports.news.naver.com")
+def extract_naver_sports(tree):
+    return text_of_first(tree, ['//*[@id="newsEndContents"]', '//*[@id="dic_area"]'])
+
+
+# ================================
+# 주요 언론사
+# ================================
+@register_extractor("yna.co.kr")
+def extract_yonhap(tree):
+    return text_of_first(tree, ['//div[contains(@class, "story-news")]//p[not(@class)]'])
+
+
+@register_extractor("hankyung.com")
+def extract_hankyung(tree):
+    return text_of_first(tree, ['//*[@id="articletxt"]'])
+
+
+@register_extractor("mk.co.kr")
+def extract_maeil(tree):
+    return text_of_first(tree, ['//div[contains(@class, "news_cnt_detail_wrap")]'])
+
+
+@register_extractor("mt.co.kr")
+def extract_moneytoday(tree):
+    return text_of_first(tree, ['//*[@id="textBody"]'])
+
+
+@register_extractor("edaily.co.kr")
+def extract_edaily(tree):
+    return text_of_first(tree, ['//div[contains(@class, "news_body")]'])
+
+
+@register_extractor("sedaily.com")
+def extract_seoul_economy(tree):
+    return text_of_first(tree, ['//div[contains(@class, "article_view")]'])
@@ -0,0 +1,223 @@
+# http_cache.py
+"""
+기사 HTML 디스크 캐시 (step2 본문 크롤링용)
+
+- 키: 정규화 URL(url_utils.canonicalize_url)
+- 저장: 원본 HTML(gzip, 내용 해시로 저장 → 같은 HTML 은 한 번만), 추출 본문, ETag / Last-Modified, 받은 시각
+- 용량: HTML 파일(gzip) + SQLite 에 같이 넣는 추출 본문 크기 합이 MAX_CACHE_BYTES 를 넘으면
+  가장 오래 안 쓴 항목부터 삭제 (LRU)
+  (사용량은 meta 테이블에 누적해서 들고 있고, 열 때만 전체를 다시 셈)
+- 추출 본문이 빈 결과(파싱 실패)는 저장하지 않음 → 다음에 다시 받아서 파싱
+- 인덱스는 SQLite 하나, HTML 은 objects/ab/abcdef... 파일
+"""
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from url_utils import canonicalize_url
+
+CACHE_DIR = ".http_cache"
+MAX_CACHE_BYTES = 500 * 1024 * 1024  # 500MB
+FRESH_SECONDS = 6 * 60 * 60          # 받은 지 6시간 이내면 재검증 없이 그대로 사용
+
+
+class CacheEntry:
+    def __init__(self, url, object_hash, text, etag, last_modified, fetched_at):
+        self.url = url
+        self.object_hash = object_hash
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def is_fresh(self, max_age: float = FRESH_SECONDS) -> bool:
+        return (time.time() - self.fetched_at) < max_age
+
+
+class HttpCache:
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite3"), check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                url_key       TEXT PRIMARY KEY,
+                url           TEXT NOT NULL,
+                object_hash   TEXT NOT NULL,
+                size          INTEGER NOT NULL,
+                text          TEXT NOT NULL,
+                text_size     INTEGER NOT NULL DEFAULT 0,
+                etag          TEXT,
+                last_modified TEXT,
+                fetched_at    REAL NOT NULL,
+                last_access   REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_object ON entries (object_hash)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(entries)")}
+        if "text_size" not in columns:
+            # 예전 캐시: 본문 크기 칸 추가 + 채우기 (그 전에는 HTML 크기만 용량에 셈)
+            self.conn.execute("ALTER TABLE entries ADD COLUMN text_size INTEGER NOT NULL DEFAULT 0")
+            self.conn.execute("UPDATE entries SET text_size = length(CAST(text AS BLOB))")
+        # 사용량은 열 때 한 번만 전체를 셈 (그 뒤로는 put / 삭제 때 증감만)
+        # HTML 은 여러 URL 이 같은 파일을 가리킬 수 있으므로 객체 단위로, 본문은 항목마다 저장되므로 항목 단위로 합산
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('total_bytes', "
+            "(SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT object_hash, size FROM entries)) "
+            "+ (SELECT COALESCE(SUM(text_size), 0) FROM entries))"
+        )
+        self.conn.commit()
+
+        self.stats = {"hit": 0, "revalidated": 0, "miss": 0, "evicted": 0}
+
+    def count(self, name: str):
+        """hit / revalidated / miss 통계 (여러 스레드에서 호출)"""
+        with self.lock:
+            self.stats[name] += 1
+
+    # ---------- 내부 도우미 ----------
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(canonicalize_url(url).encode("utf-8")).hexdigest()
+
+    def _object_path(self, object_hash: str) -> str:
+        return os.path.join(self.objects_dir, object_hash[:2], object_hash)
+
+    # ---------- 조회 / 저장 ----------
+    def get(self, url: str):
+        """캐시 항목(CacheEntry) 또는 None. 조회할 때마다 LRU 시각 갱신. 본문이 빈 항목(예전 캐시)은 없는 것으로."""
+        key = self._key(url)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT url, object_hash, text, etag, last_modified, fetched_at FROM entries "
+                "WHERE url_key = ? AND text != ''",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE entries SET last_access = ? WHERE url_key = ?", (time.time(), key))
+            self.conn.commit()
+        return CacheEntry(*row)
+
+    def _write_object(self, path: str, data: bytes) -> str:
+        """gzip 으로 임시 파일에 쓰고 경로 리턴 (제자리로 옮기는 건 락 안에서)"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wb") as f:
+            f.write(data)
+        return tmp
+
+    def put(self, url: str, html: str, text: str, etag=None, last_modified=None):
+        """본문이 비었으면(파싱 실패) 저장 안 함 → 신선 기간 동안 실패가 그대로 재사용되지 않게"""
+        if not text:
+            return
+        data = html.encode("utf-8")
+        object_hash = hashlib.sha256(data).hexdigest()
+        path = self._object_path(object_hash)
+        # 압축은 락 밖에서 (느림). 파일을 제자리에 두는 것 / 항목 기록 / 용량 정리는 한 락 안에서
+        # → 다른 스레드의 삭제가 방금 둔 HTML 파일을 (아직 항목이 없다고) 지우는 일이 없음
+        tmp = None if os.path.exists(path) else self._write_object(path, data)
+        key = self._key(url)
+
+        now = time.time()
+        with self.lock:
+            if tmp is not None:
+                os.replace(tmp, path)
+            elif not os.path.exists(path):  # 확인한 뒤에 다른 스레드가 삭제함
+                os.replace(self._write_object(path, data), path)
+            size = os.path.getsize(path)
+            text_size = len(text.encode("utf-8"))
+            old = self.conn.execute(
+                "SELECT object_hash, size, text_size FROM entries WHERE url_key = ?", (key,)
+            ).fetchone()
+            delta = text_size - (old[2] if old else 0)
+            if not self._object_in_use(object_hash):
+                delta += size
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO entries
+                    (url_key, url, object_hash, size, text, text_size, etag, last_modified, fetched_at,
+                     last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, url, object_hash, size, text, text_size, etag, last_modified, now, now),
+            )
+            if old and old[0] != object_hash and self._delete_object_if_unused(old[0]):
+                delta -= old[1]
+            self._add_total_locked(delta)
+            self._evict_locked(keep=key)
+
+    def touch_revalidated(self, url: str):
+        """304 Not Modified 를 받았을 때: 본문은 그대로, 받은 시각만 갱신"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "UPDATE entries SET fetched_at = ?, last_access = ? WHERE url_key = ?",
+                (now, now, self._key(url)),
+            )
+            self.conn.commit()
+
+    # ---------- 용량 관리 ----------
+    def total_bytes(self) -> int:
+        with self.lock:
+            return self._total_bytes_locked()
+
+    def _total_bytes_locked(self) -> int:
+        return self.conn.execute("SELECT value FROM meta WHERE key = 'total_bytes'").fetchone()[0]
+
+    def _add_total_locked(self, delta: int):
+        if delta:
+            self.conn.execute("UPDATE meta SET value = value + ? WHERE key = 'total_bytes'", (delta,))
+
+    def _object_in_use(self, object_hash: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM entries WHERE object_hash = ? LIMIT 1", (object_hash,)
+        ).fetchone() is not None
+
+    def _delete_object_if_unused(self, object_hash: str) -> bool:
+        """어떤 항목도 안 쓰는 HTML 파일이면 삭제하고 True"""
+        if self._object_in_use(object_hash):
+            return False
+        try:
+            os.remove(self._object_path(object_hash))
+        except OSError:
+            pass
+        return True
+
+    def _evict_locked(self, keep: str = None):
+        """용량 초과분을 LRU 로 삭제 (keep: 방금 넣은 항목은 남김). 커밋도 여기서 (put 과 한 트랜잭션)."""
+        start = total = self._total_bytes_locked()
+        while total > self.max_bytes:
+            rows = self.conn.execute(
+                "SELECT url_key, object_hash, size, text_size FROM entries WHERE url_key != ? "
+                "ORDER BY last_access ASC LIMIT 64",
+                (keep or "",),
+            ).fetchall()
+            if not rows:
+                break
+            for url_key, object_hash, size, text_size in rows:
+                if total <= self.max_bytes:
+                    break
+                self.conn.execute("DELETE FROM entries WHERE url_key = ?", (url_key,))
+                self.stats["evicted"] += 1
+                total -= text_size
+                if self._delete_object_if_unused(object_hash):
+                    total -= size
+        self._add_total_locked(total - start)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
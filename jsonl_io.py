@@ -0,0 +1,291 @@
+# jsonl_io.py
+"""
+단계 사이 중간 파일 입출력 (json / jsonl / jsonl.gz)
+
+PIPELINE_FORMAT (환경변수)
+  - "json"     : 기존 방식. 한 파일에 전체 배열(indent=2), step3/4 는 {"articles", "groups"}
+  - "jsonl"    : 한 줄에 기사 1건. 한 건씩 쓰고 읽으므로 기사 수가 늘어도 메모리 일정
+  - "jsonl.gz" : jsonl + gzip 압축
+
+jsonl 에서 groups 는 옆 파일(<이름>.groups.json)에 따로 저장.
+다 쓰고 나면 <파일>.done 표시 파일을 만들어서, 다음 단계가 follow=True 로 읽을 때
+아직 쓰는 중인 파일을 따라가며 읽다가 .done 을 보고 끝낼 수 있게 함.
+쓰기 시작할 때는 <파일>.started 표시를 만듦 → 따라 읽는 쪽은 이번 실행의 .started / .done 이 보일 때까지
+지난 실행의 파일을 읽지 않고 기다림. "이번 실행" 판단:
+  - PIPELINE_RUN_ID 가 있으면 표시 파일에 적힌 실행 ID 가 같은지 (여러 단계를 같이 띄울 때 같은 값으로)
+  - 없으면 표시 파일 수정 시각이 읽는 프로세스 시작 이후인지
+    (이 경우 앞 단계보다 먼저 또는 같이 띄워야 함. 앞 단계가 이미 끝난 뒤 띄울 거면 PIPELINE_FOLLOW 없이)
+앞 단계가 예외로 끝나면 .done 대신 <파일>.failed 를 남김 → 따라 읽는 쪽도 오류로 끝남.
+앞 단계 프로세스가 표시도 못 남기고 죽은 경우는 FOLLOW_STALE_SEC 동안 파일이 안 늘면 오류.
+"""
+
+import gzip
+import json
+import os
+import time
+
+PIPELINE_FORMAT = os.getenv("PIPELINE_FORMAT", "json")
+
+# PIPELINE_FOLLOW=1 이면 각 단계가 앞 단계 jsonl 파일이 다 써지기 전부터 읽기 시작
+FOLLOW_INPUT = os.getenv("PIPELINE_FOLLOW") == "1"
+FOLLOW_POLL_SEC = 0.5
+# 따라 읽는 중 이 시간(초) 동안 파일이 안 늘고 .done 도 없으면 앞 단계가 죽은 것으로 보고 오류 (0 이면 끝없이 기다림)
+FOLLOW_STALE_SEC = float(os.getenv("PIPELINE_FOLLOW_STALE_SEC", "1800"))
+RUN_ID = os.getenv("PIPELINE_RUN_ID", "")
+_STARTED_AT = time.time()  # RUN_ID 가 없을 때 지난 실행의 표시 파일을 거르는 기준
+
+_EXTENSIONS = {"json": ".json", "jsonl": ".jsonl", "jsonl.gz": ".jsonl.gz"}
+
+
+def step_file(base: str, fmt: str = None) -> str:
+    """'step2_articles_with_content' → 'step2_articles_with_content.json' / '.jsonl' / '.jsonl.gz'"""
+    fmt = fmt or PIPELINE_FORMAT
+    if fmt not in _EXTENSIONS:
+        raise ValueError(f"알 수 없는 PIPELINE_FORMAT: {fmt} (json / jsonl / jsonl.gz 중 하나)")
+    return base + _EXTENSIONS[fmt]
+
+
+def is_jsonl(path: str) -> bool:
+    return path.endswith(".jsonl") or path.endswith(".jsonl.gz")
+
+
+def groups_file(path: str) -> str:
+    for ext in (".jsonl.gz", ".jsonl", ".json"):
+        if path.endswith(ext):
+            return path[: -len(ext)] + ".groups.json"
+    return path + ".groups.json"
+
+
+def done_marker(path: str) -> str:
+    return path + ".done"
+
+
+def start_marker(path: str) -> str:
+    return path + ".started"
+
+
+def failed_marker(path: str) -> str:
+    return path + ".failed"
+
+
+def _write_marker(marker: str, info=None):
+    """첫 줄: 기사 수 (.done) / 오류 내용 (.failed), 마지막 줄: 실행 ID"""
+    info = "" if info is None else str(info).replace("\n", " ")
+    with open(marker, "w", encoding="utf-8") as f:
+        f.write(f"{info}\n{RUN_ID}")
+
+
+def _is_current(marker: str) -> bool:
+    """표시 파일이 이번 실행에서 만든 것인지 (모듈 docstring 참고)"""
+    try:
+        if RUN_ID:
+            with open(marker, "r", encoding="utf-8") as f:
+                return f.read().split("\n")[-1] == RUN_ID
+        return os.path.getmtime(marker) >= _STARTED_AT - 1.0  # 파일 시스템 시각 해상도 여유
+    except OSError:
+        return False
+
+
+def _open_text(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+# ================================
+# 쓰기
+# ================================
+class ArticleWriter:
+    """
+    기사 레코드를 한 건씩 기록.
+      with ArticleWriter(path) as w:
+          w.write(record)
+          w.set_groups(groups)   # step3/4 처럼 groups 가 있는 단계만
+    - json  : 메모리에 모았다가 닫을 때 기존 형식 그대로 저장
+    - jsonl : 한 줄씩 바로 기록 + flush (다음 단계가 바로 읽을 수 있음)
+    """
+
+    def __init__(self, path: str, with_groups: bool = False):
+        self.path = path
+        self.with_groups = with_groups
+        self.groups = []
+        self.count = 0
+        self._buffer = None
+        self._fh = None
+
+        if is_jsonl(path):
+            for marker in (done_marker(path), start_marker(path), failed_marker(path)):
+                if os.path.exists(marker):
+                    os.remove(marker)
+            self._fh = _open_text(path, "w")
+            _write_marker(start_marker(path))  # 파일을 비운 뒤에 → 따라 읽는 쪽이 지난 내용을 안 읽음
+        else:
+            self._buffer = []
+
+    def write(self, record: dict):
+        if self._fh is not None:
+            self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._fh.flush()
+        else:
+            self._buffer.append(record)
+        self.count += 1
+
+    def set_groups(self, groups):
+        self.groups = groups or []
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+            if self.with_groups:
+                with open(groups_file(self.path), "w", encoding="utf-8") as f:
+                    json.dump(self.groups, f, ensure_ascii=False, indent=2)
+        elif self._buffer is not None:
+            data = {"articles": self._buffer, "groups": self.groups} if self.with_groups else self._buffer
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            self._buffer = None
+
+        if is_jsonl(self.path):
+            _write_marker(done_marker(self.path), self.count)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 중간에 예외가 나면 .done 대신 .failed (다음 단계가 불완전한 파일을 완성본으로 착각하지 않고 오류로 끝나게)
+        if exc_type is None:
+            self.close()
+        elif self._fh is not None:
+            self._fh.close()
+            self._fh = None
+            _write_marker(failed_marker(self.path), f"{exc_type.__name__}: {exc}")
+        return False
+
+
+def write_articles(path: str, records, groups=None):
+    """한 번에 저장하는 간단 버전. groups 를 주면 groups 포함 형식."""
+    with ArticleWriter(path, with_groups=groups is not None) as w:
+        for r in records:
+            w.write(r)
+        if groups is not None:
+            w.set_groups(groups)
+
+
+# ================================
+# 읽기
+# ================================
+def _check_failed(path: str):
+    """앞 단계가 이번 실행에서 예외로 끝났으면 오류"""
+    marker = failed_marker(path)
+    if _is_current(marker):
+        try:
+            with open(marker, "r", encoding="utf-8") as f:
+                reason = f.read().split("\n")[0]
+        except OSError:
+            reason = ""
+        raise RuntimeError(f"❌ {path}: 앞 단계가 중간에 실패함 ({reason or '사유 없음'})")
+
+
+def _wait_for_current(path: str, poll: float, *markers):
+    """markers 중 하나가 이번 실행 것이 될 때까지 대기 (지난 실행 표시가 남아 있으면 한 번 알림)"""
+    warned = False
+    while not any(_is_current(m) for m in markers):
+        _check_failed(path)
+        if not warned and any(os.path.exists(m) for m in markers):
+            print(f"⏳ {path}: 지난 실행의 파일 → 앞 단계가 새로 쓰기 시작할 때까지 대기")
+            warned = True
+        time.sleep(poll)
+
+
+def _follow_lines(path: str, poll: float):
+    """
+    아직 쓰는 중인 jsonl 파일을 tail -f 처럼 따라가며 완성된 줄만 돌려줌.
+    이번 실행의 .started / .done 이 보이기 전에는 (지난 실행 파일일 수 있으므로) 열지 않고 기다림.
+    이번 실행의 .done 표시가 생기고 남은 줄까지 다 읽으면 끝.
+    .failed 가 생기거나 FOLLOW_STALE_SEC 동안 파일이 그대로면 RuntimeError.
+    """
+    _wait_for_current(path, poll, start_marker(path), done_marker(path))
+
+    with open(path, "r", encoding="utf-8") as f:
+        pending = ""
+        last_growth = time.monotonic()
+        while True:
+            chunk = f.readline()
+            if chunk:
+                last_growth = time.monotonic()
+                pending += chunk
+                if pending.endswith("\n"):
+                    yield pending
+                    pending = ""
+                continue
+            if _is_current(done_marker(path)):
+                # 마지막 readline 과 .done 확인 사이에 추가된 줄까지 마저 읽음
+                yield from (pending + f.read()).splitlines()
+                return
+            _check_failed(path)
+            if FOLLOW_STALE_SEC and time.monotonic() - last_growth > FOLLOW_STALE_SEC:
+                raise RuntimeError(
+                    f"❌ {path}: {FOLLOW_STALE_SEC:.0f}초 동안 늘지 않고 .done 도 없음 (앞 단계가 죽은 것으로 봄)"
+                )
+            time.sleep(poll)
+
+
+def iter_articles(path: str, follow: bool = False, poll: float = FOLLOW_POLL_SEC):
+    """
+    기사 레코드를 한 건씩 yield.
+    - .json  : 파일 전체를 읽어서 (배열 또는 {"articles": [...]}) 하나씩
+    - .jsonl : 한 줄씩. follow=True 면 앞 단계가 아직 쓰는 중이어도 따라가며 읽음
+               (.gz 는 쓰는 중에 읽을 수 없으므로 .done 이 생길 때까지 기다렸다가 읽음)
+    """
+    if not is_jsonl(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        records = data.get("articles", []) if isinstance(data, dict) else data
+        yield from records
+        return
+
+    if follow and not path.endswith(".gz"):
+        lines = _follow_lines(path, poll)
+    else:
+        if follow:
+            _wait_for_current(path, poll, done_marker(path))
+        lines = _open_text(path, "r")
+
+    try:
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    finally:
+        if hasattr(lines, "close"):
+            lines.close()
+
+
+def read_articles(path: str):
+    return list(iter_articles(path))
+
+
+def read_groups(path: str):
+    """step3/4 결과의 groups. jsonl 이면 옆 파일, 없으면 []."""
+    if is_jsonl(path):
+        side = groups_file(path)
+        if not os.path.exists(side):
+            return []
+        with open(side, "r", encoding="utf-8") as f:
+            return json.load(f)
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("groups", []) if isinstance(data, dict) else []
+
+
+def chunked(iterable, size: int):
+    """iterable 을 size 개씩 리스트로 묶어서 yield"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,295 @@
+# metrics.py
+"""
+파이프라인 계측 (히스토그램 / 카운터 / 게이지) + 내보내기
+
+    from metrics import inc, observe, set_gauge, timed
+
+    with timed("download_seconds"):            # 걸린 시간 → 히스토그램
+        res = session.get(url)
+    inc("bytes_fetched_total", len(res.content), source="article")
+    set_gauge("queue_depth", q.qsize(), queue="parse")   # 현재 값 (최댓값도 같이 기록)
+
+- 이름 앞에는 자동으로 METRIC_PREFIX 가 붙음 (news_pipeline_download_seconds)
+- 라벨은 키워드 인자로 (source="naver")
+- export() : Prometheus 텍스트 파일(node_exporter textfile collector 형식) + JSON 실행 리포트
+- 모든 함수는 여러 스레드에서 동시에 불러도 됨
+
+기사 한 건마다 찍던 콘솔 출력은 PIPELINE_VERBOSE=0 (또는 run_pipeline.py --quiet) 이면 생략.
+단계별 요약 출력은 그대로 남음.
+
+record_peak_rss() : 지금까지의 프로세스 최대 메모리(RSS)를 peak_rss_bytes 게이지로 기록
+                    (resource 모듈이 없는 Windows 에서는 기록 안 함)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRIC_PREFIX = "news_pipeline_"
+
+PROMETHEUS_FILE = "pipeline_metrics.prom"
+REPORT_FILE = "pipeline_run_report.json"
+
+# 초 단위 히스토그램 구간 (네트워크 요청 ~ LLM 호출까지 한 구간표로)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_verbose = os.getenv("PIPELINE_VERBOSE", "1") != "0"
+
+
+def verbose() -> bool:
+    """기사 한 건마다 콘솔에 찍을지"""
+    return _verbose
+
+
+def set_verbose(flag: bool):
+    global _verbose
+    _verbose = bool(flag)
+
+
+def vprint(*args, **kwargs):
+    """verbose 일 때만 print"""
+    if _verbose:
+        print(*args, **kwargs)
+
+
+def _label_key(labels: dict):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=None) -> str:
+    pairs = list(key) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)  # 각 구간(le) 이하 개수가 아니라 구간별 개수
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """구간 안에서 선형 보간한 근사 분위수 (Prometheus histogram_quantile 과 같은 방식)"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for upper, n in zip(self.buckets, self.counts):
+            if seen + n >= rank and n > 0:
+                estimate = lower + (upper - lower) * (rank - seen) / n
+                return max(self.min, min(self.max, estimate))
+            seen += n
+            lower = upper
+        return self.max  # 마지막 구간보다 큰 값들
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "min": self.min,
+            "max": self.max,
+            "p50": round(self.quantile(0.50), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "p99": round(self.quantile(0.99), 6),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}     # name → {label_key: value}
+        self.gauges = {}       # name → {label_key: value}
+        self.gauge_max = {}    # name → {label_key: 최댓값}
+        self.histograms = {}   # name → {label_key: Histogram}
+        self.started_at = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.gauges.setdefault(name, {})[key] = value
+            peaks = self.gauge_max.setdefault(name, {})
+            if value > peaks.get(key, float("-inf")):
+                peaks[key] = value
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram(buckets)
+            hist.observe(value)
+
+    # ---------- 내보내기 ----------
+    def to_prometheus(self) -> str:
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                full = METRIC_PREFIX + name
+                lines.append(f"# TYPE {full} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(key)} {value}")
+            for name, series in sorted(self.gauges.items()):
+                full = METRIC_PREFIX + name
+                lines.append(f"# TYPE {full} gauge")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(key)} {value}")
+                lines.append(f"# TYPE {full}_max gauge")
+                for key, value in sorted(self.gauge_max[name].items()):
+                    lines.append(f"{full}_max{_format_labels(key)} {value}")
+            for name, series in sorted(self.histograms.items()):
+                full = METRIC_PREFIX + name
+                lines.append(f"# TYPE {full} histogram")
+                for key, hist in sorted(series.items()):
+                    cumulative = 0
+                    for upper, n in zip(hist.buckets, hist.counts):
+                        cumulative += n
+                        lines.append(f"{full}_bucket{_format_labels(key, [('le', upper)])} {cumulative}")
+                    lines.append(f"{full}_bucket{_format_labels(key, [('le', '+Inf')])} {hist.count}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {hist.sum}")
+                    lines.append(f"{full}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_report(self) -> dict:
+        def name_of(key):
+            return ",".join(f"{k}={v}" for k, v in key) or "_"
+
+        with self.lock:
+            return {
+                "started_at": self.started_at,
+                "finished_at": time.time(),
+                "counters": {n: {name_of(k): v for k, v in s.items()} for n, s in self.counters.items()},
+                "gauges": {
+                    n: {name_of(k): {"last": v, "max": self.gauge_max[n][k]} for k, v in s.items()}
+                    for n, s in self.gauges.items()
+                },
+                "histograms": {n: {name_of(k): h.summary() for k, h in s.items()} for n, s in self.histograms.items()},
+            }
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.gauge_max.clear()
+            self.histograms.clear()
+            self.started_at = time.time()
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+def inc(name: str, value: float = 1, **labels):
+    _registry.inc(name, value, **labels)
+
+
+def set_gauge(name: str, value: float, **labels):
+    _registry.set_gauge(name, value, **labels)
+
+
+def observe(name: str, seconds: float, **labels):
+    _registry.observe(name, seconds, **labels)
+
+
+@contextmanager
+def timed(name: str, **labels):
+    """with 블록 실행 시간을 name 히스토그램에 기록 (예외가 나도 기록)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registry.observe(name, time.perf_counter() - start, **labels)
+
+
+def peak_rss_bytes():
+    """프로세스 시작 후 최대 RSS (바이트). 알 수 없으면 None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 는 KB, macOS 는 바이트 단위
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def record_peak_rss(**labels):
+    """최대 RSS 를 게이지로 기록하고 MB 로 돌려줌 (알 수 없으면 None)"""
+    peak = peak_rss_bytes()
+    if peak is None:
+        return None
+    _registry.set_gauge("peak_rss_bytes", peak, **labels)
+    return peak / 1024 / 1024
+
+
+def _write_atomic(path: str, text: str):
+    # textfile collector 가 쓰는 중인 파일을 읽지 않게 임시 파일에 쓰고 교체
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def export(prom_path: str = PROMETHEUS_FILE, report_path: str = REPORT_FILE, extra: dict = None):
+    """Prometheus 텍스트 파일 + JSON 실행 리포트 저장. extra 는 리포트에 그대로 추가 (실행 옵션, 결과 등)."""
+    if prom_path:
+        _write_atomic(prom_path, _registry.to_prometheus())
+    if report_path:
+        report = _registry.to_report()
+        if extra:
+            report.update(extra)
+        _write_atomic(report_path, json.dumps(report, ensure_ascii=False, indent=2, default=str))
+
+
+def print_summary():
+    """히스토그램별 count / p50 / p95 / 최대를 콘솔에 한 줄씩"""
+    report = _registry.to_report()
+    if not report["histograms"]:
+        return
+    print("\n=== 단계별 지연 시간 (초) ===")
+    for name, series in sorted(report["histograms"].items()):
+        for labels, s in sorted(series.items()):
+            label = "" if labels == "_" else f" [{labels}]"
+            print(
+                f"   {name}{label}: {s['count']}건, p50 {s['p50']:.3f}, p95 {s['p95']:.3f}, "
+                f"최대 {s['max'] or 0.0:.3f}, 합 {s['sum']:.2f}"
+            )
+    for name, series in sorted(report["counters"].items()):
+        if list(series) == ["_"]:
+            print(f"   {name}: {series['_']:g}")
+        else:
+            print(f"   {name}: " + ", ".join(f"{k} {v:g}" for k, v in sorted(series.items())))
@@ -0,0 +1,295 @@
+# near_dup.py
+"""
+로컬 중복 기사 그룹핑 (MinHash + LSH) — LLM 그룹핑 대신 쓸 수 있는 엔진
+
+LLM 프롬프트 안에서 그룹핑하면 기사 n 개를 서로 다 비교하는 일을 모델이 하게 되고(O(n²)),
+실행할 때마다 결과가 달라지고, 이전 실행 기사와는 묶을 수 없음.
+GROUPING_MODE=minhash (또는 run_pipeline.py --grouping minhash) 이면 step3 이 LLM 에는 요약만 시키고
+그룹은 여기서 만듦 (groups 구조는 같음: group_id, article_ids, reason).
+
+- 서명: 제목 + 본문 앞부분(MAX_SHINGLE_CHARS)을 공백/기호 빼고 문자 SHINGLE_SIZE-gram 으로 자른 집합의 MinHash
+  (one permutation hashing: shingle 해시 한 번으로 NUM_PERM 칸의 최솟값을 채우고, 빈 칸은 옆 칸으로 채움
+   → 기사당 O(shingle 수), 순열 NUM_PERM 번 도는 것보다 훨씬 빠름. 해시는 crc32 라 실행이 달라도 같은 서명)
+- LSH: 서명을 BANDS 개 띠로 나눠서 띠가 하나라도 같은 기사만 후보 → 서명 일치율(자카드 추정)이
+  SIMILARITY_THRESHOLD 이상이면 같은 그룹 (union-find). 기사 수에 거의 선형
+- 이전 실행과 묶기: NearDupIndex (SQLite) 에 서명과 띠를 저장해두고 새 기사를 조회
+  → 이전 기사와 겹치면 그룹에 earlier_urls 로 표시 (이번 실행 기사가 1건뿐이어도 그룹으로 냄)
+  MAX_AGE_DAYS 보다 오래된 서명은 삭제
+
+LLM 그룹핑과 비교: benchmarks/bench_near_dup.py --compare <저장된 step3 결과>
+"""
+
+import hashlib
+import operator
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+
+INDEX_FILE = "near_dup_index.sqlite3"
+USE_NEAR_DUP_INDEX = True   # 이전 실행 기사와도 묶기
+MAX_AGE_DAYS = 7
+
+NUM_PERM = 64               # 서명 길이
+BANDS = 16                  # LSH 띠 개수 (띠 하나 = NUM_PERM / BANDS 칸)
+SHINGLE_SIZE = 4            # 문자 n-gram 길이 (한글은 4글자 정도가 적당)
+MAX_SHINGLE_CHARS = 1000    # 서명에 쓰는 앞부분 길이 (정규화 후)
+SIMILARITY_THRESHOLD = 0.5  # 자카드 추정치가 이 이상이면 중복
+MAX_BUCKET = 100            # 이보다 큰 LSH 버킷은 상투 문구가 같은 것뿐이라 보고 건너뜀 (다른 띠에서 만남)
+
+ROWS = NUM_PERM // BANDS
+_EMPTY = 0xFFFFFFFF
+_NON_WORD = re.compile(r"[\W_]+")
+
+GROUPING_MODES = ("llm", "minhash")
+_grouping_mode = os.getenv("GROUPING_MODE", "llm")
+
+
+def grouping_mode() -> str:
+    return _grouping_mode
+
+
+def set_grouping_mode(mode: str):
+    global _grouping_mode
+    if mode not in GROUPING_MODES:
+        raise ValueError(f"GROUPING_MODE 는 {GROUPING_MODES} 중 하나여야 합니다: {mode}")
+    _grouping_mode = mode
+
+
+# ================================
+# 1. MinHash 서명
+# ================================
+def normalize_text(text: str) -> str:
+    return _NON_WORD.sub("", (text or "").lower())[:MAX_SHINGLE_CHARS]
+
+
+def signature(text: str):
+    """MinHash 서명 (길이 NUM_PERM 튜플). 글자가 너무 적으면 None."""
+    t = normalize_text(text)
+    if len(t) < SHINGLE_SIZE:
+        return None
+    bins = [_EMPTY] * NUM_PERM
+    for i in range(len(t) - SHINGLE_SIZE + 1):
+        h = zlib.crc32(t[i:i + SHINGLE_SIZE].encode("utf-8"))
+        b = h % NUM_PERM
+        v = h // NUM_PERM
+        if v < bins[b]:
+            bins[b] = v
+    # 빈 칸은 오른쪽(원형)으로 가장 가까운 채워진 칸 값 + 거리 로 채움 (densification)
+    if _EMPTY in bins:
+        filled = {i for i, v in enumerate(bins) if v != _EMPTY}
+        for i in range(NUM_PERM):
+            if bins[i] == _EMPTY:
+                for step in range(1, NUM_PERM):
+                    j = (i + step) % NUM_PERM
+                    if j in filled:
+                        bins[i] = (bins[j] + step * 0x9E3779B1) & 0xFFFFFFFF
+                        break
+    return tuple(bins)
+
+
+def similarity(a, b) -> float:
+    """두 서명의 자카드 유사도 추정 (같은 칸 비율)"""
+    return sum(map(operator.eq, a, b)) / NUM_PERM
+
+
+def band_keys(sig):
+    """LSH 띠별 버킷 키"""
+    return [
+        f"{band}:" + hashlib.blake2b(array("I", sig[band * ROWS:(band + 1) * ROWS]).tobytes(), digest_size=8).hexdigest()
+        for band in range(BANDS)
+    ]
+
+
+def article_text(a) -> str:
+    return f"{a.get('title') or ''} {a.get('content') or ''}"
+
+
+# ================================
+# 2. 이전 실행 서명 인덱스
+# ================================
+class NearDupIndex:
+    def __init__(self, path: str = INDEX_FILE, max_age_days: float = MAX_AGE_DAYS):
+        self.path = path
+        self.max_age = max_age_days * 24 * 60 * 60
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS signatures (
+                url     TEXT PRIMARY KEY,
+                sig     BLOB NOT NULL,
+                seen_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bands (
+                band_key TEXT NOT NULL,
+                url      TEXT NOT NULL,
+                PRIMARY KEY (band_key, url)
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_bands_url ON bands (url)")
+        self.conn.commit()
+        with self.lock:
+            self._evict_locked()
+
+    def query(self, sig, exclude=()):
+        """sig 와 SIMILARITY_THRESHOLD 이상 비슷한 이전 기사들 [(url, 유사도)] (exclude URL 제외)"""
+        keys = band_keys(sig)
+        marks = ",".join("?" * len(keys))
+        with self.lock:
+            rows = self.conn.execute(
+                f"""
+                SELECT s.url, s.sig FROM signatures s
+                WHERE s.url IN (SELECT DISTINCT url FROM bands WHERE band_key IN ({marks}))
+                """,
+                keys,
+            ).fetchall()
+        matches = []
+        for url, blob in rows:
+            if url in exclude:
+                continue
+            sim = similarity(sig, array("I", blob))
+            if sim >= SIMILARITY_THRESHOLD:
+                matches.append((url, sim))
+        return matches
+
+    def add_many(self, items):
+        """items: [(url, sig)]"""
+        now = time.time()
+        sig_rows, band_rows = [], []
+        for url, sig in items:
+            if not url or sig is None:
+                continue
+            sig_rows.append((url, array("I", sig).tobytes(), now))
+            band_rows.extend((k, url) for k in band_keys(sig))
+        if not sig_rows:
+            return
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO signatures (url, sig, seen_at) VALUES (?, ?, ?)", sig_rows)
+            self.conn.executemany("INSERT OR IGNORE INTO bands (band_key, url) VALUES (?, ?)", band_rows)
+            self.conn.commit()
+
+    def _evict_locked(self):
+        cutoff = time.time() - self.max_age
+        self.conn.execute("DELETE FROM bands WHERE url IN (SELECT url FROM signatures WHERE seen_at < ?)", (cutoff,))
+        self.conn.execute("DELETE FROM signatures WHERE seen_at < ?", (cutoff,))
+        self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_index = None
+_init_lock = threading.Lock()
+
+
+def get_near_dup_index():
+    global _index
+    with _init_lock:
+        if _index is None and USE_NEAR_DUP_INDEX:
+            _index = NearDupIndex()
+        return _index
+
+
+# ================================
+# 3. 그룹핑
+# ================================
+def group_near_duplicates(articles, index=None):
+    """
+    articles: [{id, title, url, content}] (step3 간단 버전이나 기사 레코드)
+    index   : NearDupIndex 를 주면 이전 실행 기사와도 비교하고, 이번 기사 서명을 추가
+    return  : groups [{group_id, article_ids, reason, (earlier_urls)}]
+    """
+    sigs = [signature(article_text(a)) for a in articles]
+
+    parent = list(range(len(articles)))
+    best = {}  # 루트 → 묶인 쌍 중 최대 유사도
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j, sim):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[rj] = ri
+            best[ri] = max(sim, best.pop(ri, 0.0), best.pop(rj, 0.0))
+
+    # 1) 이번 기사끼리: 같은 띠 버킷에 들어간 후보만 비교
+    buckets = {}
+    for i, sig in enumerate(sigs):
+        if sig is None:
+            continue
+        for key in band_keys(sig):
+            buckets.setdefault(key, []).append(i)
+    compared = set()  # 여러 띠에서 같이 걸린 쌍은 한 번만 비교
+    for members in buckets.values():
+        if not 2 <= len(members) <= MAX_BUCKET:
+            continue
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:]:
+                ri, rj = find(i), find(j)
+                if ri == rj or (i, j) in compared:
+                    continue  # 이미 같은 그룹이면 비교 생략 (큰 버킷도 거의 선형)
+                compared.add((i, j))
+                sim = similarity(sigs[i], sigs[j])
+                # 두 그룹 대표(루트) 끼리도 비슷해야 합침 → 비슷한 기사를 징검다리로 계속 이어붙이는 연쇄 방지
+                if sim >= SIMILARITY_THRESHOLD and similarity(sigs[ri], sigs[rj]) >= SIMILARITY_THRESHOLD:
+                    union(i, j, sim)
+
+    # 2) 이전 실행 기사와 비교 → 같은 이전 기사에 닿은 이번 기사끼리도 묶음
+    earlier = {}  # 루트 → {url: 유사도}
+    if index is not None:
+        current_urls = {a.get("url") for a in articles}
+        first_hit = {}  # 이전 기사 url → 처음 닿은 이번 기사 인덱스
+        hits = []
+        for i, sig in enumerate(sigs):
+            if sig is None:
+                continue
+            for url, sim in index.query(sig, exclude=current_urls):
+                hits.append((i, url, sim))
+                if url in first_hit:
+                    union(first_hit[url], i, sim)
+                else:
+                    first_hit[url] = i
+        for i, url, sim in hits:
+            root = find(i)
+            urls = earlier.setdefault(root, {})
+            urls[url] = max(sim, urls.get(url, 0.0))
+        index.add_many((a.get("url"), sig) for a, sig in zip(articles, sigs))
+
+    members_of = {}
+    for i in range(len(articles)):
+        members_of.setdefault(find(i), []).append(i)
+
+    groups = []
+    for root, members in members_of.items():
+        prev = earlier.get(root, {})
+        if len(members) < 2 and not prev:
+            continue
+        sim = max([best.get(root, 0.0), *prev.values()])
+        group = {
+            "group_id": len(groups) + 1,
+            "article_ids": [articles[i].get("id") for i in members],
+            "reason": f"MinHash 유사도 {sim:.2f} (문자 {SHINGLE_SIZE}-gram" + (", 이전 실행 기사 포함)" if prev else ")"),
+        }
+        if prev:
+            group["earlier_urls"] = sorted(prev, key=prev.get, reverse=True)
+        groups.append(group)
+    return groups
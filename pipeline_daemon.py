@@ -0,0 +1,230 @@
+# pipeline_daemon.py
+"""
+상주(데몬) 모드 (run_pipeline.py --mode daemon)
+
+매번 run_pipeline.py 를 새로 띄우면 인터프리터 시작 + transformers import + FinBERT 로딩 + DB 접속을
+수십 건 처리하려고 매번 다시 함. 데몬 모드는 한 번 띄워두고:
+
+- FinBERT 파이프라인 / OpenAI 클라이언트 / HTTP 세션 / 파싱 프로세스 풀 / DB 커넥션을 계속 살려둠
+- POLL_INTERVAL 초마다 키워드를 다시 검색해서 새 기사만 처리
+  (step1 증분 커서 + 중복 제거 인덱스가 이미 본 기사는 걸러줌, 처리 자체는 pipeline_stream.run_pipelined)
+- SIGTERM / SIGINT → 지금 돌고 있는 사이클은 끝까지 마치고 종료 (두 번째 신호는 바로 종료)
+- GET /health  : 상태 JSON (마지막 사이클 결과, 최근 성공 시각 등). 오래 성공 못 했으면 503
+  GET /metrics : Prometheus 텍스트 (metrics.py)
+"""
+
+import json
+import signal
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+from step1_naver_articles import QUERIES
+from story_index import get_embedder, get_story_index, story_clusters_enabled
+
+POLL_INTERVAL = 300        # 사이클 시작 간격(초)
+HEALTH_HOST = "0.0.0.0"
+HEALTH_PORT = 8787
+# 마지막 성공 사이클이 (간격 × 이 값)보다 오래됐으면 /health 가 503
+UNHEALTHY_AFTER_INTERVALS = 3
+
+
+class DaemonState:
+    """health 엔드포인트에 보여줄 상태 (사이클 스레드가 갱신, HTTP 스레드가 읽음)"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.status = "starting"
+        self.cycles = 0
+        self.failures = 0
+        self.articles_total = 0
+        self.last_cycle_started = None
+        self.last_cycle_finished = None
+        self.last_success = None
+        self.last_result = None
+        self.last_error = None
+
+    def update(self, **fields):
+        with self.lock:
+            for k, v in fields.items():
+                setattr(self, k, v)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            data = {
+                "status": self.status,
+                "started_at": self.started_at,
+                "uptime_sec": round(time.time() - self.started_at, 1),
+                "interval_sec": self.interval,
+                "cycles": self.cycles,
+                "failures": self.failures,
+                "articles_total": self.articles_total,
+                "last_cycle_started": self.last_cycle_started,
+                "last_cycle_finished": self.last_cycle_finished,
+                "last_success": self.last_success,
+                "last_result": self.last_result,
+                "last_error": self.last_error,
+            }
+        data["healthy"] = self.is_healthy(data)
+        return data
+
+    def is_healthy(self, data: dict) -> bool:
+        if data["status"] == "stopping":
+            return False
+        reference = data["last_success"] or data["started_at"]
+        return time.time() - reference <= self.interval * UNHEALTHY_AFTER_INTERVALS
+
+
+def start_health_server(state: DaemonState, host: str = HEALTH_HOST, port: int = HEALTH_PORT):
+    """백그라운드 스레드에서 /health, /metrics 제공. return: 서버 (shutdown() 으로 종료)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/health"):
+                data = state.snapshot()
+                body = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+                self._send(200 if data["healthy"] else 503, "application/json; charset=utf-8", body)
+            elif self.path.startswith("/metrics"):
+                body = metrics.get_registry().to_prometheus().encode("utf-8")
+                self._send(200, "text/plain; version=0.0.4; charset=utf-8", body)
+            else:
+                self._send(404, "text/plain; charset=utf-8", b"not found\n")
+
+        def _send(self, status, content_type, body):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass  # 헬스체크 요청마다 로그 찍지 않음
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="health-server", daemon=True).start()
+    return server
+
+
+def warm_up():
+    """
+    무거운 것들을 미리 올려둠 (첫 사이클이 느려지지 않게).
+    키가 없거나 설치가 안 돼 있으면 경고만 찍고, 실제 사이클에서 다시 시도.
+    """
+    import step1_naver_articles as step1
+    import step2_articles_with_content as step2
+    import step3_articles_with_summary_and_groups as step3
+    import step4_articles_with_sentiment as step4
+
+    step1.get_session()
+    step2.get_session()
+    step2.get_cache()
+    inits = [("OpenAI 클라이언트", step3.get_client), ("FinBERT", step4.get_sentiment_pipe)]
+    if story_clusters_enabled():
+        inits += [("스토리 인덱스", get_story_index), ("문장 임베딩 모델", get_embedder)]
+    for name, init in inits:
+        try:
+            init()
+        except Exception as e:
+            print(f"⚠️ {name} 미리 로딩 실패 (사이클에서 다시 시도): {e}")
+
+
+def run_daemon(queries=None, interval: float = POLL_INTERVAL, health_host: str = HEALTH_HOST,
+               health_port: int = HEALTH_PORT, max_cycles: int = None, export_metrics: bool = True,
+               metrics_file: str = metrics.PROMETHEUS_FILE, report_file: str = metrics.REPORT_FILE,
+               **pipeline_options):
+    """
+    interval 초마다 run_pipelined 를 반복 실행.
+    max_cycles 를 주면 그만큼 돌고 종료 (테스트용). pipeline_options 는 run_pipelined 에 그대로 전달.
+    사이클마다 metrics_file / report_file 에 메트릭 저장 (빈 문자열이면 그 파일은 저장 안 함).
+    """
+    from pipeline_stream import PARSE_WORKERS, run_pipelined
+    from step5_save_to_db import ensure_tables, get_connection
+
+    queries = queries or QUERIES
+    state = DaemonState(interval)
+    stop = threading.Event()
+
+    def handle_signal(signum, frame):
+        if stop.is_set():
+            print("\n🛑 종료 신호 두 번째 → 즉시 종료")
+            raise SystemExit(1)
+        print(f"\n🛑 종료 신호({signal.Signals(signum).name}) → 진행 중인 사이클을 마치고 종료합니다")
+        state.update(status="stopping")
+        stop.set()
+
+    previous_handlers = {sig: signal.signal(sig, handle_signal) for sig in (signal.SIGTERM, signal.SIGINT)}
+
+    server = None
+    if health_port is not None:
+        server = start_health_server(state, health_host, health_port)
+        print(f"🩺 health: http://{health_host}:{server.server_address[1]}/health  (metrics: /metrics)")
+
+    # 프로세스 풀은 모델(torch)을 올리기 전에 만들어서 fork 된 자식이 모델/스레드를 물려받지 않게 함
+    # (워커 프로세스는 첫 작업 때 생기므로 빈 작업을 하나 넣어서 미리 띄움)
+    process_pool = ProcessPoolExecutor(PARSE_WORKERS)
+    process_pool.submit(int).result()
+    db_conn = None
+    try:
+        warm_up()
+        print(f"♻️ 데몬 시작: 키워드 {queries}, {interval:.0f}초 간격")
+
+        while not stop.is_set():
+            cycle_start = time.time()
+            state.update(status="running", last_cycle_started=cycle_start)
+            try:
+                if db_conn is None:
+                    db_conn = get_connection()
+                    ensure_tables(db_conn)
+                else:
+                    db_conn.ping(reconnect=True)  # 긴 대기 중에 끊겼으면 다시 연결
+
+                result = run_pipelined(queries=queries, db_conn=db_conn, process_pool=process_pool,
+                                       **pipeline_options)
+                with state.lock:
+                    state.cycles += 1
+                    state.articles_total += result["articles"]
+                state.update(status="stopping" if stop.is_set() else "idle",
+                             last_success=time.time(), last_result=result, last_error=None)
+                metrics.inc("daemon_cycles_total", result="ok")
+            except Exception as e:
+                traceback.print_exc()
+                with state.lock:
+                    state.cycles += 1
+                    state.failures += 1
+                state.update(status="stopping" if stop.is_set() else "idle",
+                             last_error=f"{type(e).__name__}: {e}")
+                metrics.inc("daemon_cycles_total", result="error")
+                # 커넥션 문제일 수 있으니 다음 사이클에서 새로 연결
+                if db_conn is not None:
+                    try:
+                        db_conn.close()
+                    except Exception:
+                        pass
+                    db_conn = None
+            finally:
+                state.update(last_cycle_finished=time.time())
+                metrics.observe("daemon_cycle_seconds", time.time() - cycle_start)
+                if export_metrics and (metrics_file or report_file):
+                    metrics.export(metrics_file, report_file)
+
+            if max_cycles is not None and state.cycles >= max_cycles:
+                break
+            # 다음 사이클까지 대기 (종료 신호가 오면 바로 깸)
+            wait = max(0.0, interval - (time.time() - cycle_start))
+            print(f"💤 다음 사이클까지 {wait:.0f}초 대기")
+            stop.wait(wait)
+    finally:
+        state.update(status="stopping")
+        if server is not None:
+            server.shutdown()
+        process_pool.shutdown()
+        if db_conn is not None:
+            db_conn.close()
+        for sig, handler in previous_handlers.items():
+            signal.signal(sig, handler)
+        print(f"👋 데몬 종료 (사이클 {state.cycles}회, 기사 {state.articles_total}건, 실패 {state.failures}회)")
@@ -0,0 +1,461 @@
+# pipeline_stream.py
+"""
+파이프라인 병렬 실행 모드 (run_pipeline.py --mode pipeline)
+
+순차 모드는 단계마다 전체 기사를 다 끝내고 다음 단계로 넘어가지만,
+이 모드는 단계 사이를 크기 제한이 있는 큐로 연결해서 기사 한 건이 준비되는 대로 바로 다음 단계로 흘려보냄.
+
+  [step1 검색] → crawl_q → [본문 크롤링 × N] → summary_q → [LLM 요약 × N, 마이크로 배치]
+              → score_q → [감정분석 × N] → save_q → [DB 저장 × N]
+
+- 큐가 꽉 차면 앞 단계 워커가 기다림 (백프레셔) → 느린 단계가 있어도 메모리 사용량 일정
+- LLM 은 기사 SUMMARY_BATCH 건(또는 SUMMARY_MAX_WAIT 초 동안 모인 만큼)씩 묶어서 호출
+  → 중복 그룹핑도 배치 안에서만 이뤄짐 (group_id 는 전체 기준으로 다시 매김)
+- 한 기사가 어느 단계에서 실패해도 빈 값으로 다음 단계로 넘기고 파이프라인은 계속 진행
+  (단, 모델 로딩 실패처럼 워커 자체가 예외로 죽으면 → 중단 표시 후 큐를 비우며 모든 워커를 끝내고
+   메인 스레드에서 그 예외를 다시 올림. 워커가 죽은 채로 큐가 차서 전체가 멈추는 일 방지)
+- 단계별 결과는 checkpoint_ledger 에 기록 → --resume 으로 다시 돌리면 끝난 작업은 건너뜀
+  (step1 커서/인덱스는 전체가 끝난 뒤에만 저장하므로, 중간에 죽으면 같은 기사들을 다시 받아서 이어감)
+"""
+
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from checkpoint_ledger import get_ledger, resume_enabled
+from jsonl_io import ArticleWriter, step_file
+from spill_store import article_content
+from metrics import inc, observe, set_gauge, timed, vprint
+from step1_naver_articles import DISPLAY, QUERIES, collect_articles
+from step2_articles_with_content import (
+    PARSE_WORKERS,
+    StageStats,
+    download_html,
+    get_cache,
+    lookup_crawled,
+    parse_html,
+    record_crawled,
+    store_parsed,
+    to_step2_record,
+)
+from step3_articles_with_summary_and_groups import (
+    get_summary_cache,
+    merge_summary,
+    report_prompt_savings,
+    summarize_articles,
+)
+from step4_articles_with_sentiment import analyze_article, enrich_with_sentiment
+from step5_save_to_db import ensure_tables, get_connection, save_input_hash, upsert_article
+from story_index import STORY_BATCH, get_story_index, story_clusters_enabled, with_stories
+
+# ================================
+# 0. 기본 설정 (run_pipeline.py 옵션으로 바꿀 수 있음)
+# ================================
+CRAWL_WORKERS = 16        # 본문 다운로드 스레드 (파싱은 PARSE_WORKERS 개 프로세스)
+SUMMARY_WORKERS = 2       # 동시에 진행하는 LLM 호출 수
+SCORE_WORKERS = 1         # 감정분석 스레드 (모델 하나를 같이 씀)
+SAVE_WORKERS = 1          # DB 저장 스레드 (각자 커넥션 1개)
+QUEUE_SIZE = 64           # 단계 사이 큐 크기
+
+SUMMARY_BATCH = 20        # LLM 한 번에 넘기는 기사 수
+SUMMARY_MAX_WAIT = 3.0    # 배치가 다 안 차도 이 시간(초)이 지나면 모인 만큼 호출
+
+OUTPUT_FILE = step_file("step4_articles_with_sentiment")
+
+_DONE = object()  # 큐 종료 표시
+
+
+class _Job:
+    """파이프라인을 따라 흐르는 기사 1건 + 시작 시각 (기사별 지연 시간 측정용)"""
+
+    __slots__ = ("article", "started")
+
+    def __init__(self, article):
+        self.article = article
+        self.started = time.perf_counter()
+
+
+def _percentile(values, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))
+    return values[idx]
+
+
+# ================================
+# 1. 단계별 처리 함수
+# ================================
+def crawl_one(a, process_pool) -> dict:
+    """기사 1건 본문 크롤링 (캐시 확인 + 다운로드는 이 스레드, 파싱은 프로세스 풀). 실패하면 content=""."""
+    url = a.get("url")
+    if not url:
+        return to_step2_record(a, "")
+    text = lookup_crawled(url)
+    if text is None:
+        try:
+            cached_text, html, etag, last_modified = download_html(url)
+            if cached_text is not None:
+                text = cached_text
+            else:
+                try:
+                    text = process_pool.submit(parse_html, url, html).result()
+                except BrokenProcessPool:
+                    text = parse_html(url, html)
+                store_parsed(url, html, text, etag, last_modified)
+        except Exception as e:
+            print(f"[경고] 본문 크롤링 실패: {url}\n       사유: {e}")
+            text = ""
+        record_crawled(url, text)
+    inc("articles_total", stage="crawl", result="ok" if text else "empty")
+    return to_step2_record(a, text)
+
+
+def summarize_batch(articles):
+    """
+    기사 묶음 LLM 요약 + 배치 안 중복 그룹핑 (체크포인트에 요약이 있는 기사는 LLM 호출에서 빠짐).
+    return: (step3 형식 기사 리스트, groups). LLM 실패 시 요약 "" / 그룹 없음.
+    """
+    try:
+        summaries, groups, _, _ = summarize_articles(articles)
+    except Exception as e:
+        print(f"[경고] LLM 요약 실패 (기사 {len(articles)}건, 요약 없이 진행): {e}")
+        summaries, groups = {}, []
+
+    merged = [merge_summary(a, summaries.get(str(a.get("id")), "")) for a in articles]
+    return merged, groups
+
+
+def score_batch(articles) -> list:
+    """감정분석 (기사마다) + 스토리 번호 (켜져 있으면 묶음 임베딩 한 번)"""
+    records = [enrich_with_sentiment(a, analyze_article(a)[0]) for a in articles]
+    return with_stories(records) if story_clusters_enabled() else records
+
+
+# ================================
+# 2. 병렬 실행
+# ================================
+def run_pipelined(
+    queries=None,
+    display: int = DISPLAY,
+    crawl_workers: int = CRAWL_WORKERS,
+    summary_workers: int = SUMMARY_WORKERS,
+    score_workers: int = SCORE_WORKERS,
+    save_workers: int = SAVE_WORKERS,
+    queue_size: int = QUEUE_SIZE,
+    summary_batch: int = SUMMARY_BATCH,
+    output_file: str = OUTPUT_FILE,
+    db_conn=None,
+    process_pool=None,
+    cursors=None,
+    article_filter=None,
+    on_saved=None,
+):
+    """
+    검색 → 크롤링 → 요약 → 감정분석 → DB 저장을 단계별 워커 + 큐로 동시에 실행.
+    결과는 step4 결과 파일(끝나는 순서대로)과 DB에 같이 기록.
+    db_conn / process_pool 을 주면 매번 새로 만들지 않고 그걸 씀 (데몬 모드에서 계속 살려두는 용도).
+      - db_conn 은 테이블 준비(ensure_tables)가 끝난 커넥션이어야 하고, 저장 워커들이 락을 잡고 같이 씀
+    작업 큐 모드(work_queue.py)용:
+      - cursors        : step1 키워드별 커서 dict (collect_articles 참고, 끝나면 이 dict 가 전진해 있음)
+      - article_filter : 검색된 기사마다 불러서 False 면 이번 실행에서 뺌 (다른 워커가 처리한 기사)
+                         None 이면 빼되 끝나지 않은 기사로 봄 (다른 워커가 처리 중 → 그 워커가 죽을 수 있으니
+                         중복 제거 인덱스에 안 넣고 커서도 그 앞까지만 전진)
+      - on_saved       : DB 저장(커밋)이 끝난 기사마다 불림 (저장 워커 스레드에서)
+    return: {"articles", "saved", "failed", "groups"}
+    """
+    queries = queries or QUERIES
+    articles, commit = collect_articles(queries, display, cursors=cursors)
+    unfinished = []  # DB 저장 실패 / LLM 요약 실패 / 다른 워커가 처리 중 → step1 commit 에서 빼서 다음 실행에 다시
+    if article_filter is not None and articles:
+        before = len(articles)
+        kept = []
+        for a in articles:
+            verdict = article_filter(a)
+            if verdict:
+                kept.append(a)
+            elif verdict is None:
+                unfinished.append(a)
+        articles = kept
+        if len(articles) < before:
+            print(f"   ⏭ 다른 워커가 처리한 기사 {before - len(articles) - len(unfinished)}건, "
+                  f"처리 중인 기사 {len(unfinished)}건")
+    if not articles:
+        print("⚠️ 처리할 기사가 없습니다.")
+        commit(unfinished)
+        return {"articles": 0, "saved": 0, "failed": 0, "groups": 0}
+
+    crawl_q = queue.Queue(maxsize=queue_size)
+    summary_q = queue.Queue(maxsize=queue_size)
+    score_q = queue.Queue(maxsize=queue_size)
+    save_q = queue.Queue(maxsize=queue_size)
+
+    stats = {
+        "crawl": StageStats("본문 크롤링", crawl_workers),
+        "summary": StageStats("LLM 요약", summary_workers),
+        "score": StageStats("감정분석", score_workers),
+        "save": StageStats("DB 저장", save_workers),
+    }
+    ledger = get_ledger()
+    lock = threading.Lock()
+    progress = {"saved": 0, "failed": 0, "latencies": [], "queue_max": {}}
+    all_groups = []
+    abort = threading.Event()  # 워커 하나라도 예외로 죽으면 set → 나머지는 큐만 비우고 끝남
+    errors = []
+
+    def fail(stage, e):
+        with lock:
+            errors.append(e)
+        if not abort.is_set():
+            print(f"💥 {stage} 워커 오류 → 파이프라인 중단: {type(e).__name__}: {e}")
+        abort.set()
+
+    def put(q, name, item):
+        q.put(item)
+        size = q.qsize()
+        set_gauge("queue_depth", size, queue=name)
+        with lock:
+            if size > progress["queue_max"].get(name, 0):
+                progress["queue_max"][name] = size
+
+    def crawl_worker(process_pool):
+        while True:
+            job = crawl_q.get()
+            if job is _DONE:
+                return
+            if abort.is_set():
+                continue
+            try:
+                start = time.perf_counter()
+                job.article = crawl_one(job.article, process_pool)
+                stats["crawl"].add(time.perf_counter() - start)
+                put(summary_q, "summary", job)
+            except Exception as e:
+                fail("본문 크롤링", e)
+
+    def summary_worker():
+        finished = False
+        while not finished:
+            job = summary_q.get()
+            if job is _DONE:
+                return
+            batch = [job]
+            deadline = time.monotonic() + SUMMARY_MAX_WAIT
+            while len(batch) < summary_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = summary_q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if job is _DONE:
+                    finished = True
+                    break
+                batch.append(job)
+            if abort.is_set():
+                continue
+
+            try:
+                start = time.perf_counter()
+                merged, groups = summarize_batch([j.article for j in batch])
+                stats["summary"].add(time.perf_counter() - start)
+
+                with lock:
+                    for g in groups:
+                        all_groups.append({**g, "group_id": len(all_groups) + 1})
+                for j, record in zip(batch, merged):
+                    j.article = record
+                    put(score_q, "score", j)
+            except Exception as e:
+                fail("LLM 요약", e)
+
+    def score_worker():
+        finished = False
+        while not finished:
+            job = score_q.get()
+            if job is _DONE:
+                return
+            # 이미 큐에 쌓인 기사는 같이 처리 (스토리 임베딩을 묶음으로), 기다리지는 않음
+            batch = [job]
+            while len(batch) < STORY_BATCH:
+                try:
+                    job = score_q.get_nowait()
+                except queue.Empty:
+                    break
+                if job is _DONE:
+                    finished = True
+                    break
+                batch.append(job)
+            if abort.is_set():
+                continue
+            try:
+                start = time.perf_counter()
+                records = score_batch([j.article for j in batch])
+                elapsed = time.perf_counter() - start
+                for j, record in zip(batch, records):
+                    j.article = record
+                    stats["score"].add(elapsed / len(batch))
+                    put(save_q, "save", j)
+            except Exception as e:
+                fail("감정분석", e)
+
+    db_lock = threading.Lock() if db_conn is not None else None
+
+    def save_one(cur, conn, writer, job):
+        start = time.perf_counter()
+        a = job.article
+        h = save_input_hash(a)
+        try:
+            if not (resume_enabled() and ledger.lookup(a.get("url"), "save", h) is not None):
+                with db_lock or nullcontext():
+                    with timed("db_upsert_seconds"):
+                        upsert_article(cur, a)
+                    with timed("db_commit_seconds"):
+                        conn.commit()
+                inc("articles_total", stage="save")
+                ledger.record(a.get("url"), "save", h)
+            ok = True
+        except Exception as e:
+            with db_lock or nullcontext():
+                conn.rollback()
+            print(f"[경고] DB 저장 실패: ID={a.get('id')} {a.get('url')}\n       사유: {e}")
+            ok = False
+        stats["save"].add(time.perf_counter() - start)
+        if ok and on_saved is not None:
+            on_saved(a)
+
+        # 본문은 있는데 요약이 비었으면 LLM 실패(요약 안 된 채 저장) → 다음 실행에서 다시
+        unsummarized = not a.get("summary_ko") and bool(article_content(a, 1))
+        with lock:
+            writer.write(a)
+            progress["saved" if ok else "failed"] += 1
+            if not ok or unsummarized:
+                unfinished.append(a)
+            progress["latencies"].append(time.perf_counter() - job.started)
+            done = progress["saved"] + progress["failed"]
+        observe("article_latency_seconds", time.perf_counter() - job.started)
+        vprint(
+            f"[{done}/{len(articles)}] ID={a.get('id')} "
+            f"index={a.get('sentiment_index', 0.0):.1f} "
+            f"요약={'있음' if a.get('summary_ko') else '없음'} {a.get('title')}"
+        )
+
+    def save_worker(writer):
+        conn = None
+        try:
+            conn = db_conn if db_conn is not None else get_connection()
+            with conn.cursor() as cur:
+                while True:
+                    job = save_q.get()
+                    if job is _DONE:
+                        return
+                    if abort.is_set():
+                        continue
+                    save_one(cur, conn, writer, job)
+        except Exception as e:
+            fail("DB 저장", e)
+            # 앞 단계가 막히지 않도록 종료 표시가 올 때까지 큐만 비움
+            while save_q.get() is not _DONE:
+                pass
+        finally:
+            if db_conn is None and conn is not None:
+                conn.close()
+
+    def start_threads(name, count, target, args=()):
+        threads = [
+            threading.Thread(target=target, args=args, name=f"{name}-{i}", daemon=True)
+            for i in range(count)
+        ]
+        for t in threads:
+            t.start()
+        return threads
+
+    def close_stage(q, threads):
+        # 앞 단계가 다 끝난 뒤에 워커 수만큼 종료 표시 → 큐에 남은 기사까지 다 처리하고 끝남
+        for _ in threads:
+            q.put(_DONE)
+        for t in threads:
+            t.join()
+
+    if db_conn is None:
+        conn = get_connection()
+        try:
+            ensure_tables(conn)
+        finally:
+            conn.close()
+
+    print(
+        f"\n🔀 파이프라인 모드: 기사 {len(articles)}건 | 워커 크롤링 {crawl_workers} / 요약 {summary_workers} "
+        f"/ 감정분석 {score_workers} / 저장 {save_workers} | 큐 {queue_size} | LLM 배치 {summary_batch}"
+    )
+
+    wall_start = time.perf_counter()
+    with ArticleWriter(output_file, with_groups=True) as writer:
+        pool_cm = nullcontext(process_pool) if process_pool is not None else ProcessPoolExecutor(PARSE_WORKERS)
+        with pool_cm as pool:
+            crawlers = start_threads("crawl", crawl_workers, crawl_worker, (pool,))
+            summarizers = start_threads("summary", summary_workers, summary_worker)
+            scorers = start_threads("score", score_workers, score_worker)
+            savers = start_threads("save", save_workers, save_worker, (writer,))
+
+            for a in articles:
+                if abort.is_set():
+                    break
+                put(crawl_q, "crawl", _Job(a))
+
+            close_stage(crawl_q, crawlers)
+            close_stage(summary_q, summarizers)
+            close_stage(score_q, scorers)
+            close_stage(save_q, savers)
+
+        if errors:
+            # with 안에서 raise → 결과 파일에 groups / .done 을 안 남김 (중단된 파일을 완성본으로 착각하지 않게)
+            # step1 인덱스 / 커서도 저장하지 않음 → 다음 실행에서 같은 기사들을 다시 받음
+            raise errors[0]
+        writer.set_groups(all_groups)
+    wall = time.perf_counter() - wall_start
+
+    # 결과 파일 / DB 에 다 쓴 뒤에 step1 인덱스 / 커서 저장 (실패한 기사는 빼고)
+    commit(unfinished)
+
+    latencies = progress["latencies"]
+    print("\n=== 파이프라인 단계별 사용률 ===")
+    print(f"   전체 경과: {wall:.2f}초, 기사 {len(articles)}건 ({len(articles) / wall:.2f}건/초)")
+    for st in stats.values():
+        print(
+            f"   {st.name}: 워커 {st.workers}개, 처리 {st.items}건, "
+            f"작업 시간 합 {st.busy_sec:.2f}초, 사용률 {st.utilization(wall) * 100:.1f}%"
+        )
+    print("   큐 최대 적재: " + ", ".join(f"{k} {v}/{queue_size}" for k, v in progress["queue_max"].items()))
+    print(
+        f"   기사별 지연(검색 이후 → DB 저장): p50 {_percentile(latencies, 50):.2f}초, "
+        f"p95 {_percentile(latencies, 95):.2f}초, 최대 {max(latencies, default=0.0):.2f}초"
+    )
+
+    cache = get_cache()
+    if cache:
+        st = cache.stats
+        print(f"   HTML 캐시: hit {st['hit']}, 304 재검증 {st['revalidated']}, miss {st['miss']}")
+    report_prompt_savings()
+    summary_cache = get_summary_cache()
+    if summary_cache is not None:
+        summary_cache.report()
+    if story_clusters_enabled():
+        get_story_index().report()
+
+    ledger.report()
+
+    print("\n✅ 파이프라인 모드 완료")
+    print(f"   DB 저장: {progress['saved']}건 (실패 {progress['failed']}건), 그룹 수: {len(all_groups)}")
+    print(f"   저장 파일: {output_file}")
+
+    return {
+        "articles": len(articles),
+        "saved": progress["saved"],
+        "failed": progress["failed"],
+        "groups": len(all_groups),
+    }
@@ -0,0 +1,204 @@
+# query_velocity.py
+"""
+키워드별 기사 발생 속도를 학습해서 검색 예산(display / API 호출)을 나눠주는 스케줄러
+
+모든 키워드를 같은 display 로 매번 검색하면
+- 하루 2건 나오는 소형주도 실행마다 호출 1회씩 씀 (대부분 새 기사 0건)
+- 하루 500건 나오는 대형주는 display 를 넘게 쌓여서 (커서가 최신 기사로 넘어가면서) 중간 기사를 놓침
+적응형 모드 (NAVER_ADAPTIVE=1 또는 run_pipeline.py --adaptive-polling) 에서는:
+
+- 속도 추정 (시간당 기사 수, EWMA):
+    지난 검색 이후 경과 시간 대비 새 기사 수 (예산 안에서 이전 기사까지 닿았을 때)
+    예산을 다 채웠으면(더 있었을 수 있음) 받은 기사들의 pubDate 간격으로 추정하고, 이전 값보다 낮추지 않음
+- 예산: 예상 새 기사 수 (속도 × 경과 시간) × SAFETY_FACTOR + 몰림 여유(√예상 × BURST_SIGMAS) 를 담을 호출 수,
+  display 는 그 호출 수로 받을 수 있는 만큼 (호출 1회에 100건까지 같은 비용), 최대 MAX_DISPLAY
+- 예상 새 기사가 MIN_EXPECTED_NEW 미만이면 이번 실행은 건너뜀
+  (단 MAX_POLL_GAP_HOURS 가 지나면 무조건 검색 → 조용한 키워드도 놓치지 않음, 커서가 그 사이 기사를 받아옴)
+- 예상 새 기사가 많은 키워드부터 검색 / 기록 → 파이프라인 모드에서 바쁜 키워드 기사가 먼저 크롤링됨
+- 호출 예산(남은 일일 한도, CALLS_PER_RUN)이 모자라면 키워드마다 첫 페이지는 주고 남는 호출을 우선순위대로
+처음 보는 키워드는 기본 display 로 검색해서 속도를 잼. 상태는 VELOCITY_FILE 에 저장 (커서처럼 결과를 다 쓴 뒤에).
+새 기사 수는 지난 검색에서 본 가장 최신 pubDate 이후 것만 셈
+(끝까지 처리 못 한 기사 때문에 커서가 뒤에 머물러서 다시 받은 기사는 빼고).
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+from metrics import vprint
+
+VELOCITY_FILE = "step1_query_velocity.json"
+
+EWMA_ALPHA = 0.3            # 새 관측값 반영 비율
+SAFETY_FACTOR = 1.5         # 예상 새 기사 수에 곱하는 여유
+BURST_SIGMAS = 3.0          # 기사가 몰려 나오는 경우 여유 (포아송 표준편차 √예상 의 배수)
+MAX_DISPLAY = 500           # 키워드 하나에 한 번에 쓰는 최대 기사 수 (= 최대 5회 호출)
+MIN_EXPECTED_NEW = 0.5      # 예상 새 기사가 이보다 적으면 이번 실행은 건너뜀
+MAX_POLL_GAP_HOURS = 6.0    # 아무리 조용해도 이 간격으로는 검색
+MIN_WINDOW_HOURS = 1 / 60   # 속도 계산할 때 최소 시간 창 (1분, 0으로 나누기 방지)
+PAGE_SIZE = 100             # 호출 1회당 최대 기사 수 (step1 NAVER_MAX_DISPLAY)
+CALLS_PER_RUN = None        # 실행 1회 호출 예산 (None 이면 남은 일일 한도만 봄)
+
+_adaptive = os.getenv("NAVER_ADAPTIVE") == "1"
+
+
+def adaptive_enabled() -> bool:
+    return _adaptive
+
+
+def set_adaptive(flag: bool):
+    global _adaptive
+    _adaptive = bool(flag)
+
+
+def pages_for(display: int) -> int:
+    return max(1, math.ceil(display / PAGE_SIZE))
+
+
+class QueryVelocity:
+    """
+    구조: {query: {"rate": 시간당 기사 수, "last_poll": 마지막 검색 시각(epoch), "polls": 검색 횟수,
+                   "last_new": 마지막 검색의 새 기사 수, "saturated": 예산을 다 채웠는지,
+                   "newest": 지금까지 본 가장 최신 pubDate (ISO)}}
+    """
+
+    def __init__(self, path: str = VELOCITY_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.state = json.load(f)
+            except (OSError, ValueError):
+                self.state = {}
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            data = json.dumps(self.state, ensure_ascii=False, indent=2)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(data)
+
+    def expected_new(self, query: str, now: float):
+        """지금 검색하면 나올 것으로 보이는 새 기사 수 (처음 보는 키워드면 None)"""
+        st = self.state.get(query)
+        if not st:
+            return None
+        return st["rate"] * max(0.0, now - st["last_poll"]) / 3600
+
+    def plan(self, queries, default_display: int, call_budget: int = None, now: float = None):
+        """
+        이번 실행에서 검색할 키워드와 키워드별 display.
+        return: (budgets {query: display} 우선순위 순서, 건너뛴 키워드 {query: 사유 "quiet" / "budget"})
+        """
+        now = time.time() if now is None else now
+        entries = []   # (우선순위, 원래 순서, query, display)
+        skipped = {}
+        with self.lock:
+            for order, q in enumerate(queries):
+                expected = self.expected_new(q, now)
+                if expected is None:
+                    # 처음 보는 키워드는 먼저, 기본 display 로 속도를 잼
+                    entries.append((math.inf, order, q, default_display))
+                    continue
+                gap_hours = (now - self.state[q]["last_poll"]) / 3600
+                if expected < MIN_EXPECTED_NEW and gap_hours < MAX_POLL_GAP_HOURS:
+                    skipped[q] = "quiet"
+                    continue
+                needed = expected * SAFETY_FACTOR + BURST_SIGMAS * math.sqrt(expected)
+                display = min(MAX_DISPLAY, pages_for(needed) * PAGE_SIZE)
+                entries.append((expected, order, q, display))
+        entries.sort(key=lambda e: (-e[0], e[1]))
+
+        if call_budget is not None:
+            # 키워드마다 첫 페이지(호출 1회)는 보장, 남는 호출은 예상 새 기사가 많은 키워드부터
+            if len(entries) > call_budget:
+                skipped.update((e[2], "budget") for e in entries[max(0, call_budget):])
+                entries = entries[:max(0, call_budget)]
+            spare = call_budget - len(entries)
+            trimmed = []
+            for expected, order, q, display in entries:
+                extra = min(pages_for(display) - 1, spare)
+                spare -= extra
+                trimmed.append((expected, order, q, min(display, (1 + extra) * PAGE_SIZE)))
+            entries = trimmed
+
+        return {q: display for _, _, q, display in entries}, skipped
+
+    def observe(self, query: str, fetched: int, pub_dates, budget: int, polled_at: float):
+        """
+        검색 결과 반영. fetched: 커서 이후 받은 기사 수, pub_dates: 그 기사들의 pubDate(datetime, 못 읽으면 None)
+        지난 검색에서 이미 본 기사(가장 최신 pubDate 이하)는 새 기사로 안 셈.
+        """
+        saturated = fetched >= budget
+        with self.lock:
+            st = self.state.get(query)
+            newest = datetime.fromisoformat(st["newest"]) if st and st.get("newest") else None
+            dated = [p for p in pub_dates if p is not None]
+            seen_before = sum(1 for p in dated if newest is not None and p <= newest)
+            new_count = fetched - seen_before
+            pubs = sorted(p for p in dated if newest is None or p > newest)
+            if dated and (newest is None or max(dated) > newest):
+                newest = max(dated)
+            if st and not saturated:
+                # 이전 기사까지 닿았음 → 경과 시간 동안 새 기사 전부를 본 것
+                hours = max(MIN_WINDOW_HOURS, (polled_at - st["last_poll"]) / 3600)
+                observed = new_count / hours
+            elif len(pubs) >= 2:
+                # 처음이거나 예산이 모자랐음 → 받은 기사들의 pubDate 간격으로
+                span = max(MIN_WINDOW_HOURS, (pubs[-1] - pubs[0]).total_seconds() / 3600)
+                observed = (len(pubs) - 1) / span
+            elif st:
+                observed = st["rate"]
+            else:
+                observed = new_count / MAX_POLL_GAP_HOURS
+
+            if st is None:
+                rate = observed
+            else:
+                rate = EWMA_ALPHA * observed + (1 - EWMA_ALPHA) * st["rate"]
+                if saturated:
+                    # 예산이 모자랐으면 실제 속도는 더 높음 → 추정치를 낮추지 않음
+                    rate = max(rate, observed, st["rate"])
+            self.state[query] = {
+                "rate": round(rate, 4),
+                "last_poll": polled_at,
+                "polls": (st or {}).get("polls", 0) + 1,
+                "last_new": new_count,
+                "saturated": saturated,
+                "newest": newest.isoformat() if newest else None,
+            }
+
+    def report(self, budgets: dict, skipped):
+        print("\n=== 적응형 검색 예산 (키워드별) ===")
+        now = time.time()
+        for q, display in budgets.items():
+            st = self.state.get(q)
+            if st:
+                vprint(f"  [{q}] 시간당 {st['rate']:.2f}건, 예상 새 기사 {self.expected_new(q, now):.1f}건 → display {display}")
+            else:
+                vprint(f"  [{q}] 처음 검색 → display {display}")
+        for reason, label in (("quiet", "새 기사가 없을 것으로 보고"), ("budget", "호출 예산이 모자라서")):
+            queries = [q for q, r in skipped.items() if r == reason]
+            if queries:
+                shown = ", ".join(queries[:10]) + (f" 외 {len(queries) - 10}개" if len(queries) > 10 else "")
+                print(f"  ⏭ {label} 건너뜀 {len(queries)}개: {shown}")
+        calls = sum(pages_for(d) for d in budgets.values())
+        print(f"  검색 {len(budgets)}개 (최대 호출 {calls}회), 건너뜀 {len(skipped)}개")
+
+
+_velocity = None
+_init_lock = threading.Lock()
+
+
+def get_query_velocity() -> QueryVelocity:
+    global _velocity
+    with _init_lock:
+        if _velocity is None:
+            _velocity = QueryVelocity()
+        return _velocity
@@ -0,0 +1,64 @@
+# rate_limiter.py
+"""
+여러 단계에서 같이 쓰는 요청 속도 제한 / 재시도 도우미
+
+- TokenBucket   : 초당 rate 개씩 토큰이 차는 버킷 (스레드 안전)
+- backoff_delay : 지수 백오프 + full jitter 대기 시간 계산
+"""
+
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    초당 rate 개 요청, 순간 최대 capacity 개까지 허용하는 토큰 버킷.
+    acquire()는 토큰이 생길 때까지 해당 스레드만 기다리게 함
+    (락은 토큰 계산할 때만 잡고, sleep 은 락 밖에서 하므로 다른 스레드는 안 막힘).
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        토큰을 가져갈 수 있을 때까지 대기.
+        return: 실제로 기다린 시간(초)
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0, retry_after=None) -> float:
+    """
+    attempt(0부터)번째 재시도 전에 기다릴 시간.
+    - 서버가 Retry-After 를 주면 그 값을 우선 사용
+    - 아니면 [0, min(cap, base * 2^attempt)] 구간에서 랜덤 (full jitter)
+      → 여러 스레드가 동시에 429를 맞아도 재시도 시점이 흩어짐
+    """
+    if retry_after is not None:
+        try:
+            return min(cap, max(0.0, float(retry_after)))
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0.0, min(cap, base * (2 ** attempt)))
@@ -16,17 +16,55 @@
 
 5) step5_save_to_db.py
    - step4 결과를 MariaDB(news_articles 테이블)에 저장
+
+중간 파일 형식은 PIPELINE_FORMAT 환경변수로 선택 (json / jsonl / jsonl.gz, jsonl_io.py 참고).
+
+실행 모드
+  python run_pipeline.py                     # 순차 모드: 1~5단계를 하나씩 (기존 방식)
+  python run_pipeline.py --mode pipeline     # 파이프라인 모드: 단계 사이를 큐로 연결해서 동시에 (pipeline_stream.py)
+      --crawl-workers / --summary-workers / --score-workers / --save-workers / --queue-size / --summary-batch
+  python run_pipeline.py --resume            # 중간에 실패한 실행 이어서 (checkpoint_ledger.py)
+  python run_pipeline.py --quiet             # 기사별 출력 생략
+  python run_pipeline.py --steps 1-2         # 일부 단계만 (안 쓰는 단계 모듈은 import 도 안 함)
+  python run_pipeline.py --mode daemon --interval 300 --health-port 8787
+                                             # 상주 모드: 모델/커넥션 유지, 주기적으로 새 기사만 (pipeline_daemon.py)
+  python run_pipeline.py --mode worker --queries-file queries.txt
+                                             # 작업 큐 모드: 키워드 샤드를 DB 큐에서 나눠 가져가서 처리 (work_queue.py)
+      여러 프로세스 / 서버에서 같이 띄우면 됨. --wait (계속 대기), --interval 3600 (끝난 샤드를 주기적으로 다시),
+      --shard-size, --requeue (끝난 샤드 전부 다시)
+  --queries-file 은 모든 모드에서 사용 가능 (한 줄에 키워드 하나, # 주석)
+  python run_pipeline.py --grouping minhash  # 중복 그룹핑을 LLM 대신 로컬 MinHash/LSH 로 (near_dup.py, 모든 모드)
+  python run_pipeline.py --adaptive-polling  # 키워드별 기사 발생 속도로 검색 예산 배분 (query_velocity.py, 모든 모드)
+  python run_pipeline.py --story-clusters    # step4 에서 실행 간에 이어지는 story_id 붙이기 (story_index.py, 모든 모드)
+  python run_pipeline.py --no-precompress    # step3 본문 사전 압축(상투 문구 제거 + 주요 문장 발췌) 끄고 앞부분만 자르기
+                                             # (text_compress.py, 모든 모드)
+  PIPELINE_FORMAT=jsonl python run_pipeline.py --bounded
+                                             # 메모리 제한 모드: 본문은 본문 보관소에 두고 참조만 넘김,
+                                               step3 은 SUMMARY_WINDOW 건씩 (spill_store.py, 대량 backfill 용)
+
+단계가 끝날 때마다 지금까지의 최대 메모리(RSS)도 같이 출력.
+실행이 끝나면(실패해도) 단계별 지연 시간/카운터를 pipeline_metrics.prom(Prometheus) 과
+pipeline_run_report.json 으로 저장 (metrics.py).
 """
 
+import argparse
+import importlib
+import os
 import time
 import traceback
 
-# 👇 실제 파일 이름 기준 import
-from step1_naver_articles import main as step1_main
-from step2_articles_with_content import main as step2_main
-from step3_articles_with_summary_and_groups import main as step3_main
-from step4_articles_with_sentiment import main as step4_main
-from step5_save_to_db import main as step5_main  # ✅ 추가
+import metrics
+import jsonl_io
+from checkpoint_ledger import get_ledger, set_resume
+from jsonl_io import step_file
+from near_dup import GROUPING_MODES, set_grouping_mode
+from query_velocity import set_adaptive
+from story_index import set_story_clusters
+from text_compress import set_precompress
+from spill_store import set_bounded
+
+# 각 단계 모듈은 실제로 돌릴 때 import (step3 의 openai, step4 의 transformers/torch 가 무거움)
+# → --steps 1 처럼 일부만 돌릴 때 안 쓰는 단계의 import / 키 확인 비용이 없음
 
 
 def run_step(step_func, step_name: str):
@@ -41,49 +79,245 @@ def run_step(step_func, step_name: str):
     try:
         step_func()
     except Exception:
+        metrics.inc("step_failures_total", step=step_name.split(" - ")[0])
         print(f"\n💥 {step_name} 실행 중 오류 발생!")
         traceback.print_exc()
         # 여기서 바로 종료
         raise
     else:
         end = time.time()
-        print(f"\n✅ {step_name} 완료 (소요 시간: {end - start:.2f}초)")
+        metrics.observe("step_seconds", end - start, step=step_name.split(" - ")[0])
+        peak_mb = metrics.record_peak_rss()
+        peak = f", 최대 메모리 {peak_mb:.0f}MB" if peak_mb is not None else ""
+        print(f"\n✅ {step_name} 완료 (소요 시간: {end - start:.2f}초{peak})")
+
+
+# (체크포인트 키, 모듈 이름(👇 실제 파일 이름 기준), 표시 이름, 결과 파일)
+STEPS = [
+    ("step1", "step1_naver_articles", "STEP 1 - 네이버 뉴스 검색 (step1_naver_articles.py)",
+     step_file("step1_naver_articles")),
+    ("step2", "step2_articles_with_content", "STEP 2 - 기사 본문 크롤링 (step2_articles_with_content.py)",
+     step_file("step2_articles_with_content")),
+    ("step3", "step3_articles_with_summary_and_groups",
+     "STEP 3 - LLM 요약 + 중복 그룹핑 (step3_articles_with_summary_and_groups.py)",
+     step_file("step3_articles_with_summary_and_groups")),
+    ("step4", "step4_articles_with_sentiment", "STEP 4 - 감정 점수(0~100) 계산 (step4_articles_with_sentiment.py)",
+     step_file("step4_articles_with_sentiment")),
+    # 5단계 ✅ DB 저장
+    ("step5", "step5_save_to_db", "STEP 5 - DB 저장 (step5_save_to_db.py)", None),
+]
+ALL_STEPS = [key for key, _, _, _ in STEPS]
+
+
+def load_step(module_name: str):
+    """단계 모듈을 처음 필요할 때 import 해서 main 함수 리턴"""
+    with metrics.timed("import_seconds", module=module_name):
+        module = importlib.import_module(module_name)
+    return module.main
 
 
-def main():
+def parse_steps(spec: str):
     """
-    전체 파이프라인 5단계 순차 실행
+    --steps 값 → 단계 키 목록 (실행 순서는 항상 1→5).
+    예) "all", "1", "1,2", "2-4", "3-"
     """
-    # 1단계
-    run_step(step1_main, "STEP 1 - 네이버 뉴스 검색 (step1_naver_articles.py)")
+    if not spec or spec == "all":
+        return list(ALL_STEPS)
+    selected = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            lo, hi = int(lo or 1), int(hi or len(STEPS))
+        else:
+            lo = hi = int(part)
+        if not (1 <= lo <= hi <= len(STEPS)):
+            raise argparse.ArgumentTypeError(f"잘못된 단계 범위: {part} (1~{len(STEPS)})")
+        selected.update(f"step{i}" for i in range(lo, hi + 1))
+    return [key for key in ALL_STEPS if key in selected]
 
-    # 2단계
-    run_step(step2_main, "STEP 2 - 기사 본문 크롤링 (step2_articles_with_content.py)")
 
-    # 3단계
-    run_step(
-        step3_main,
-        "STEP 3 - LLM 요약 + 중복 그룹핑 (step3_articles_with_summary_and_groups.py)",
-    )
+def run_sequential(steps=None, resume: bool = False):
+    """
+    전체 파이프라인 5단계 순차 실행 (steps 를 주면 그 단계만).
+    resume=True 면 지난번에 중간에 멈춘 실행을 이어서:
+      - 이미 끝난 단계(결과 파일이 남아 있는 경우)는 건너뜀
+        (step1 을 다시 돌리면 그 사이 새 기사로 결과 파일이 바뀜 → 건너뛰고 남은 단계만.
+         step1 의 인덱스 / 커서는 step5 가 성공해야 반영되므로 그 전에 멈춰도 다음 실행에서 같은 기사를 다시 받음)
+      - 다시 도는 단계 안에서도 기사별 체크포인트에 있는 작업은 건너뜀
+    """
+    steps = steps or ALL_STEPS
+    ledger = get_ledger()
+    finished = ledger.finished_steps() if resume else set()
+    if not resume:
+        ledger.reset_run()
 
-    # 4단계
-    run_step(
-        step4_main,
-        "STEP 4 - 감정 점수(0~100) 계산 (step4_articles_with_sentiment.py)",
-    )
+    for key, module_name, name, output in STEPS:
+        if key not in steps:
+            continue
+        if key in finished and (output is None or os.path.exists(output)):
+            print(f"\n⏭ {name} 건너뜀 (지난 실행에서 완료)")
+            continue
+        run_step(load_step(module_name), name)
+        ledger.mark_step_done(key)
 
-    # 5단계 ✅ DB 저장
-    run_step(
-        step5_main,
-        "STEP 5 - DB 저장 (step5_save_to_db.py)",
-    )
+    # 5단계까지 다 끝났으면 → 다음 --resume 은 이어갈 실행이 없음
+    if set(ALL_STEPS) <= ledger.finished_steps():
+        ledger.reset_run()
 
     print("\n" + "=" * 80)
-    print("🎉 전체 파이프라인 완료!")
-    print("   최종 JSON: step4_articles_with_sentiment.json")
+    if steps == ALL_STEPS:
+        print("🎉 전체 파이프라인 완료!")
+    else:
+        print(f"🎉 선택한 단계 완료: {', '.join(steps)}")
+    print(f"   최종 결과 파일: {step_file('step4_articles_with_sentiment')}")
     print("   DB 테이블: test.news_articles (로컬 기준)")
     print("=" * 80)
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="뉴스 감정 분석 파이프라인")
+    parser.add_argument("--mode", choices=["sequential", "pipeline", "daemon", "worker"], default="sequential",
+                        help="sequential: 단계별 순차 실행 / pipeline: 단계 사이를 큐로 연결해 동시 실행 "
+                             "/ daemon: pipeline 모드를 주기적으로 반복 (상주) "
+                             "/ worker: DB 작업 큐에서 키워드 샤드를 가져와 처리 (여러 프로세스 / 서버)")
+    parser.add_argument("--steps", type=parse_steps, default=list(ALL_STEPS),
+                        help='순차 모드에서 돌릴 단계 (예: "1", "1,2", "2-4", "3-", 기본 all)')
+    parser.add_argument("--resume", action="store_true",
+                        help="중단된 실행 이어서 하기 (끝난 단계 / 체크포인트에 있는 기사별 작업은 건너뜀)")
+    parser.add_argument("--grouping", choices=GROUPING_MODES,
+                        help="중복 기사 그룹핑 방식 (llm: 요약 프롬프트에서 같이 / minhash: 로컬 MinHash+LSH, "
+                             "기본은 GROUPING_MODE 환경변수 또는 llm)")
+    parser.add_argument("--adaptive-polling", action="store_true",
+                        help="키워드별 기사 발생 속도를 학습해서 검색 display / 호출을 배분 "
+                             "(조용한 키워드는 건너뛰기도 함, NAVER_ADAPTIVE=1 과 같음)")
+    parser.add_argument("--story-clusters", action="store_true",
+                        help="기사마다 문장 임베딩으로 이전 실행까지 이어지는 스토리 번호(story_id)를 붙임 "
+                             "(STORY_CLUSTERS=1 과 같음)")
+    parser.add_argument("--no-precompress", action="store_true",
+                        help="step3 에서 본문을 상투 문구 제거 + 주요 문장 발췌로 줄이지 않고 앞부분만 잘라 보냄 "
+                             "(PRECOMPRESS=0 과 같음)")
+    parser.add_argument("--bounded", action="store_true",
+                        help="메모리 제한 모드 (본문은 본문 보관소에 두고 참조만 넘김, 요약은 창 단위). "
+                             "PIPELINE_FORMAT=jsonl 또는 jsonl.gz 필요")
+    parser.add_argument("--quiet", action="store_true",
+                        help="기사별 콘솔 출력 생략 (PIPELINE_VERBOSE=0 과 같음, 단계 요약은 출력)")
+    parser.add_argument("--metrics-file", default=metrics.PROMETHEUS_FILE,
+                        help="Prometheus 텍스트 파일 경로 (빈 문자열이면 저장 안 함)")
+    parser.add_argument("--report-file", default=metrics.REPORT_FILE,
+                        help="JSON 실행 리포트 경로 (빈 문자열이면 저장 안 함)")
+    parser.add_argument("--queries", type=lambda v: [q.strip() for q in v.split(",") if q.strip()],
+                        help="검색 키워드 (쉼표 구분, 기본은 step1 의 QUERIES)")
+    parser.add_argument("--queries-file", help="검색 키워드 파일 (한 줄에 하나, # 주석)")
+    # 작업 큐(worker) 모드 옵션
+    parser.add_argument("--shard-size", type=int, help="샤드 하나의 키워드 수 (기본 work_queue.SHARD_SIZE)")
+    parser.add_argument("--requeue", action="store_true", help="끝난 샤드도 전부 다시 처리 대기로")
+    parser.add_argument("--wait", action="store_true", help="가져갈 샤드가 없어도 종료하지 않고 대기")
+    # 데몬 모드 옵션 (안 주면 pipeline_daemon.py 기본값)
+    parser.add_argument("--interval", type=float,
+                        help="데몬 모드 사이클 간격(초) / 워커 모드: 끝난 샤드를 다시 처리할 간격(초, --wait 포함)")
+    parser.add_argument("--health-port", type=int, help="데몬 모드 health 엔드포인트 포트")
+    # 파이프라인 / 데몬 모드 옵션 (안 주면 pipeline_stream.py 기본값)
+    parser.add_argument("--crawl-workers", type=int)
+    parser.add_argument("--summary-workers", type=int)
+    parser.add_argument("--score-workers", type=int)
+    parser.add_argument("--save-workers", type=int)
+    parser.add_argument("--queue-size", type=int)
+    parser.add_argument("--summary-batch", type=int)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.resume:
+        set_resume(True)
+    if args.quiet:
+        metrics.set_verbose(False)
+    if args.grouping:
+        set_grouping_mode(args.grouping)
+    if args.adaptive_polling:
+        set_adaptive(True)
+    if args.story_clusters:
+        set_story_clusters(True)
+    if args.no_precompress:
+        set_precompress(False)
+    if args.bounded:
+        if jsonl_io.PIPELINE_FORMAT == "json":
+            # json 은 파일 전체를 한 번에 읽고 써서 창 단위로 나눠도 메모리가 줄지 않음
+            raise SystemExit("❌ --bounded 는 PIPELINE_FORMAT=jsonl 또는 jsonl.gz 와 같이 써야 합니다")
+        set_bounded(True)
+    if args.queries_file:
+        from step1_naver_articles import load_queries
+
+        args.queries = load_queries(args.queries_file)
+        if not args.queries:
+            raise SystemExit(f"❌ {args.queries_file} 에 키워드가 없습니다")
+        print(f"🔎 키워드 {len(args.queries)}개 ({args.queries_file})")
+
+    status = "failed"
+    try:
+        if args.mode == "sequential":
+            if args.queries:
+                import step1_naver_articles
+
+                step1_naver_articles.QUERIES = args.queries
+            run_sequential(steps=args.steps, resume=args.resume)
+        else:
+            options = {
+                k: v for k, v in (
+                    ("queries", args.queries),
+                    ("crawl_workers", args.crawl_workers),
+                    ("summary_workers", args.summary_workers),
+                    ("score_workers", args.score_workers),
+                    ("save_workers", args.save_workers),
+                    ("queue_size", args.queue_size),
+                    ("summary_batch", args.summary_batch),
+                ) if v is not None
+            }
+            if args.mode == "pipeline":
+                from pipeline_stream import run_pipelined
+
+                run_step(
+                    lambda: run_pipelined(**options),
+                    "PIPELINE - 검색 → 크롤링 → 요약 → 감정분석 → DB 저장 동시 실행 (pipeline_stream.py)",
+                )
+            elif args.mode == "worker":
+                from work_queue import run_worker
+
+                if args.shard_size is not None:
+                    options["shard_size"] = args.shard_size
+                run_worker(
+                    requeue=args.requeue,
+                    wait=args.wait or args.interval is not None,
+                    repoll_after=args.interval,
+                    metrics_file=args.metrics_file,
+                    report_file=args.report_file,
+                    **options,
+                )
+            else:
+                from pipeline_daemon import run_daemon
+
+                if args.interval is not None:
+                    options["interval"] = args.interval
+                if args.health_port is not None:
+                    options["health_port"] = args.health_port
+                run_daemon(metrics_file=args.metrics_file, report_file=args.report_file, **options)
+        status = "ok"
+    finally:
+        # 실패한 실행도 어디까지 갔는지 볼 수 있게 항상 내보냄
+        peak_mb = metrics.record_peak_rss()
+        metrics.print_summary()
+        if peak_mb is not None:
+            print(f"🧠 최대 메모리(RSS): {peak_mb:.0f}MB")
+        metrics.export(
+            args.metrics_file,
+            args.report_file,
+            extra={"status": status, "mode": args.mode, "resume": args.resume, "args": vars(args)},
+        )
+        print(f"📈 메트릭 저장: {args.metrics_file or '-'}, 실행 리포트: {args.report_file or '-'}")
+
+
 if __name__ == "__main__":
     main()
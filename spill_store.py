@@ -0,0 +1,116 @@
+# spill_store.py
+"""
+메모리 제한 모드 (PIPELINE_BOUNDED=1 또는 run_pipeline.py --bounded) 용 기사 본문 보관소 (SQLite)
+
+과거 뉴스를 몰아서 처리(backfill)하면 기사 본문이 단계마다 레코드에 복사돼서 메모리가 모자람.
+이 모드에서는:
+- step2 가 본문을 여기에 저장하고 레코드에는 content 대신 content_ref(본문 해시) / content_len 만 남김
+  → 중간 파일과 각 단계가 들고 있는 레코드가 작아짐 (같은 본문은 한 번만 저장)
+- 본문이 필요한 곳만 article_content() 로 꺼내 씀 (step3 은 앞부분만, step5 는 전체)
+- step3 은 기사를 SUMMARY_WINDOW 건씩 나눠서 요약 (창 단위로 메모리에서 내려감)
+중간 파일은 jsonl / jsonl.gz 형식이어야 함 (json 은 파일 전체를 한 번에 읽고 씀).
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+
+SPILL_FILE = "article_bodies.sqlite3"
+
+_bounded = os.getenv("PIPELINE_BOUNDED") == "1"
+
+
+def bounded_enabled() -> bool:
+    return _bounded
+
+
+def set_bounded(flag: bool):
+    global _bounded
+    _bounded = bool(flag)
+
+
+def content_ref(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+class SpillStore:
+    def __init__(self, path: str = SPILL_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bodies (
+                ref    TEXT PRIMARY KEY,
+                length INTEGER NOT NULL,
+                text   TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def put(self, text: str) -> str:
+        """본문 저장 → ref. 바로 커밋 (PIPELINE_FOLLOW 로 다음 단계가 다른 프로세스에서 바로 읽어도 보이게)"""
+        ref = content_ref(text)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO bodies (ref, length, text) VALUES (?, ?, ?)", (ref, len(text), text)
+            )
+            self.conn.commit()
+        return ref
+
+    def get(self, ref: str, limit: int = None):
+        """본문 (limit 을 주면 앞 limit 글자만 읽음). 없으면 None."""
+        with self.lock:
+            if limit is None:
+                row = self.conn.execute("SELECT text FROM bodies WHERE ref = ?", (ref,)).fetchone()
+            else:
+                row = self.conn.execute("SELECT substr(text, 1, ?) FROM bodies WHERE ref = ?", (limit, ref)).fetchone()
+        return row[0] if row else None
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM bodies").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_store = None
+_init_lock = threading.Lock()
+
+
+def get_spill_store() -> SpillStore:
+    global _store
+    if _store is None:
+        with _init_lock:
+            if _store is None:
+                _store = SpillStore()
+    return _store
+
+
+def body_fields(content: str) -> dict:
+    """레코드에 넣을 본문 필드: 보통은 {"content"}, 메모리 제한 모드면 보관소에 넣고 {"content_ref", "content_len"}"""
+    content = content or ""
+    if not _bounded or not content:
+        return {"content": content}
+    return {"content_ref": get_spill_store().put(content), "content_len": len(content)}
+
+
+def carry_body(a) -> dict:
+    """앞 단계 레코드의 본문 필드를 그대로 넘김 (보관소에서 꺼내지 않음)"""
+    if "content_ref" in a:
+        return {"content_ref": a["content_ref"], "content_len": a.get("content_len")}
+    return {"content": a.get("content")}
+
+
+def article_content(a, limit: int = None) -> str:
+    """레코드의 본문 (content 든 content_ref 든). limit 을 주면 앞부분만."""
+    if a.get("content_ref"):
+        return get_spill_store().get(a["content_ref"], limit) or ""
+    content = a.get("content") or ""
+    return content[:limit] if limit is not None else content
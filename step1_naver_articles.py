@@ -1,7 +1,22 @@
+import html
+import html.entities
 import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 import requests
 from bs4 import BeautifulSoup
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+from dedup_index import DedupIndex
+from jsonl_io import step_file, write_articles
+from metrics import inc, timed, vprint
+from query_velocity import CALLS_PER_RUN, adaptive_enabled, get_query_velocity
+from rate_limiter import TokenBucket, backoff_delay
+from url_utils import canonicalize_url
 
 # ================================
 # 1. 네이버 뉴스 API 설정
@@ -24,7 +39,165 @@ naver_headers = {
 }
 
 
-def fetch_naver_news(query: str, display: int = 10, sort: str = "date"):
+# 여기서 검색할 키워드들을 정해줘
+QUERIES = ["삼성전자"]
+# 키워드가 많으면 파일로 (한 줄에 하나, # 뒤는 주석). 지정하면 QUERIES 대신 사용
+QUERIES_FILE = os.getenv("NAVER_QUERIES_FILE")
+DISPLAY = 20  # 키워드당 가져올 기사 개수 (100개 넘으면 start로 페이지 넘겨가며 가져옴)
+
+# 네이버 검색 API 제약: display 최대 100, start 최대 1000
+NAVER_MAX_DISPLAY = 100
+NAVER_MAX_START = 1000
+
+# 여러 키워드를 동시에 가져올 때 쓰는 스레드 수 (= 커넥션 풀 크기)
+MAX_WORKERS = 8
+
+# 호출 한도: 하루 25,000회 (네이버 검색 API 기본), 초당 호출 수는 여유 있게 제한
+NAVER_DAILY_QUOTA = 25000
+NAVER_RATE_PER_SEC = 10
+QUOTA_STATE_FILE = "naver_quota_state.json"  # 오늘 사용량을 실행 간에 이어서 세기 위한 파일
+
+# 429 / 5xx 는 지수 백오프로 재시도, 그 외 오류는 해당 키워드만 실패 처리
+RETRY_STATUS = {429, 500, 502, 503, 504}
+MAX_RETRIES = 5
+REQUEST_TIMEOUT = 10  # 초
+
+KST = timezone(timedelta(hours=9))
+
+# 실행 간 중복 제거 인덱스 사용 여부 (dedup_index.sqlite3)
+USE_DEDUP_INDEX = True
+
+# 증분 수집: 키워드별로 마지막으로 본 pubDate / URL 을 저장해두고, 다음 실행에서는 그 이후 기사만 내려보냄
+INCREMENTAL = True
+CURSOR_FILE = "step1_query_cursors.json"
+# 순차 모드: step1 이 끝날 때가 아니라 step5(DB 저장)까지 끝나야 인덱스 / 커서를 저장
+# → step1 은 계산에 필요한 내용을 이 파일에 남기고, step5 가 성공하면 finalize_pending_commit() 으로 반영
+#   (본문 / 요약이 빈 기사는 그때 빼서 다음 실행에서 다시 받음)
+PENDING_COMMIT_FILE = "step1_pending_commit.json"
+
+_session = None
+_rate_limiter = None
+_init_lock = threading.Lock()  # 워커 스레드들이 동시에 처음 호출해도 하나만 만들어지게
+
+
+class NaverAPIError(RuntimeError):
+    """재시도해도 복구 안 되는 네이버 API 오류. 해당 키워드만 실패 처리하고 나머지는 계속 진행."""
+
+
+class NaverQuotaExceeded(NaverAPIError):
+    """오늘 사용할 수 있는 호출 수를 다 씀."""
+
+
+class NaverRateLimiter:
+    """
+    네이버 API 호출 스케줄러.
+    - 초당 호출 수: TokenBucket 으로 제한 (모든 스레드 공용)
+    - 하루 호출 수: QUOTA_STATE_FILE 에 날짜별로 저장해서 실행 간에 이어서 셈
+    - 키워드별 호출/재시도/실패 횟수 집계 → report() 로 출력
+    """
+
+    def __init__(self, rate_per_sec=NAVER_RATE_PER_SEC, daily_quota=NAVER_DAILY_QUOTA,
+                 state_file=QUOTA_STATE_FILE):
+        self.bucket = TokenBucket(rate_per_sec)
+        self.daily_quota = daily_quota
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.today = datetime.now(KST).strftime("%Y-%m-%d")
+        self.used_today = self._load_used_today()
+        self.per_query = {}
+
+    def _load_used_today(self) -> int:
+        if not self.state_file or not os.path.exists(self.state_file):
+            return 0
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        return int(state.get("used", 0)) if state.get("date") == self.today else 0
+
+    def save(self):
+        if not self.state_file:
+            return
+        with self.lock:
+            state = {"date": self.today, "used": self.used_today}
+        with open(self.state_file, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+
+    def _stats(self, query: str) -> dict:
+        return self.per_query.setdefault(
+            query, {"calls": 0, "retries": 0, "waited_sec": 0.0, "error": None}
+        )
+
+    def acquire(self, query: str):
+        """호출 1회 전에 반드시 호출. 한도를 넘기면 NaverQuotaExceeded."""
+        with self.lock:
+            today = datetime.now(KST).strftime("%Y-%m-%d")
+            if today != self.today:
+                self.today = today
+                self.used_today = 0
+            if self.used_today >= self.daily_quota:
+                raise NaverQuotaExceeded(
+                    f"일일 호출 한도 초과 ({self.used_today}/{self.daily_quota})"
+                )
+            self.used_today += 1
+            self._stats(query)["calls"] += 1
+
+        waited = self.bucket.acquire()
+        if waited:
+            with self.lock:
+                self._stats(query)["waited_sec"] += waited
+
+    def remaining(self) -> int:
+        """오늘 남은 호출 수"""
+        with self.lock:
+            return max(0, self.daily_quota - self.used_today)
+
+    def record_retry(self, query: str):
+        with self.lock:
+            self._stats(query)["retries"] += 1
+
+    def record_failure(self, query: str, error: Exception):
+        with self.lock:
+            self._stats(query)["error"] = str(error)
+
+    def report(self):
+        print("\n=== 네이버 API 호출량 (키워드별) ===")
+        for query, st in self.per_query.items():
+            status = f"❌ {st['error']}" if st["error"] else "✅"
+            print(
+                f"  [{query}] 호출 {st['calls']}회, 재시도 {st['retries']}회, "
+                f"대기 {st['waited_sec']:.1f}초 {status}"
+            )
+        print(f"  오늘 사용량: {self.used_today}/{self.daily_quota}")
+
+
+def get_rate_limiter() -> NaverRateLimiter:
+    global _rate_limiter
+    with _init_lock:
+        if _rate_limiter is None:
+            _rate_limiter = NaverRateLimiter()
+        return _rate_limiter
+
+
+def get_session() -> requests.Session:
+    """
+    keep-alive 커넥션을 재사용하기 위한 공용 Session.
+    매 요청마다 TCP/TLS 연결을 새로 맺지 않도록 풀 크기를 MAX_WORKERS에 맞춤.
+    """
+    global _session
+    with _init_lock:
+        if _session is not None:
+            return _session
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session = session
+        return _session
+
+
+def fetch_naver_news(query: str, display: int = 10, sort: str = "date", start: int = 1, session=None):
     """
     네이버 뉴스 API로 특정 키워드의 뉴스 목록 가져오기.
     return: items 리스트 (네이버 원본 JSON의 items 필드)
@@ -32,108 +205,510 @@ def fetch_naver_news(query: str, display: int = 10, sort: str = "date"):
     params = {
         "query": query,
         "display": display,
-        "sort": "date",  # "date": 최신순, "sim": 정확도순
+        "start": start,
+        "sort": sort,  # "date": 최신순, "sim": 정확도순
     }
 
-    res = requests.get(NAVER_URL, headers=naver_headers, params=params)
-    print(f"[{query}] Naver API Status:", res.status_code)
+    limiter = get_rate_limiter()
+    http = session if session is not None else requests
+
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire(query)
+        try:
+            with timed("naver_request_seconds"):
+                res = http.get(NAVER_URL, headers=naver_headers, params=params, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            # 타임아웃/연결 끊김도 5xx 와 똑같이 재시도
+            status, retry_after, reason = None, None, str(e)
+        else:
+            status, retry_after, reason = res.status_code, res.headers.get("Retry-After"), res.text
+            inc("bytes_fetched_total", len(res.content), source="naver")
+        inc("naver_requests_total", status=status if status is not None else "error")
+        vprint(f"[{query}] Naver API Status:", status, f"(start={start})")
+
+        if status == 200:
+            data = res.json()
+            items = data.get("items", [])
+            vprint(f"[{query}] 원본 기사 개수:", len(items))
+            return items
+
+        if (status is None or status in RETRY_STATUS) and attempt < MAX_RETRIES:
+            delay = backoff_delay(attempt, retry_after=retry_after)
+            limiter.record_retry(query)
+            print(f"[{query}] ⏳ {delay:.1f}초 후 재시도 ({attempt + 1}/{MAX_RETRIES})")
+            time.sleep(delay)
+            continue
+
+        print("네이버 API 호출 실패:", reason)
+        raise NaverAPIError(f"status={status}: {reason[:200]}")
+
+
+# ================================
+# 2. 키워드별 증분 커서 (pubDate 워터마크)
+# ================================
+def item_url(item) -> str:
+    """build_article_list 와 같은 기준: originallink 우선, 없으면 link"""
+    return item.get("originallink") or item.get("link") or ""
+
+
+def parse_pub_date(raw):
+    """네이버 pubDate(예: 'Thu, 28 Nov 2024 09:03:00 +0900') → aware datetime. 못 읽으면 None."""
+    if not raw:
+        return None
+    try:
+        return datetime.strptime(raw.strip(), "%a, %d %b %Y %H:%M:%S %z")
+    except ValueError:
+        return None
+
+
+def load_queries(path: str):
+    """키워드 파일 읽기: 빈 줄 / # 주석은 건너뛰고, 같은 키워드가 또 나오면 처음 것만"""
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            q = line.split("#", 1)[0].strip()
+            if q and q not in queries:
+                queries.append(q)
+    return queries
 
-    if res.status_code != 200:
-        print("네이버 API 호출 실패:", res.text)
-        raise SystemExit()
 
-    data = res.json()
-    items = data.get("items", [])
-    print(f"[{query}] 원본 기사 개수:", len(items))
+def load_cursors(path: str = CURSOR_FILE) -> dict:
+    """
+    구조: {query: {"pub_date": "...ISO...", "urls": [그 pubDate 에 해당하는 URL들]}}
+    같은 초에 나온 기사가 여러 개일 수 있어서 URL 목록도 같이 저장함.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_cursors(cursors: dict, path: str = CURSOR_FILE):
+    if not path:
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cursors, f, ensure_ascii=False, indent=2)
+
+
+def is_already_ingested(item, cursor) -> bool:
+    """커서(이전 실행에서 마지막으로 본 기사)보다 오래됐거나 같은 기사면 True"""
+    if not cursor:
+        return False
+    pub = parse_pub_date(item.get("pubDate"))
+    if pub is None:
+        return False
+    cursor_pub = datetime.fromisoformat(cursor["pub_date"])
+    if pub < cursor_pub:
+        return True
+    return pub == cursor_pub and item_url(item) in cursor.get("urls", [])
+
+
+def advance_cursor(cursor, items):
+    """이번에 새로 받은 items 를 반영한 새 커서 리턴 (새 기사가 없으면 기존 커서 그대로)"""
+    newest = None
+    urls = set()
+    for item in items:
+        pub = parse_pub_date(item.get("pubDate"))
+        if pub is None:
+            continue
+        if newest is None or pub > newest:
+            newest, urls = pub, {item_url(item)}
+        elif pub == newest:
+            urls.add(item_url(item))
+
+    if newest is None:
+        return cursor
+    if cursor:
+        cursor_pub = datetime.fromisoformat(cursor["pub_date"])
+        if newest < cursor_pub:
+            return cursor
+        if newest == cursor_pub:
+            urls |= set(cursor.get("urls", []))
+    return {"pub_date": newest.isoformat(), "urls": sorted(urls)}
+
+
+def fetch_naver_news_paged(query: str, total: int, sort: str = "date", session=None, cursor=None,
+                           incomplete=None):
+    """
+    start/display 를 넘겨가며 한 키워드에 대해 최대 total개까지 페이지 단위로 가져오기.
+    - 한 페이지는 최대 NAVER_MAX_DISPLAY(100)개
+    - 마지막 페이지가 덜 차면 더 이상 결과가 없는 것으로 보고 중단
+    - 중간에 API 오류가 나면 그때까지 받은 페이지만 돌려줌 (다른 키워드는 영향 없음)
+    - cursor 가 있으면(sort=date 일 때만) 이미 받은 기사에 닿는 순간 페이지 넘기기를 멈추고,
+      그 이후(새) 기사만 돌려줌
+    - incomplete(set) 를 주면, 받다 만 키워드를 거기에 넣음 → 이 키워드는 커서를 전진시키면 안 됨
+      (API 오류로 중단 / 커서가 있는데 total·NAVER_MAX_START 에 걸려 커서까지 못 내려감
+       → 커서를 옮기면 사이 기사들을 영영 못 받음)
+    """
+    if sort != "date":
+        cursor = None
+    if session is None:
+        session = get_session()
+
+    items = []
+    start = 1
+    complete = False  # 커서에 닿았거나 결과가 끝까지 나옴
+    while len(items) < total and start <= NAVER_MAX_START:
+        display = min(NAVER_MAX_DISPLAY, total - len(items))
+        try:
+            page = fetch_naver_news(query, display=display, sort=sort, start=start, session=session)
+        except NaverAPIError as e:
+            print(f"[{query}] ⚠️ 조회 중단 (받은 기사 {len(items)}개까지만 사용): {e}")
+            get_rate_limiter().record_failure(query, e)
+            if incomplete is not None:
+                incomplete.add(query)
+            return items
+        new_items = [it for it in page if not is_already_ingested(it, cursor)]
+        items.extend(new_items)
+        if len(new_items) < len(page):
+            print(f"[{query}] 이전 실행에서 받은 기사에 도달 → 페이지 조회 중단")
+            complete = True
+            break
+        if len(page) < display:
+            complete = True
+            break
+        start += display
+    # 처음 보는 키워드(커서 없음)는 최신 total 개만 받는 게 원래 의도라 잘려도 괜찮음
+    if cursor and not complete and incomplete is not None:
+        print(f"[{query}] ⚠️ 이전 실행 위치까지 못 내려감 (받은 기사 {len(items)}개) → 커서 유지")
+        incomplete.add(query)
     return items
 
 
+def fetch_many_queries(queries, per_query: int, sort: str = "date", max_workers: int = MAX_WORKERS,
+                       cursors=None, incomplete=None):
+    """
+    여러 키워드를 스레드 풀 + 공용 Session으로 동시에 페이지네이션 조회.
+    per_query: 키워드당 최대 기사 수 (int) 또는 {query: 최대 기사 수} (적응형 검색 예산)
+    cursors: {query: cursor} 를 주면 키워드별로 새 기사만 가져옴
+    incomplete: set 을 주면 받다 만 키워드를 넣음 (fetch_naver_news_paged 참고)
+    return: {query: items} (queries 순서 그대로)
+    """
+    session = get_session()
+    cursors = cursors or {}
+
+    def _fetch(q):
+        total = per_query[q] if isinstance(per_query, dict) else per_query
+        return fetch_naver_news_paged(
+            q, total=total, sort=sort, session=session, cursor=cursors.get(q), incomplete=incomplete
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(_fetch, queries))
+
+    return dict(zip(queries, results))
+
+
+# 네이버 검색 결과 title/description 에는 <b>, </b> 태그와 &quot; 같은 엔티티만 섞여 나옴
+_NAVER_B_TAG = re.compile(r"</?b>", re.IGNORECASE)
+_ENTITY_REF = re.compile(r"&(#[0-9]+|#[xX][0-9a-fA-F]+|[a-zA-Z][a-zA-Z0-9]*);")
+
+
+def _has_only_plain_entities(text: str) -> bool:
+    """
+    '&' 가 전부 '&이름;' / '&#숫자;' 형태의 올바른 엔티티일 때만 True.
+    'R&D' 처럼 맨 & 나 모르는 엔티티는 BeautifulSoup 이 html.unescape 와 다르게 처리하므로 느린 경로로 보냄.
+    """
+    if "&" not in text:
+        return True
+    refs = _ENTITY_REF.findall(text)
+    if len(refs) != text.count("&"):
+        return False
+    return all(r.startswith("#") or (r + ";") in html.entities.html5 for r in refs)
+
+
+def _clean_html_tags_bs(text: str) -> str:
+    """BeautifulSoup 파서로 태그 제거 (예상 밖의 태그가 섞였을 때만 쓰는 느린 경로)"""
+    return BeautifulSoup(text, "html.parser").get_text()
+
+
 def clean_html_tags(text: str) -> str:
     """
     네이버 검색 결과 title/description에 섞인 <b> 태그 등 제거
+    - <b>/</b> 와 정상 엔티티만 있으면 정규식 + html.unescape 로 바로 처리 (BeautifulSoup 과 같은 결과)
+    - 그 외 태그나 애매한 '&' 가 있으면 BeautifulSoup 으로 처리
     """
     if not text:
         return ""
-    return BeautifulSoup(text, "html.parser").get_text()
+    stripped = _NAVER_B_TAG.sub("", text)
+    if "<" in stripped or not _has_only_plain_entities(stripped):
+        return _clean_html_tags_bs(text)
+    return html.unescape(stripped)
+
+
+def clean_html_batch(texts):
+    """title/description 여러 개를 한 번에 정리 (입력 순서 그대로 리스트 리턴)"""
+    return [clean_html_tags(t) for t in texts]
+
+
+def article_url_keys(item):
+    """
+    중복 판단용 키: originallink / link 를 각각 정규화한 URL 집합.
+    같은 기사가 한 번은 언론사 URL, 한 번은 네이버 URL 로만 와도 잡아낼 수 있음.
+    """
+    keys = set()
+    for field in ("originallink", "link"):
+        if item.get(field):
+            keys.add(canonicalize_url(item[field]))
+    return keys
 
 
-def build_article_list(items, query: str):
+def build_article_list(items, query: str, seen=None, dedup_index=None):
     """
     - originallink가 있으면 우선 사용, 없으면 link 사용
-    - '완전 동일한 URL 문자열' 기준으로만 중복 제거
+    - 정규화 URL(url_utils.canonicalize_url) 기준으로 중복 제거
+      (http/https, 모바일 주소, 추적 파라미터 차이 무시)
+    - seen: 여러 키워드에 걸쳐 공유하는 set → 다른 키워드에서 이미 나온 기사도 제외
+    - dedup_index: 이전 실행들에서 이미 처리한 URL 인덱스(DedupIndex) → 있으면 제외
     - 어떤 URL이 몇 번 나왔는지도 출력
     """
     articles = []
     urls = []  # 중복 통계용
+    if seen is None:
+        seen = set()
 
     # 1) URL 모으기 (중복 카운트용)
     for item in items:
         raw_url = item.get("originallink") or item.get("link")
         if not raw_url:
             continue
-        urls.append(raw_url)
+        urls.append(canonicalize_url(raw_url))
 
     # 2) URL 중복 통계
     counter = Counter(urls)
-    print(f"\n=== [{query}] URL 중복 통계 (원본 URL 기준) ===")
+    print(f"\n=== [{query}] URL 중복 통계 (정규화 URL 기준) ===")
     dup_exist = False
     for url, cnt in counter.items():
         if cnt > 1:
             dup_exist = True
-            print(f"- {url} -> {cnt}번 등장")
+            vprint(f"- {url} -> {cnt}번 등장")
     if not dup_exist:
         print("  중복된 URL 없음 ✅")
 
     # 3) 실제 기사 리스트(중복 제거)
-    seen = set()
-    for item in items:
-        title_raw = item.get("title", "")
-        title = clean_html_tags(title_raw)
+    titles = clean_html_batch(item.get("title", "") for item in items)
+    descriptions = clean_html_batch(item.get("description", "") for item in items)
+
+    skipped_known = 0
+    for item, title, description in zip(items, titles, descriptions):
 
         raw_url = item.get("originallink") or item.get("link")
         if not raw_url:
-            print(f"[스킵] URL 없음: {title}")
+            vprint(f"[스킵] URL 없음: {title}")
+            continue
+
+        keys = article_url_keys(item)
+        if keys & seen:
+            vprint(f"[중복 스킵] {title} ({raw_url})")
+            inc("articles_skipped_total", reason="duplicate")
             continue
+        seen.update(keys)
 
-        if raw_url in seen:
-            print(f"[중복 스킵] {title} ({raw_url})")
+        if dedup_index is not None and any(dedup_index.contains(k) for k in keys):
+            skipped_known += 1
             continue
-        seen.add(raw_url)
 
         articles.append({
             "id": len(articles) + 1,
             "query": query,
             "title": title,
             "url": raw_url,
+            "pubDate": item.get("pubDate"),
+            "description": description,
         })
 
+    if skipped_known:
+        print(f"[이전 실행에서 처리됨] {skipped_known}건 스킵")
+        inc("articles_skipped_total", skipped_known, reason="already_ingested")
+
     # 4) 최종 기사 목록 출력
-    print(f"\n=== [{query}] 최종 기사 목록 (중복 제거 후) ===")
+    vprint(f"\n=== [{query}] 최종 기사 목록 (중복 제거 후) ===")
     for a in articles:
-        print(f"  [{a['id']}] {a['title']}")
-        print(f"       URL: {a['url']}")
+        vprint(f"  [{a['id']}] {a['title']}")
+        vprint(f"       URL: {a['url']}")
+    inc("articles_total", len(articles), stage="search")
 
     print(f"\n👉 (중복 제거 후) [{query}] 기사 리스트 개수: {len(articles)}")
 
     return articles
 
 
-def main():
-    # 여기서 검색할 키워드들을 정해줘
-    queries = ["삼성전자"]
-    display = 20  # 키워드당 가져올 기사 개수
-
+def plan_commit(cursor_queries, items_by_query, cursors, seen, keys_by_url, unfinished=()):
+    """
+    commit 내용 계산 (collect_articles 의 commit / finalize_pending_commit 공용).
+    끝까지 처리 못 한 기사(unfinished)는 URL 키를 빼고, 그 키워드 커서는 그 기사 pubDate 앞까지만 전진.
+    return: (중복 제거 인덱스에 넣을 URL 키 set, 키워드별 새 커서 dict)
+    """
+    # 키워드별 가장 오래된 미완료 pubDate (None 이면 날짜를 몰라서 커서를 아예 안 옮김)
+    held_keys, hold_before = set(), {}
+    for a in unfinished:
+        held_keys |= set(keys_by_url.get(a.get("url")) or ()) or {canonicalize_url(a.get("url") or "")}
+        q, pub = a.get("query"), parse_pub_date(a.get("pubDate"))
+        if q not in hold_before:
+            hold_before[q] = pub
+        elif hold_before[q] is not None:
+            hold_before[q] = None if pub is None else min(pub, hold_before[q])
+    if unfinished:
+        print(f"   ↩ 끝까지 처리 못 한 기사 {len(unfinished)}건 → 다음 실행에서 다시 받음")
+
+    # 다음 실행에서 여기까지는 건너뛰도록 커서 전진
+    new_cursors = {}
+    for q in cursor_queries:
+        items = items_by_query[q]
+        if q in hold_before:
+            limit = hold_before[q]
+            if limit is None:
+                continue
+            pubs = [parse_pub_date(it.get("pubDate")) for it in items]
+            items = [it for it, pub in zip(items, pubs) if pub is not None and pub < limit]
+        new_cursors[q] = advance_cursor(cursors.get(q), items)
+    return set(seen) - held_keys, new_cursors
+
+
+def collect_articles(queries, display: int, cursors=None):
+    """
+    queries 각각 display 건씩 검색 → 키워드 간 중복 제거 → 전체 기준 id 재부여.
+    cursors 를 주면 CURSOR_FILE 대신 그 dict 를 커서로 쓰고, commit() 때 그 dict 를 바로 고침
+    (파일에 저장하지 않음 → 작업 큐 모드에서 커서를 DB 에 같이 보관하는 용도).
+    적응형 모드(query_velocity.py)면 키워드별 display 를 발생 속도로 정하고(display 는 처음 보는 키워드용),
+    새 기사가 없을 것 같은 키워드는 건너뛰고, 바쁜 키워드 기사부터 돌려줌.
+    return: (기사 리스트, commit)
+      commit() 을 부르면 이번에 본 URL 을 중복 제거 인덱스에 기록하고 키워드별 커서를 전진시킴.
+      결과를 파일/DB에 다 쓴 뒤에 불러야 중간에 실패해도 다음 실행에서 다시 가져옴.
+      commit(unfinished=[기사, ...]) 로 끝까지 처리 못 한 기사(저장 실패 / 요약 실패)를 주면
+      그 URL 은 인덱스에 안 넣고, 그 키워드 커서는 그 기사 pubDate 앞까지만 전진 → 다음 실행에서 다시 받음.
+      commit(pending_file=...) 이면 인덱스 / 커서는 바로 저장하지 않고 그 파일에 남김
+      (finalize_pending_commit 이 나중에 반영, CURSOR_FILE 을 쓰는 경우만).
+    """
     all_articles = []
 
-    for q in queries:
-        items = fetch_naver_news(query=q, display=display, sort="date")
-        article_list = build_article_list(items, query=q)
+    save_to_file = cursors is None
+    if cursors is None:
+        cursors = load_cursors() if INCREMENTAL else {}
+
+    limiter = get_rate_limiter()
+    velocity = get_query_velocity() if adaptive_enabled() else None
+    if velocity is not None:
+        call_budget = limiter.remaining()
+        if CALLS_PER_RUN is not None:
+            call_budget = min(call_budget, CALLS_PER_RUN)
+        budgets, skipped = velocity.plan(queries, display, call_budget=call_budget)
+        velocity.report(budgets, skipped)
+        inc("naver_queries_total", len(budgets), result="polled")
+        inc("naver_queries_total", len(skipped), result="skipped")
+        fetch_queries = list(budgets)
+    else:
+        budgets, fetch_queries = display, list(queries)
+
+    polled_at = time.time()
+    incomplete = set()  # 받다 만 키워드 → 커서 전진 안 함
+    try:
+        items_by_query = fetch_many_queries(fetch_queries, per_query=budgets, sort="date", cursors=cursors,
+                                            incomplete=incomplete)
+    finally:
+        limiter.save()
+    limiter.report()
+
+    dedup_index = DedupIndex() if USE_DEDUP_INDEX else None
+    seen = set()  # 키워드 간 중복 제거용
+    keys_by_url = {}  # 기사 url → 정규화 URL 키들 (commit 에서 미완료 기사를 seen 에서 뺄 때)
+    for q in fetch_queries:
+        for item in items_by_query[q]:
+            raw_url = item.get("originallink") or item.get("link")
+            if raw_url:
+                keys_by_url.setdefault(raw_url, set()).update(article_url_keys(item))
+    for q in fetch_queries:
+        article_list = build_article_list(items_by_query[q], query=q, seen=seen, dedup_index=dedup_index)
         all_articles.extend(article_list)
 
+    # 키워드가 여러 개면 build_article_list 의 id가 키워드마다 1부터 다시 시작하므로 전체 기준으로 다시 매김
+    for new_id, a in enumerate(all_articles, start=1):
+        a["id"] = new_id
+
+    def commit(unfinished=(), pending_file=None):
+        # 받다 만 키워드는 커서 그대로 → 다음 실행에서 예전 위치까지 다시 내려감, 이미 낸 기사는 중복 제거 인덱스가 거름
+        cursor_queries = [q for q in fetch_queries if q not in incomplete] if INCREMENTAL else []
+        if pending_file and save_to_file:
+            # 순차 모드: 끝까지 처리 못 한 기사는 step5 가 끝나야 알 수 있으므로 계산에 필요한 것만 남김
+            pending = {
+                "queries": cursor_queries,
+                "cursors": {q: cursors.get(q) for q in cursor_queries},
+                "items": {q: [{k: it.get(k) for k in ("originallink", "link", "pubDate")}
+                              for it in items_by_query[q]] for q in cursor_queries},
+                "seen": sorted(seen) if dedup_index is not None else [],
+                "keys_by_url": {u: sorted(k) for u, k in keys_by_url.items()} if dedup_index is not None else {},
+                "unfinished": [{k: a.get(k) for k in ("url", "query", "pubDate")} for a in unfinished],
+            }
+            with open(pending_file, "w", encoding="utf-8") as f:
+                json.dump(pending, f, ensure_ascii=False)
+            print(f"   인덱스 / 커서는 DB 저장까지 끝난 뒤 반영 ({pending_file})")
+            if dedup_index is not None:
+                dedup_index.close()
+        else:
+            record_urls, new_cursors = plan_commit(cursor_queries, items_by_query, cursors, seen, keys_by_url,
+                                                   unfinished)
+            # 이번에 본 기사 URL(seen = 내보낸 기사 + 그 중복들)은 인덱스에 기록 → 다음 실행부터는 다시 안 내려감
+            if dedup_index is not None:
+                dedup_index.add_many(record_urls)
+                print(f"   중복 제거 인덱스 크기: {len(dedup_index)}")
+                dedup_index.close()
+            cursors.update(new_cursors)
+            if INCREMENTAL and save_to_file:
+                save_cursors({q: c for q, c in cursors.items() if c})
+
+        # 발생 속도 갱신 (조회가 중간에 실패한 키워드는 받은 게 일부뿐이라 반영 안 함)
+        if velocity is not None:
+            for q in fetch_queries:
+                if limiter.per_query.get(q, {}).get("error"):
+                    continue
+                items = items_by_query[q]
+                velocity.observe(q, len(items), [parse_pub_date(it.get("pubDate")) for it in items],
+                                 budgets[q], polled_at)
+            velocity.save()
+
+    return all_articles, commit
+
+
+def finalize_pending_commit(path: str = PENDING_COMMIT_FILE, unfinished=()) -> bool:
+    """
+    step1 이 남긴 인덱스 / 커서 저장 내용을 반영하고 파일 삭제 (순차 모드 step5 가 성공한 뒤에 부름).
+    unfinished: 끝까지 처리 못 한 기사 (본문 크롤링 / LLM 요약 실패) → commit(unfinished) 와 같이 다음 실행에서 다시 받음.
+    남은 게 없으면 False.
+    """
+    if not path or not os.path.exists(path):
+        return False
+    with open(path, "r", encoding="utf-8") as f:
+        pending = json.load(f)
+    record_urls, new_cursors = plan_commit(
+        pending.get("queries", []), pending.get("items", {}), pending.get("cursors", {}),
+        pending.get("seen", []), pending.get("keys_by_url", {}), [*pending.get("unfinished", []), *unfinished],
+    )
+    if USE_DEDUP_INDEX and record_urls:
+        dedup_index = DedupIndex()
+        try:
+            dedup_index.add_many(record_urls)
+            print(f"   중복 제거 인덱스 크기: {len(dedup_index)}")
+        finally:
+            dedup_index.close()
+    if INCREMENTAL and new_cursors:
+        cursors = load_cursors()
+        cursors.update(new_cursors)
+        save_cursors({q: c for q, c in cursors.items() if c})
+    os.remove(path)
+    print(f"   step1 인덱스 / 커서 반영 완료 ({path})")
+    return True
+
+
+def main():
     # 결과를 JSON 파일로 저장 → 2번 파일에서 이걸 읽어서 본문 크롤링에 사용
-    output_file = "step1_naver_articles.json"
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(all_articles, f, ensure_ascii=False, indent=2)
+    queries = load_queries(QUERIES_FILE) if QUERIES_FILE else QUERIES
+    all_articles, commit = collect_articles(queries, DISPLAY)
+
+    output_file = step_file("step1_naver_articles")
+    write_articles(output_file, all_articles)
+
+    # 인덱스 / 커서는 step5(DB 저장)가 성공한 뒤에 반영 → 중간 단계에서 죽어도 다음 실행에서 같은 기사를 다시 받음
+    commit(pending_file=PENDING_COMMIT_FILE)
 
     print(f"\n✅ 저장 완료: {output_file}")
     print(f"   총 기사 수: {len(all_articles)}")
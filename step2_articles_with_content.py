@@ -1,27 +1,203 @@
-import json
+import os
+import queue
+import threading
 import time
-from newspaper import Article
+from collections import defaultdict, deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from checkpoint_ledger import get_ledger, input_hash, resume_enabled
+from extractors import extract_registered
+from http_cache import HttpCache
+from jsonl_io import FOLLOW_INPUT, ArticleWriter, chunked, iter_articles, read_articles, step_file
+from metrics import inc, observe, set_gauge, timed, verbose
+from rate_limiter import TokenBucket
+from spill_store import body_fields
 
 # ================================
 # 1. 입출력 파일 설정
 # ================================
 
-INPUT_FILE = "step1_naver_articles.json"          # 1단계에서 만든 파일 (id, query, title, url)
-OUTPUT_FILE = "step2_articles_with_content.json"  # 본문까지 포함한 결과 파일
+INPUT_FILE = step_file("step1_naver_articles")          # 1단계에서 만든 파일 (id, query, title, url, pubDate, description)
+OUTPUT_FILE = step_file("step2_articles_with_content")  # 본문까지 포함한 결과 파일
+
+# 입력을 이 개수씩 끊어서 크롤링 → 결과는 끝나는 대로 바로 기록 (메모리에 전체를 안 들고 있음)
+STREAM_CHUNK = 500
+
+# 동시 크롤링 설정
+MAX_CONCURRENCY = 16      # 전체 동시 다운로드 수
+PER_HOST_RATE = 2.0       # 같은 언론사(호스트)에는 초당 2건까지 (예전 0.5초 sleep 과 같은 간격)
+REQUEST_TIMEOUT = 10      # 기사 1건 다운로드 타임아웃(초)
+
+# 다운로드(I/O)와 파싱(CPU)을 나눠서 처리: 파싱은 프로세스 풀에서 (GIL 회피)
+PARSE_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+PARSE_QUEUE_SIZE = 32     # 다운로드는 끝났는데 아직 파싱 안 된 HTML 최대 개수
+
+# HTML 디스크 캐시 (http_cache.py) — 다시 실행하거나 겹치는 기사는 네트워크를 거의 안 탐
+USE_HTTP_CACHE = True
 
 # ================================
 # 2. 본문 크롤링 함수 (newspaper3k)
 # ================================
+_host_buckets = {}
+_host_buckets_lock = threading.Lock()
+
+
+def url_host(url) -> str:
+    return (urlsplit(url).hostname or "").lower() if url else ""
+
+
+def get_host_bucket(host: str) -> TokenBucket:
+    """호스트별 요청 간격 제한용 버킷 (capacity=1 → 같은 호스트는 최소 1/PER_HOST_RATE 초 간격)"""
+    with _host_buckets_lock:
+        bucket = _host_buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(PER_HOST_RATE, capacity=1)
+            _host_buckets[host] = bucket
+        return bucket
+
+
+_newspaper_config = None
+_session = None
+_cache = None
+_init_lock = threading.Lock()  # 워커 스레드들이 동시에 처음 호출해도 하나만 만들어지게
+
+
+def get_newspaper_config():
+    """
+    newspaper3k 는 import 만 0.3초 가까이 걸려서 처음 필요할 때 불러옴.
+    설정 객체는 여러 번 만들어져도 내용이 같으므로 락 없이 처리 (get_session 이 _init_lock 을 잡은 채로 부름).
+    """
+    global _newspaper_config
+    if _newspaper_config is None:
+        from newspaper import Config
+
+        config = Config()
+        config.request_timeout = REQUEST_TIMEOUT
+        config.fetch_images = False
+        _newspaper_config = config
+    return _newspaper_config
+
+
+def get_session() -> requests.Session:
+    global _session
+    with _init_lock:
+        if _session is not None:
+            return _session
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=MAX_CONCURRENCY, pool_maxsize=MAX_CONCURRENCY)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"User-Agent": get_newspaper_config().browser_user_agent})
+        _session = session
+        return _session
+
+
+def get_cache():
+    global _cache
+    with _init_lock:
+        if _cache is None and USE_HTTP_CACHE:
+            _cache = HttpCache()
+        return _cache
+
+
+def decode_html(res) -> str:
+    """charset 헤더가 없으면(requests 기본 ISO-8859-1) 내용으로 인코딩 추정 (EUC-KR 언론사 대비)"""
+    if res.encoding is None or res.encoding.lower() == "iso-8859-1":
+        res.encoding = res.apparent_encoding
+    return res.text
+
+
+def extract_text(url: str, html: str) -> str:
+    """
+    이미 받은 HTML 에서 본문만 추출.
+    - 네이버 뉴스 / 주요 언론사: extractors.py 의 도메인별 XPath 추출기
+    - 그 외, 또는 추출 결과가 너무 짧으면: newspaper3k
+    """
+    text = extract_registered(url, html)
+    if text:
+        return text
+
+    from newspaper import Article
+
+    article = Article(url, language="ko", config=get_newspaper_config())
+    article.download(input_html=html)
+    article.parse()
+    return (article.text or "").strip()
+
+
+def download_html(url: str):
+    """
+    I/O 단계: 캐시 확인 + (필요하면) 조건부 요청으로 HTML 다운로드.
+    return: (cached_text, html, etag, last_modified)
+      - 캐시 본문을 그대로 쓰면 cached_text 에 본문, html 은 None
+      - 새로 받았으면 cached_text 는 None, html 에 원본 (파싱은 parse_html 에서)
+    실패하면 예외.
+    """
+    cache = get_cache()
+    entry = cache.get(url) if cache else None
+    if entry and entry.is_fresh():
+        cache.count("hit")
+        inc("http_cache_total", result="hit")
+        return entry.text, None, None, None
+
+    headers = {}
+    if entry:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+    # 실제로 네트워크를 탈 때만 호스트별 간격 유지 (캐시 hit 는 안 기다림)
+    waited = get_host_bucket(url_host(url)).acquire()
+    observe("host_politeness_wait_seconds", waited)
+    with timed("download_seconds"):
+        res = get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    inc("bytes_fetched_total", len(res.content), source="article")
+    inc("article_responses_total", status=res.status_code)
+    if res.status_code == 304 and entry:
+        cache.touch_revalidated(url)
+        cache.count("revalidated")
+        inc("http_cache_total", result="revalidated")
+        return entry.text, None, None, None
+    res.raise_for_status()
+
+    if cache:
+        cache.count("miss")
+        inc("http_cache_total", result="miss")
+    return None, decode_html(res), res.headers.get("ETag"), res.headers.get("Last-Modified")
+
+
+def parse_html(url: str, html: str) -> str:
+    """CPU 단계: HTML → 본문. 프로세스 풀에서 돌기 때문에 모듈 최상위 함수로 둠."""
+    return extract_text(url, html)
+
+
+def store_parsed(url: str, html: str, text: str, etag=None, last_modified=None):
+    cache = get_cache()
+    if cache:
+        cache.put(url, html, text, etag=etag, last_modified=last_modified)
+
+
 def get_full_text(url: str) -> str:
     """
-    기사 URL에서 newspaper3k로 본문 전체를 가져옴.
+    기사 URL에서 본문 전체를 가져옴 (한 건씩 바로 처리하는 버전, 다운로드 + 파싱 한 번에).
+    - 캐시에 있고 FRESH_SECONDS 이내면 네트워크 없이 캐시 본문 사용
+    - 오래됐으면 ETag / Last-Modified 로 조건부 요청 → 304면 캐시 본문 재사용
     실패하면 ""(빈 문자열) 리턴.
     """
     try:
-        article = Article(url, language="ko")
-        article.download()
-        article.parse()
-        text = (article.text or "").strip()
+        cached_text, html, etag, last_modified = download_html(url)
+        if cached_text is not None:
+            return cached_text
+        with timed("parse_seconds"):
+            text = parse_html(url, html)
+        store_parsed(url, html, text, etag, last_modified)
         return text
     except Exception as e:
         print(f"[경고] 본문 크롤링 실패: {url}")
@@ -29,62 +205,248 @@ def get_full_text(url: str) -> str:
         return ""
 
 
+def lookup_crawled(url: str):
+    """--resume 이고 이전 실행에서 이미 본문을 받아둔 기사면 그 본문, 아니면 None"""
+    if not url or not resume_enabled():
+        return None
+    done = get_ledger().lookup(url, "crawl", input_hash(url))
+    return done.get("content") if done else None
+
+
+def record_crawled(url: str, content: str):
+    """본문을 받은 기사만 체크포인트에 기록 (실패한 기사는 다음 실행에서 다시 시도)"""
+    if url and content:
+        get_ledger().record(url, "crawl", input_hash(url), {"content": content})
+
+
 # ================================
 # 3. step1 결과 불러오기
 # ================================
 def load_articles(input_file: str):
     """
-    step1에서 만든 JSON 파일 로드.
+    step1에서 만든 JSON(L) 파일 로드.
     구조 예시: [{id, query, title, url}, ...]
     """
-    with open(input_file, "r", encoding="utf-8") as f:
-        articles = json.load(f)
+    articles = read_articles(input_file)
     print(f"📥 로드한 기사 개수: {len(articles)}")
     return articles
 
 
 # ================================
-# 4. 각 기사에 본문(content) 붙이기
+# 4. 각 기사에 본문(content) 붙이기 (동시 크롤링)
 # ================================
-def crawl_contents(articles):
+def interleave_by_host(articles):
+    """
+    기사 인덱스를 호스트별로 번갈아 가며 나열 (A1, B1, C1, A2, B2, ...).
+    같은 언론사 기사가 몰려 있어도 워커들이 한 호스트 대기열에 다 묶이지 않게 함.
+    """
+    by_host = defaultdict(deque)
+    for idx, a in enumerate(articles):
+        by_host[url_host(a.get("url"))].append(idx)
+
+    order = []
+    queues = list(by_host.values())
+    while queues:
+        for q in queues:
+            order.append(q.popleft())
+        queues = [q for q in queues if q]
+    return order
+
+
+def to_step2_record(a, content: str) -> dict:
+    # step2 형식: id, query, title, url, pubDate, description, content
+    # (메모리 제한 모드면 content 대신 content_ref / content_len → spill_store.py)
+    return {
+        "id": a.get("id"),
+        "query": a.get("query"),
+        "title": a.get("title"),
+        "url": a.get("url"),
+        "pubDate": a.get("pubDate"),
+        "description": a.get("description"),
+        **body_fields(content),
+    }
+
+
+class StageStats:
+    """단계별 사용률 집계: 워커들이 실제로 일한 시간 합 / (경과 시간 × 워커 수)"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.busy_sec = 0.0
+        self.items = 0
+        self.lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self.lock:
+            self.busy_sec += seconds
+            self.items += 1
+
+    def utilization(self, wall_sec: float) -> float:
+        if wall_sec <= 0 or self.workers <= 0:
+            return 0.0
+        return self.busy_sec / (wall_sec * self.workers)
+
+
+def crawl_contents(articles, max_workers: int = MAX_CONCURRENCY, parse_workers: int = PARSE_WORKERS,
+                   on_result=None, process_pool=None):
     """
     각 기사에 대해 url로 본문 크롤링해서 "content" 필드 추가.
+
+    [I/O 단계]  max_workers 개 스레드: 캐시 확인 + HTML 다운로드
+                (같은 호스트는 PER_HOST_RATE 로 간격 유지, 캐시 hit 제외)
+        ↓ parse_queue (최대 PARSE_QUEUE_SIZE 개, 꽉 차면 다운로드 스레드가 대기 → 백프레셔)
+    [CPU 단계]  parse_workers 개 프로세스: HTML → 본문 파싱 (GIL 영향 없음)
+
+    결과 순서는 입력 순서 그대로, 실패한 기사는 content="".
+    --resume 이면 체크포인트에 본문이 있는 기사는 다운로드 없이 그 본문 사용.
+    on_result 를 주면 결과를 모아두지 않고 끝나는 순서대로 on_result(record) 호출 (return None).
+    process_pool 을 주면 새로 만들지 않고 그걸 씀 (청크마다 부를 때 프로세스 시작 / import 비용을 한 번만).
     """
-    results = []
     total = len(articles)
+    results = None if on_result else [None] * total
+    progress = {"done": 0, "queue_max": 0, "blocked_sec": 0.0}
+    lock = threading.Lock()
+
+    io_stats = StageStats("I/O(다운로드)", max_workers)
+    parse_stats = StageStats("CPU(파싱)", parse_workers)
+    parse_queue = queue.Queue(maxsize=PARSE_QUEUE_SIZE)
+    abort = threading.Event()  # 결과 기록(on_result / 체크포인트) 중 예외 → 나머지는 대기열만 비우고 끝남
+    errors = []
 
-    for idx, a in enumerate(articles, start=1):
-        url = a.get("url")
-        title = a.get("title")
+    def fail(e):
+        with lock:
+            errors.append(e)
+        if not abort.is_set():
+            print(f"💥 step2 결과 기록 오류 → 크롤링 중단: {type(e).__name__}: {e}")
+        abort.set()
 
-        print("\n==============================")
-        print(f"[{idx}/{total}] 제목: {title}")
-        print(f"URL: {url}")
+    def finish(idx: int, content: str, resumed: bool = False):
+        a = articles[idx]
+        if not resumed:
+            record_crawled(a.get("url"), content)
+        record = to_step2_record(a, content)
+        with lock:
+            if on_result:
+                on_result(record)
+            else:
+                results[idx] = record
+            progress["done"] += 1
+            inc("articles_total", stage="crawl", result="ok" if content else "empty")
+            if not verbose():
+                return
+            lines = [
+                "\n==============================",
+                f"[{progress['done']}/{total}] 제목: {a.get('title')}",
+                f"URL: {a.get('url')}",
+            ]
+            if not a.get("url"):
+                lines.append("[스킵] URL 없음")
+            if content:
+                lines.append(f"[본문 길이] {len(content)}자")
+            else:
+                lines.append("[본문 없음 또는 크롤링 실패]")
+            print("\n".join(lines))
 
+    def io_task(idx: int):
+        if abort.is_set():
+            return
+        try:
+            download_one(idx)
+        except Exception as e:
+            fail(e)
+
+    def download_one(idx: int):
+        url = articles[idx].get("url")
         if not url:
-            print("[스킵] URL 없음")
-            content = ""
-        else:
-            content = get_full_text(url)
-
-        if content:
-            print(f"[본문 길이] {len(content)}자")
-        else:
-            print("[본문 없음 또는 크롤링 실패]")
-
-        # step2 형식: id, query, title, url, content
-        results.append(
-            {
-                "id": a.get("id"),
-                "query": a.get("query"),
-                "title": title,
-                "url": url,
-                "content": content,
-            }
-        )
+            finish(idx, "")
+            return
+
+        resumed = lookup_crawled(url)
+        if resumed is not None:
+            finish(idx, resumed, resumed=True)
+            return
+
+        start = time.perf_counter()
+        try:
+            cached_text, html, etag, last_modified = download_html(url)
+        except Exception as e:
+            print(f"[경고] 본문 크롤링 실패: {url}\n       사유: {e}")
+            finish(idx, "")
+            return
+        finally:
+            io_stats.add(time.perf_counter() - start)
+
+        if cached_text is not None:
+            finish(idx, cached_text)
+            return
+
+        put_start = time.perf_counter()
+        parse_queue.put((idx, url, html, etag, last_modified))
+        with lock:
+            progress["blocked_sec"] += time.perf_counter() - put_start
+            progress["queue_max"] = max(progress["queue_max"], parse_queue.qsize())
+        set_gauge("queue_depth", parse_queue.qsize(), queue="step2_parse")
+
+    def parse_loop(pool):
+        while True:
+            job = parse_queue.get()
+            if job is None:
+                return
+            if abort.is_set():
+                continue  # 다운로드 스레드가 put 에서 막히지 않게 대기열만 비움
+            idx, url, html, etag, last_modified = job
+            start = time.perf_counter()
+            try:
+                try:
+                    # 프로세스 간 전달 시간 포함
+                    with timed("parse_seconds"):
+                        text = pool.submit(parse_html, url, html).result()
+                except BrokenProcessPool:
+                    # 프로세스 풀이 죽었으면 이 스레드에서 직접 파싱
+                    text = parse_html(url, html)
+                store_parsed(url, html, text, etag, last_modified)
+            except Exception as e:
+                print(f"[경고] 본문 파싱 실패: {url}\n       사유: {e}")
+                text = ""
+            parse_stats.add(time.perf_counter() - start)
+            try:
+                finish(idx, text)
+            except Exception as e:
+                fail(e)
+
+    wall_start = time.perf_counter()
+    pool_cm = nullcontext(process_pool) if process_pool is not None else ProcessPoolExecutor(parse_workers)
+    with pool_cm as process_pool:
+        parsers = [
+            threading.Thread(target=parse_loop, args=(process_pool,), daemon=True)
+            for _ in range(parse_workers)
+        ]
+        for t in parsers:
+            t.start()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as io_pool:
+            list(io_pool.map(io_task, interleave_by_host(articles)))
+
+        for _ in parsers:
+            parse_queue.put(None)
+        for t in parsers:
+            t.join()
+    if errors:
+        raise errors[0]
+    wall = time.perf_counter() - wall_start
 
-        # 너무 빠르게 연달아 긁으면 막힐 수도 있으니 살짝 쉬어가기 (원하면 주석 처리해도 됨)
-        time.sleep(0.5)
+    print("\n=== step2 단계별 사용률 ===")
+    print(f"   전체 경과: {wall:.2f}초, 기사 {total}건")
+    for st in (io_stats, parse_stats):
+        print(
+            f"   {st.name}: 워커 {st.workers}개, 처리 {st.items}건, "
+            f"작업 시간 합 {st.busy_sec:.2f}초, 사용률 {st.utilization(wall) * 100:.1f}%"
+        )
+    print(
+        f"   파싱 대기열: 최대 {progress['queue_max']}/{PARSE_QUEUE_SIZE}, "
+        f"다운로드 스레드가 대기열 때문에 기다린 시간 {progress['blocked_sec']:.2f}초"
+    )
 
     return results
 
@@ -93,24 +455,33 @@ def crawl_contents(articles):
 # 5. 메인 실행부
 # ================================
 def main():
-    # 1) step1 결과 로드
-    articles = load_articles(INPUT_FILE)
-    if not articles:
-        print("⚠️ 처리할 기사가 없습니다.")
-        return
-
-    # 2) 본문 크롤링
     print("\n=== 네이버 기사 본문 크롤링 시작 (newspaper3k) ===")
-    articles_with_content = crawl_contents(articles)
 
-    # 3) 결과 저장
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(articles_with_content, f, ensure_ascii=False, indent=2)
+    # step1 결과를 STREAM_CHUNK 개씩 읽어서 크롤링 → 끝나는 대로 바로 기록 (파싱 프로세스 풀은 실행 동안 하나)
+    with ArticleWriter(OUTPUT_FILE) as writer, ProcessPoolExecutor(PARSE_WORKERS) as process_pool:
+        for chunk in chunked(iter_articles(INPUT_FILE, follow=FOLLOW_INPUT), STREAM_CHUNK):
+            print(f"📥 기사 {len(chunk)}건 크롤링 (누적 {writer.count + len(chunk)}건)")
+            crawl_contents(chunk, on_result=writer.write, process_pool=process_pool)
+
+    if writer.count == 0:
+        print("⚠️ 처리할 기사가 없습니다.")
+        return
 
     print("\n✅ 본문 크롤링 완료")
-    print(f"   총 기사 수: {len(articles_with_content)}")
+    print(f"   총 기사 수: {writer.count}")
     print(f"   저장 파일: {OUTPUT_FILE}")
 
+    get_ledger().report()
+
+    cache = get_cache()
+    if cache:
+        st = cache.stats
+        print(
+            f"   HTML 캐시: hit {st['hit']}, 304 재검증 {st['revalidated']}, "
+            f"miss {st['miss']}, 삭제 {st['evicted']} "
+            f"(사용량 {cache.total_bytes() / 1024 / 1024:.1f}MB)"
+        )
+
 
 if __name__ == "__main__":
     main()
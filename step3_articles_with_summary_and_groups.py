@@ -1,10 +1,20 @@
 import json
+import re
+import threading
 import time
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
 
 from dotenv import load_dotenv
 import os
 
+from checkpoint_ledger import get_ledger, input_hash, resume_enabled
+from jsonl_io import FOLLOW_INPUT, ArticleWriter, chunked, iter_articles, read_articles, step_file
+from metrics import inc, timed, vprint
+from near_dup import get_near_dup_index, group_near_duplicates, grouping_mode
+from spill_store import article_content, bounded_enabled, carry_body
+from summary_cache import SummaryCache, summary_key
+from text_compress import compress_text, precompress_enabled
+
 # .env 로드
 load_dotenv()
 
@@ -12,34 +22,94 @@ load_dotenv()
 # 0. OpenAI (GPT-4o-mini) 설정
 # ================================
 
-api_key = os.getenv("gpt_key")
-if not api_key:
-    raise RuntimeError("❌ .env 에 gpt_key 값이 없습니다. .env 파일을 확인하세요.")
+OPENAI_MODEL_NAME = "gpt-4o-mini"
+# 프롬프트(아래 summarize_and_group_with_llm)를 바꾸면 올릴 것 → 요약 캐시가 예전 프롬프트 결과를 안 씀
+PROMPT_VERSION = "3"
+# 응답 형식: "json_schema" (스키마 강제) / "json_object" (JSON 모드) / None (프롬프트 지시만)
+# 엔드포인트가 response_format 을 거부하면 그 실행에서는 프롬프트 지시만으로 요청
+RESPONSE_FORMAT = "json_schema"
+# 응답에서 빠지거나 형식이 깨진 기사만 다시 요청하는 횟수
+MAX_MISSING_RETRIES = 2
+
+# 같은 본문의 요약은 요약 캐시(summary_cache.sqlite3)에서 재사용
+USE_SUMMARY_CACHE = True
 
-# ✅ 여기서 진짜 클라이언트 객체 생성
-client = OpenAI(api_key=api_key)
+_client = None
+_summary_cache = None
+_response_format_ok = True
+_init_lock = threading.Lock()
 
-OPENAI_MODEL_NAME = "gpt-4o-mini"
+# 실행 동안의 LLM 입력 / 재요청 집계 (report_prompt_savings)
+_prompt_stats = {"verbose_tokens": 0, "payload_tokens": 0, "retried": 0, "resent_saved": 0, "salvaged": 0,
+                 "head_tokens": 0, "compressed_tokens": 0}
+_stats_lock = threading.Lock()
+
+
+def get_client():
+    """
+    OpenAI 클라이언트는 처음 LLM 을 부를 때 만듦 (import 만 할 때는 openai 패키지 / gpt_key 불필요).
+    → step1 만 돌리거나 다른 모듈에서 함수만 가져다 쓸 때 시작이 빠르고, 키가 없어도 안 죽음.
+    """
+    global _client
+    with _init_lock:
+        if _client is None:
+            api_key = os.getenv("gpt_key")
+            if not api_key:
+                raise RuntimeError("❌ .env 에 gpt_key 값이 없습니다. .env 파일을 확인하세요.")
+
+            from openai import OpenAI
+
+            # ✅ 여기서 진짜 클라이언트 객체 생성
+            _client = OpenAI(api_key=api_key)
+        return _client
+
+
+def prompt_version() -> str:
+    """요약 캐시 키에 넣는 프롬프트 버전 (minhash 그룹핑 모드는 그룹 지시가 빠진 프롬프트라 따로)"""
+    return PROMPT_VERSION if grouping_mode() == "llm" else f"{PROMPT_VERSION}-summary-only"
+
+
+def get_summary_cache():
+    global _summary_cache
+    with _init_lock:
+        if _summary_cache is None and USE_SUMMARY_CACHE:
+            _summary_cache = SummaryCache()
+        return _summary_cache
 
 
 # ================================
 # 1. 입출력 파일 경로
 # ================================
 
-INPUT_FILE = "step2_articles_with_content.json"  # 2단계 결과 (본문 포함)
-OUTPUT_FILE = "step3_articles_with_summary_and_groups.json"  # 3단계 결과
+INPUT_FILE = step_file("step2_articles_with_content")  # 2단계 결과 (본문 포함)
+OUTPUT_FILE = step_file("step3_articles_with_summary_and_groups")  # 3단계 결과
 
 # 한 기사당 본문을 전부 넣으면 너무 길어질 수 있으니, 앞부분만 잘라서 보냄
 MAX_CONTENT_CHARS = 1200
+# 본문 보관소에서 앞부분만 꺼낼 때 앞뒤 공백을 떼고도 MAX_CONTENT_CHARS 가 남도록 조금 더 읽음
+CONTENT_READ_SLACK = 200
+# 사전 압축(text_compress.py) 을 켜면: 본문 앞 COMPRESS_READ_CHARS 글자에서 상투 문구를 빼고
+# 중요한 문장만 기사당 MAX_CONTENT_TOKENS 토큰 안으로 골라서 보냄
+COMPRESS_READ_CHARS = 6000
+MAX_CONTENT_TOKENS = 600
+
+# 메모리 제한 모드(spill_store.py)에서 한 번에 요약하는 기사 수 (창 단위로 LLM 호출 + 기록)
+SUMMARY_WINDOW = 500
+
+# 기사를 한 프롬프트에 다 넣으면 컨텍스트 / 출력 한도를 넘어서 JSON 이 잘림
+# → 토큰 수를 어림해서 배치로 나누고, 배치들을 동시에 호출
+MAX_BATCH_INPUT_TOKENS = 12000   # 배치 하나의 기사 JSON 토큰 수 상한 (프롬프트 안내문 제외)
+MAX_BATCH_OUTPUT_TOKENS = 8000   # 배치 하나의 응답 토큰 수 상한 (요약 + 그룹)
+SUMMARY_OUTPUT_TOKENS = 200      # 기사 1건 요약 응답 토큰 어림값
+LLM_CONCURRENCY = 4              # 동시에 보내는 LLM 호출 수
 
 
 def load_articles(input_file: str):
     """
-    step2에서 만든 기사 + 본문 리스트 JSON 불러오기.
+    step2에서 만든 기사 + 본문 리스트 JSON(L) 불러오기.
     구조: [{id, query, title, url, content}, ...]
     """
-    with open(input_file, "r", encoding="utf-8") as f:
-        articles = json.load(f)
+    articles = read_articles(input_file)
     print(f"📥 요약/그룹핑 대상 기사 개수: {len(articles)}")
     return articles
 
@@ -49,14 +119,28 @@ def build_brief_articles(articles):
     LLM에 넘길 간략 버전 리스트 만들기.
     - id, title, url, content_snippet 만 포함
     - content_snippet: 본문 앞 MAX_CONTENT_CHARS 글자
+      (사전 압축을 켜면 상투 문구를 뺀 본문에서 고른 주요 문장, MAX_CONTENT_TOKENS 토큰 이내)
     """
+    compress = precompress_enabled()
     brief_list = []
     for a in articles:
-        content = (a.get("content") or "").strip()
+        content = article_content(
+            a, COMPRESS_READ_CHARS if compress else MAX_CONTENT_CHARS + CONTENT_READ_SLACK
+        ).strip()
         if len(content) > MAX_CONTENT_CHARS:
             content_snippet = content[:MAX_CONTENT_CHARS] + "\n...(이하 생략)"
         else:
             content_snippet = content
+        if compress and content:
+            head_tokens = estimate_tokens(content_snippet)
+            with timed("precompress_seconds"):
+                content_snippet = compress_text(
+                    content, MAX_CONTENT_TOKENS, measure=estimate_tokens, title=a.get("title") or ""
+                )
+            compressed_tokens = estimate_tokens(content_snippet)
+            with _stats_lock:
+                _prompt_stats["head_tokens"] += head_tokens
+                _prompt_stats["compressed_tokens"] += compressed_tokens
 
         brief_list.append(
             {
@@ -69,18 +153,164 @@ def build_brief_articles(articles):
     return brief_list
 
 
-def extract_json_from_text(text: str):
+def llm_payload(brief_articles) -> str:
+    """
+    프롬프트에 넣는 기사 JSON. url 은 요약에 안 쓰이므로 빼고, 들여쓰기 / 공백 없이
+    (간단 버전의 url 은 체크포인트 기록용으로만 남김)
+    """
+    return json.dumps(
+        [{"id": b["id"], "title": b["title"], "content": b["content"]} for b in brief_articles],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+_encoding = None
+_encoding_loaded = False
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토큰 수 어림. tiktoken 이 설치돼 있으면 그걸로 세고 (선택 의존성),
+    없으면 ASCII 는 4글자당 1토큰, 한글 등은 1글자당 1토큰으로 넉넉하게 잡음.
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _init_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+
+                    _encoding = tiktoken.encoding_for_model(OPENAI_MODEL_NAME)
+                except Exception:  # 미설치 / 모델 인코딩 파일을 못 받음
+                    _encoding = None
+                _encoding_loaded = True
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    ascii_chars = sum(1 for ch in text if ch < "\x80")
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def make_token_batches(brief_articles):
+    """
+    간단 버전 기사들을 입력 토큰(MAX_BATCH_INPUT_TOKENS) / 응답 토큰(MAX_BATCH_OUTPUT_TOKENS) 한도 안으로 나눔.
+    순서는 그대로 (기사 하나가 한도를 넘으면 그 기사 혼자 한 배치).
     """
-    LLM이 혹시 모르게 앞뒤에 뻘소리를 조금 붙여도,
-    중간의 JSON 객체만 잘라서 파싱하도록 하는 보조 함수.
-    (그래도 프롬프트에서 JSON만 출력하라고 빡세게 말해둠)
+    max_articles = max(1, MAX_BATCH_OUTPUT_TOKENS // SUMMARY_OUTPUT_TOKENS)
+    batches = []
+    batch, batch_tokens = [], 0
+    for brief in brief_articles:
+        tokens = estimate_tokens(llm_payload([brief]))
+        if batch and (batch_tokens + tokens > MAX_BATCH_INPUT_TOKENS or len(batch) >= max_articles):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(brief)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+_decoder = json.JSONDecoder()
+_ITEM_GAP = re.compile(r"[\s,]*")
+
+
+def parse_llm_response(text: str):
+    """
+    LLM 응답 → (articles 항목 리스트, groups, 끝까지 온전했는지).
+    앞뒤에 다른 말이 붙어도 첫 JSON 객체만 읽고 (raw_decode),
+    응답이 중간에 잘려서 전체가 안 읽히면 "articles" 배열을 앞에서부터 항목 단위로 읽어서
+    온전한 항목까지만 건짐 (groups 는 버림 → 빠진 기사는 호출하는 쪽에서 다시 요청).
     """
     start = text.find("{")
-    end = text.rfind("}")
-    if start == -1 or end == -1 or end <= start:
+    if start != -1:
+        try:
+            parsed, _ = _decoder.raw_decode(text, start)
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, dict):
+            return parsed.get("articles") or [], parsed.get("groups") or [], True
+
+    key = text.find('"articles"')
+    pos = text.find("[", key) if key != -1 else -1
+    if pos == -1:
         raise ValueError("JSON 형식이 감지되지 않음")
-    sliced = text[start : end + 1]
-    return json.loads(sliced)
+    items = []
+    pos += 1
+    while True:
+        pos = _ITEM_GAP.match(text, pos).end()
+        if pos >= len(text) or text[pos] != "{":
+            break
+        try:
+            item, pos = _decoder.raw_decode(text, pos)
+        except ValueError:
+            break  # 잘린 항목
+        items.append(item)
+    return items, [], False
+
+
+def response_format():
+    """chat.completions 의 response_format 인자 (RESPONSE_FORMAT 에 따라, 안 쓰면 None)"""
+    if not _response_format_ok or RESPONSE_FORMAT is None:
+        return None
+    if RESPONSE_FORMAT == "json_object":
+        return {"type": "json_object"}
+    article_item = {
+        "type": "object",
+        "properties": {"id": {"type": "integer"}, "summary_ko": {"type": "string"}},
+        "required": ["id", "summary_ko"],
+        "additionalProperties": False,
+    }
+    group_item = {
+        "type": "object",
+        "properties": {
+            "group_id": {"type": "integer"},
+            "article_ids": {"type": "array", "items": {"type": "integer"}},
+            "reason": {"type": "string"},
+        },
+        "required": ["group_id", "article_ids", "reason"],
+        "additionalProperties": False,
+    }
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "news_summaries",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "articles": {"type": "array", "items": article_item},
+                    "groups": {"type": "array", "items": group_item},
+                },
+                "required": ["articles", "groups"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+# LLM 그룹핑 모드(GROUPING_MODE=llm)에서만 프롬프트에 넣는 부분
+GROUPING_TASK = """2) 서로 내용이 실질적으로 동일하거나, 같은 뉴스 이벤트를 약간 다른 표현으로 전하는 중복 기사들을 그룹으로 묶는다.
+   - 같은 기업/인물/사건/날짜/수치 등을 공유하며, 사실상 같은 뉴스를 반복 보도한 것으로 판단되면 같은 그룹에 넣는다.
+   - 제목이 다르더라도, 내용이 같은 사건을 다루면 같은 그룹이다.
+   - 한 그룹은 2개 이상의 기사 id를 포함해야 한다. (1개만 있으면 그룹으로 만들지 않는다.)
+   - 서로 겹치지 않는 단독 기사는 그룹에 포함시키지 않는다.
+
+"""
+
+GROUPS_FORMAT = """  "groups": [
+    {
+      "group_id": 1,
+      "article_ids": [1, 3, 5],
+      "reason": "예: 삼성전자 사장단 인사 발표를 다룬 중복 기사들"
+    },
+    {
+      "group_id": 2,
+      "article_ids": [2, 4],
+      "reason": "예: 같은 반도체 투자 계약 관련 기사들"
+    }
+    // 중복 기사가 없다면 groups는 빈 배열 [] 로 둔다.
+  ]"""
 
 
 def summarize_and_group_with_llm(brief_articles):
@@ -88,23 +318,38 @@ def summarize_and_group_with_llm(brief_articles):
     여러 기사 정보를 한 번에 LLM에 넘겨서:
     1) 각 기사 summary_ko 생성
     2) 내용이 유사하거나 사실상 같은 기사끼리 그룹핑 정보 생성
+       (GROUPING_MODE=minhash 면 그룹핑은 near_dup.py 가 하므로 요약만 시킴)
 
     👉 여기서 GPT-4o-mini를 사용.
+    return: parse_llm_response 결과 (articles 항목, groups, 응답이 온전했는지)
     """
-
-    articles_json = json.dumps(brief_articles, ensure_ascii=False, indent=2)
+    global _response_format_ok
+
+    articles_json = llm_payload(brief_articles)
+    # 예전 형식(들여쓰기 + url 포함)이었으면 들었을 토큰과 비교해서 집계
+    verbose_tokens = estimate_tokens(json.dumps(brief_articles, ensure_ascii=False, indent=2))
+    payload_tokens = estimate_tokens(articles_json)
+    with _stats_lock:
+        _prompt_stats["verbose_tokens"] += verbose_tokens
+        _prompt_stats["payload_tokens"] += payload_tokens
+    inc("llm_payload_tokens_total", payload_tokens, kind="sent")
+    inc("llm_payload_tokens_total", max(0, verbose_tokens - payload_tokens), kind="saved")
+    with_groups = grouping_mode() == "llm"
+    grouping_task = GROUPING_TASK if with_groups else ""
+    groups_format = GROUPS_FORMAT if with_groups else '  "groups": []'
+    task_count = "두 가지다" if with_groups else "한 가지다"
 
     prompt = f"""
 너는 한국어 뉴스 기사의 감정분석 전처리를 담당하는 도우미야.
 
 아래 JSON 배열 articles에는 여러 뉴스 기사 정보가 들어 있다.
-각 원소에는 id, title, url, content 가 있다.
-content 는 기사 본문 전체 혹은 앞부분이다.
+각 원소에는 id, title, content 가 있다.
+content 는 기사 본문 전체 혹은 앞부분이나 주요 문장 발췌다.
 
 articles:
 {articles_json}
 
-너의 역할은 두 가지다.
+너의 역할은 {task_count}.
 
 1) 각 기사에 대해 감정분석에 쓰기 좋은 요약 summary_ko를 생성한다.
    - summary_ko는 한국어 문장으로 작성한다.
@@ -115,13 +360,7 @@ articles:
    - 새로운 의견을 만들어내지 말고, 기사에 실제로 등장하는 평가/분위기만 반영한다.
    - 문장은 모두 평서형으로 끝낸다.
 
-2) 서로 내용이 실질적으로 동일하거나, 같은 뉴스 이벤트를 약간 다른 표현으로 전하는 중복 기사들을 그룹으로 묶는다.
-   - 같은 기업/인물/사건/날짜/수치 등을 공유하며, 사실상 같은 뉴스를 반복 보도한 것으로 판단되면 같은 그룹에 넣는다.
-   - 제목이 다르더라도, 내용이 같은 사건을 다루면 같은 그룹이다.
-   - 한 그룹은 2개 이상의 기사 id를 포함해야 한다. (1개만 있으면 그룹으로 만들지 않는다.)
-   - 서로 겹치지 않는 단독 기사는 그룹에 포함시키지 않는다.
-
-반드시 아래 형식의 JSON만 출력하라. 다른 설명 문장은 절대 출력하지 마라.
+{grouping_task}반드시 아래 형식의 JSON만 출력하라. 다른 설명 문장은 절대 출력하지 마라.
 
 {{
   "articles": [
@@ -135,85 +374,322 @@ articles:
     }}
     // 모든 기사에 대해 1개씩 id, summary_ko 쌍을 넣는다.
   ],
-  "groups": [
-    {{
-      "group_id": 1,
-      "article_ids": [1, 3, 5],
-      "reason": "예: 삼성전자 사장단 인사 발표를 다룬 중복 기사들"
-    }},
-    {{
-      "group_id": 2,
-      "article_ids": [2, 4],
-      "reason": "예: 같은 반도체 투자 계약 관련 기사들"
-    }}
-    // 중복 기사가 없다면 groups는 빈 배열 [] 로 둔다.
-  ]
+{groups_format}
 }}
 """
 
+    messages = [
+        {
+            "role": "system",
+            "content": "너는 한국어 뉴스 기사의 요약과 중복 기사 그룹핑을 위한 도우미야. 반드시 JSON만 출력해.",
+        },
+        {
+            "role": "user",
+            "content": prompt,
+        },
+    ]
+    extra = {}
+    fmt = response_format()
+    if fmt is not None:
+        extra["response_format"] = fmt
+
     # OpenAI Chat Completions API 호출 (GPT-4o-mini)
-    completion = client.chat.completions.create(
-        model=OPENAI_MODEL_NAME,
-        messages=[
-            {
-                "role": "system",
-                "content": "너는 한국어 뉴스 기사의 요약과 중복 기사 그룹핑을 위한 도우미야. 반드시 JSON만 출력해.",
-            },
-            {
-                "role": "user",
-                "content": prompt,
-            },
-        ],
-        temperature=0.2,
-    )
+    with timed("llm_request_seconds"):
+        try:
+            completion = get_client().chat.completions.create(
+                model=OPENAI_MODEL_NAME, messages=messages, temperature=0.2, **extra
+            )
+        except Exception as e:
+            if not extra or "response_format" not in str(e):
+                raise
+            print(f"⚠️ response_format 을 지원하지 않는 엔드포인트/모델 → 프롬프트 지시만으로 JSON 요청: {e}")
+            _response_format_ok = False
+            completion = get_client().chat.completions.create(
+                model=OPENAI_MODEL_NAME, messages=messages, temperature=0.2
+            )
+
+    inc("llm_requests_total")
+    inc("llm_articles_total", len(brief_articles))
+    usage = getattr(completion, "usage", None)
+    if usage is not None:
+        inc("llm_tokens_total", getattr(usage, "prompt_tokens", 0) or 0, kind="prompt")
+        inc("llm_tokens_total", getattr(usage, "completion_tokens", 0) or 0, kind="completion")
 
     content = completion.choices[0].message.content.strip()
     if not content:
         raise RuntimeError("LLM 응답이 비어 있음")
 
     try:
-        parsed = extract_json_from_text(content)
+        return parse_llm_response(content)
     except Exception as e:
         print("⚠️ LLM JSON 파싱 실패, 원문 일부 출력:")
         print(content[:500])
         raise e
 
-    return parsed
 
+def valid_results(batch, items, groups):
+    """
+    응답 항목 중 이 배치의 id 이고 summary_ko 가 비어 있지 않은 문자열인 것만 (나머지는 다시 요청할 대상).
+    그룹도 이 배치의 id 만 남기고 2건 미만이 되면 버림.
+    return: (summaries {str(id): summary_ko}, groups)
+    """
+    expected = {str(b["id"]) for b in batch}
+    summaries = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        aid = str(item.get("id"))
+        summary = item.get("summary_ko")
+        if aid in expected and isinstance(summary, str) and summary.strip():
+            summaries[aid] = summary.strip()
+
+    kept = []
+    for g in groups:
+        if not isinstance(g, dict):
+            continue
+        ids = [i for i in g.get("article_ids") or [] if str(i) in expected]
+        if len(ids) >= 2:
+            kept.append({**g, "article_ids": ids})
+    return summaries, kept
+
+
+def summarize_batch_with_retry(batch, attempt: int = 0):
+    """
+    배치 하나 요약.
+    - 응답에서 빠지거나 형식이 깨진 기사(잘린 응답 포함)는 그 기사들만 모아서 다시 요청 (MAX_MISSING_RETRIES 번까지)
+    - 호출 자체가 실패하면(API 오류 / JSON 을 전혀 못 읽음) 반으로 나눠서 다시 시도,
+      기사 1건까지 실패하면 그 기사는 요약 없이 둠
+    return: (summaries {str(id): summary_ko}, groups, 실패한 기사 수)
+    """
+    try:
+        items, groups, complete = summarize_and_group_with_llm(batch)
+    except Exception as e:
+        inc("llm_batches_total", result="error")
+        if len(batch) == 1:
+            print(f"[경고] LLM 요약 실패 (id={batch[0]['id']}, 요약 없이 진행): {e}")
+            return {}, [], 1
+        half = len(batch) // 2
+        print(f"[경고] LLM 배치 실패 (기사 {len(batch)}건) → {half}건 / {len(batch) - half}건으로 나눠 재시도: {e}")
+        left = summarize_batch_with_retry(batch[:half], attempt)
+        right = summarize_batch_with_retry(batch[half:], attempt)
+        return {**left[0], **right[0]}, left[1] + right[1], left[2] + right[2]
+
+    # items 예시: [{"id": 1, "summary_ko": "..."} ...], groups: [{"group_id": 1, "article_ids": [...], "reason": "..."}]
+    # GPT 응답에서 id → summary 매핑 (id를 str로 통일해서 안전하게)
+    summaries, groups = valid_results(batch, items, groups)
+    missing = [b for b in batch if str(b["id"]) not in summaries]
+    inc("llm_batches_total", result="partial" if missing else "ok")
+    if not complete:
+        with _stats_lock:
+            _prompt_stats["salvaged"] += len(summaries)
+    if not missing:
+        return summaries, groups, 0
+
+    if attempt >= MAX_MISSING_RETRIES:
+        print(f"[경고] {attempt + 1}번 요청해도 요약이 없는 기사 {len(missing)}건 (요약 없이 진행)")
+        return summaries, groups, len(missing)
+
+    with _stats_lock:
+        _prompt_stats["retried"] += len(missing)
+        _prompt_stats["resent_saved"] += len(batch) - len(missing)
+    inc("llm_missing_retries_total", len(missing))
+    shown = ", ".join(str(b["id"]) for b in missing[:10]) + (" ..." if len(missing) > 10 else "")
+    reason = "응답이 잘림" if not complete else "응답에서 빠지거나 형식이 깨짐"
+    print(f"   ↻ {reason}: 기사 {len(missing)}건만 다시 요청 (id={shown})")
+    retry_summaries, retry_groups, failed = summarize_batch_with_retry(missing, attempt + 1)
+    return {**summaries, **retry_summaries}, groups + retry_groups, failed
+
+
+def report_prompt_savings():
+    """실행 동안 LLM 입력을 줄인 양 출력 (압축한 기사 JSON / 빠진 기사만 다시 요청)"""
+    with _stats_lock:
+        st = dict(_prompt_stats)
+    if st["head_tokens"]:
+        saved = st["head_tokens"] - st["compressed_tokens"]
+        print(
+            f"   본문 사전 압축: 앞 {MAX_CONTENT_CHARS}자 자르기 기준 약 {st['head_tokens']:,}토큰 → "
+            f"{st['compressed_tokens']:,}토큰 ({saved:,}토큰 절약, {saved / st['head_tokens']:.0%})"
+        )
+    if not st["verbose_tokens"]:
+        return
+    saved = st["verbose_tokens"] - st["payload_tokens"]
+    print(
+        f"   LLM 입력 압축: 기사 JSON 약 {st['verbose_tokens']:,}토큰 → {st['payload_tokens']:,}토큰 "
+        f"({saved:,}토큰 절약, {saved / st['verbose_tokens']:.0%})"
+    )
+    if st["retried"] or st["salvaged"]:
+        print(
+            f"   빠진 기사만 다시 요청: {st['retried']}건 (배치 전체를 다시 보냈으면 기사 {st['resent_saved']}건 더), "
+            f"잘린 응답에서 건진 요약 {st['salvaged']}건"
+        )
 
-def main():
-    # 1) 기사 + 본문 로드
-    articles = load_articles(INPUT_FILE)
 
-    if not articles:
-        print("⚠️ 처리할 기사가 없습니다.")
-        return
+def summarize_in_batches(brief_articles, concurrency: int = LLM_CONCURRENCY):
+    """
+    토큰 한도로 나눈 배치들을 최대 concurrency 개씩 동시에 LLM 호출 → 요약 합치기.
+    중복 그룹은 배치 안에서만 묶이고, group_id 는 전체 기준으로 다시 매김.
+    모든 배치가 실패하면 예외 (일부만 실패하면 그 기사들만 요약 없이).
+    return: (summaries, groups)
+    """
+    batches = make_token_batches(brief_articles)
+    if len(batches) > 1:
+        print(f"   LLM 배치 {len(batches)}개로 나눠서 호출 (동시 {min(concurrency, len(batches))}개)")
 
-    # 2) LLM에 넘길 간단 버전 생성
-    brief_articles = build_brief_articles(articles)
+    if len(batches) == 1:
+        results = [summarize_batch_with_retry(batches[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(batches)))) as pool:
+            results = list(pool.map(summarize_batch_with_retry, batches))
 
-    print("\n=== GPT-4o-mini 요약 + 중복 그룹핑 호출 ===")
-    print(f"   전달할 기사 수: {len(brief_articles)}")
-    time.sleep(0.5)
+    summaries, groups, failed = {}, [], 0
+    for batch_summaries, batch_groups, batch_failed in results:
+        summaries.update(batch_summaries)
+        failed += batch_failed
+        for g in batch_groups:
+            groups.append({**g, "group_id": len(groups) + 1})
 
-    # 3) LLM 호출
-    result = summarize_and_group_with_llm(brief_articles)
+    if failed == len(brief_articles):
+        raise RuntimeError(f"LLM 요약이 모든 배치에서 실패 (기사 {failed}건)")
+    if failed:
+        print(f"   ⚠️ LLM 요약 실패로 요약 없이 남은 기사: {failed}건 (다음 실행에서 다시 시도)")
+    return summaries, groups
 
-    # result 예시:
-    # {
-    #   "articles": [{"id": 1, "summary_ko": "..."} ...],
-    #   "groups": [{"group_id": 1, "article_ids": [...], "reason": "..."} ...]
-    # }
 
-    # GPT 응답에서 id → summary 매핑 (id를 str로 통일해서 안전하게)
-    article_summaries = {
-        str(a["id"]): a["summary_ko"] for a in result.get("articles", [])
+def summarize_articles(articles):
+    """
+    기사들(iterator 여도 됨, 간단 버전만 메모리에 보관) 요약 + 중복 그룹핑.
+    - --resume 이면 체크포인트에 같은 입력으로 요약된 기사는 LLM 에 안 보내고 저장된 요약 사용
+      (그 기사들의 그룹도 저장된 그룹 키로 다시 묶음)
+    - 같은 본문(앞부분) + 모델 + 프롬프트 버전으로 요약한 적이 있으면 요약 캐시에서 가져오고 LLM 에는 안 보냄
+      (캐시에서 가져온 기사끼리는 본문이 똑같으면 같은 그룹)
+    - GROUPING_MODE=minhash 면 그룹은 LLM 대신 near_dup.py 로 (체크포인트 / 캐시에서 가져온 기사 포함 전체)
+    - 요약을 받은 기사는 체크포인트에 기록 (비어 있으면 기록 안 함 → 다음에 다시 시도)
+    return: (summaries {str(id): summary_ko}, groups, 전체 기사 수, 건너뛴 기사 수)
+    """
+    ledger = get_ledger()
+    resume = resume_enabled()
+
+    brief_articles = []
+    all_briefs = []  # minhash 그룹핑용 (전체 기사)
+    pending = {}   # str(id) → (url, 입력 해시)  LLM 에 보낼 기사
+    resumed = {}   # str(id) → 체크포인트에 있던 결과
+    total = 0
+    for a in articles:
+        total += 1
+        brief = build_brief_articles([a])[0]
+        all_briefs.append(brief)
+        aid = str(brief["id"])
+        h = input_hash(OPENAI_MODEL_NAME, brief["title"], brief["content"])
+        done = ledger.lookup(brief["url"], "summary", h) if resume else None
+        if done and done.get("summary_ko"):
+            resumed[aid] = done
+            continue
+        brief_articles.append(brief)
+        pending[aid] = (brief["url"], h)
+
+    # 요약 캐시 확인 → miss 만 LLM 에
+    cache = get_summary_cache()
+    cache_keys = {}
+    cached = {}    # str(id) → 캐시에 있던 요약
+    if cache is not None and brief_articles:
+        cache_keys = {
+            str(b["id"]): summary_key(b["content"], OPENAI_MODEL_NAME, prompt_version()) for b in brief_articles
+        }
+        found = cache.get_many(cache_keys.values())
+        cached = {aid: found[k] for aid, k in cache_keys.items() if k in found}
+        inc("summary_cache_total", len(cached), result="hit")
+        inc("summary_cache_total", len(brief_articles) - len(cached), result="miss")
+        brief_articles = [b for b in brief_articles if str(b["id"]) not in cached]
+
+    summaries = {}
+    groups = []
+    if brief_articles:
+        print("\n=== GPT-4o-mini 요약 + 중복 그룹핑 호출 ===")
+        reused = ", ".join(
+            f"{name} {n}건" for name, n in (("체크포인트 재사용", len(resumed)), ("요약 캐시", len(cached))) if n
+        )
+        print(f"   전달할 기사 수: {len(brief_articles)}" + (f" ({reused})" if reused else ""))
+        time.sleep(0.5)
+
+        summaries, groups = summarize_in_batches(brief_articles)
+        if cache is not None:
+            cache.put_many(
+                (cache_keys.get(str(b["id"])), summaries.get(str(b["id"]))) for b in brief_articles
+            )
+
+        # 그룹은 기사 id 가 실행마다 바뀌므로 멤버 URL 로 만든 키로 기록
+        group_of = {}
+        for g in groups:
+            member_ids = [str(i) for i in g.get("article_ids", [])]
+            key = input_hash(*sorted(pending[i][0] or "" for i in member_ids if i in pending))
+            for i in member_ids:
+                group_of[i] = {"key": key, "reason": g.get("reason", "")}
+
+        for aid, (url, h) in pending.items():
+            if summaries.get(aid) and aid not in cached:
+                ledger.record(url, "summary", h, {"summary_ko": summaries[aid], "group": group_of.get(aid)})
+
+    if cached:
+        # 본문이 똑같은 기사(같은 캐시 키)끼리는 중복 그룹
+        by_key = {}
+        for aid, summary in cached.items():
+            summaries[aid] = summary
+            by_key.setdefault(cache_keys[aid], []).append(aid)
+        group_key = {}
+        for ids in by_key.values():
+            if len(ids) >= 2:
+                groups.append({
+                    "group_id": len(groups) + 1,
+                    "article_ids": [int(i) if i.isdigit() else i for i in ids],
+                    "reason": "본문이 같은 기사",
+                })
+                key = input_hash(*sorted(pending[i][0] or "" for i in ids))
+                for i in ids:
+                    group_key[i] = {"key": key, "reason": "본문이 같은 기사"}
+        for aid in cached:
+            url, h = pending[aid]
+            ledger.record(url, "summary", h, {"summary_ko": summaries[aid], "group": group_key.get(aid)})
+
+    inc("articles_total", total, stage="summary")
+    if resumed:
+        by_key = {}
+        for aid, done in resumed.items():
+            summaries[aid] = done["summary_ko"]
+            g = done.get("group")
+            if g:
+                by_key.setdefault(g["key"], {"ids": [], "reason": g.get("reason", "")})["ids"].append(aid)
+        for g in by_key.values():
+            if len(g["ids"]) >= 2:
+                groups.append({
+                    "group_id": len(groups) + 1,
+                    "article_ids": [int(i) if i.isdigit() else i for i in g["ids"]],
+                    "reason": g["reason"],
+                })
+
+    if grouping_mode() == "minhash":
+        with timed("near_dup_seconds"):
+            groups = group_near_duplicates(all_briefs, index=get_near_dup_index())
+
+    return summaries, groups, total, len(resumed)
+
+
+def merge_summary(a, summary: str) -> dict:
+    # step3 형식: step2 필드 + summary_ko
+    return {
+        "id": a.get("id"),
+        "query": a.get("query"),
+        "title": a.get("title"),
+        "url": a.get("url"),
+        "pubDate": a.get("pubDate"),
+        "description": a.get("description"),
+        **carry_body(a),
+        "summary_ko": summary,
     }
 
-    # 4) 원래 기사 리스트에 summary_ko 붙이기
-    merged_articles = []
-    missing_summary = 0
 
+def write_merged(writer, articles, article_summaries) -> int:
+    """기사에 summary_ko 붙여서 한 건씩 저장 + 콘솔에 요약 결과 출력. return: 요약이 비어 있는 기사 수"""
+    missing_summary = 0
     for a in articles:
         aid = a.get("id")
         summary = article_summaries.get(str(aid))
@@ -221,32 +697,65 @@ def main():
             missing_summary += 1
             summary = ""  # 비어 있으면 나중에 다시 처리해도 됨
 
-        merged_articles.append(
-            {
-                "id": aid,
-                "query": a.get("query"),
-                "title": a.get("title"),
-                "url": a.get("url"),
-                "content": a.get("content"),
-                "summary_ko": summary,
-            }
-        )
+        merged = merge_summary(a, summary)
+        writer.write(merged)
+
+        vprint(f"\n[ID {merged['id']}] {merged['title']}")
+        vprint(f"URL: {merged['url']}")
+        if merged["summary_ko"]:
+            vprint(f"요약: {merged['summary_ko']}")
+        else:
+            vprint("요약: (없음)")
+    return missing_summary
+
+
+def summarize_windows(writer):
+    """
+    메모리 제한 모드: SUMMARY_WINDOW 건씩 읽어서 요약 → 바로 기록.
+    한 번에 들고 있는 건 창 하나 분량의 레코드(본문은 content_ref)뿐.
+    중복 그룹은 창 안에서만 묶임 (group_id 는 창을 넘어 이어서 매김).
+    return: (groups, 전체 기사 수, 체크포인트 재사용 수, 요약이 비어 있는 기사 수)
+    """
+    groups = []
+    total = resumed = missing_summary = 0
+    for window in chunked(iter_articles(INPUT_FILE, follow=FOLLOW_INPUT), SUMMARY_WINDOW):
+        print(f"📥 요약 창: 기사 {len(window)}건 (누적 {total + len(window)}건)")
+        summaries, window_groups, n, r = summarize_articles(window)
+        total += n
+        resumed += r
+        for g in window_groups:
+            groups.append({**g, "group_id": len(groups) + 1})
+        missing_summary += write_merged(writer, window, summaries)
+    return groups, total, resumed, missing_summary
 
-    groups = result.get("groups", [])
 
-    # 5) 콘솔에 요약 결과 출력
+def main():
     print("\n==============================")
     print("=== 기사별 요약 결과 출력 ===")
     print("==============================")
-    for a in merged_articles:
-        print(f"\n[ID {a['id']}] {a['title']}")
-        print(f"URL: {a['url']}")
-        if a["summary_ko"]:
-            print(f"요약: {a['summary_ko']}")
+
+    with ArticleWriter(OUTPUT_FILE, with_groups=True) as writer:
+        if bounded_enabled():
+            groups, total, resumed, missing_summary = summarize_windows(writer)
         else:
-            print("요약: (없음)")
+            # 1) 기사 + 본문을 한 건씩 읽으면서 LLM에 넘길 간단 버전만 메모리에 보관
+            #    (본문 전체는 아래 3)에서 파일을 한 번 더 훑으면서 결과에 붙임)
+            # 2) LLM 호출 (체크포인트에 요약이 있는 기사는 빼고)
+            article_summaries, groups, total, resumed = summarize_articles(
+                iter_articles(INPUT_FILE, follow=FOLLOW_INPUT)
+            )
+            # 3) 원래 기사에 summary_ko 붙여서 한 건씩 저장
+            missing_summary = write_merged(writer, iter_articles(INPUT_FILE), article_summaries) if total else 0
+        writer.set_groups(groups)
+
+    print(f"📥 요약/그룹핑 대상 기사 개수: {total}")
+    if total == 0:
+        print("⚠️ 처리할 기사가 없습니다.")
+        return
+    if resumed:
+        print(f"   ⏭ 체크포인트에서 요약을 가져온 기사: {resumed}건")
 
-    # 6) 콘솔에 그룹핑 결과 출력
+    # 4) 콘솔에 그룹핑 결과 출력
     print("\n==============================")
     print("=== 중복 그룹핑 결과 출력 ===")
     print("==============================")
@@ -260,21 +769,17 @@ def main():
             print(f"\n[그룹 {gid}] 기사 ID들: {ids}")
             print(f"이유: {reason}")
 
-    # 7) 최종 결과 저장
-    output_data = {
-        "articles": merged_articles,
-        "groups": groups,
-    }
-
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
-
     print("\n✅ GPT-4o-mini 요약 + 중복 그룹핑 완료")
-    print(f"   기사 수: {len(merged_articles)}")
+    print(f"   기사 수: {writer.count}")
     print(f"   그룹 수: {len(groups)}")
     if missing_summary > 0:
         print(f"   ⚠️ 요약이 비어 있는 기사 수: {missing_summary}")
     print(f"   저장 파일: {OUTPUT_FILE}")
+    report_prompt_savings()
+    cache = get_summary_cache()
+    if cache is not None:
+        cache.report()
+    get_ledger().report()
 
 
 if __name__ == "__main__":
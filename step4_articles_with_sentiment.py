@@ -1,55 +1,59 @@
-import json
-from transformers import pipeline
+import threading
+
 from dotenv import load_dotenv
 import os
 
+from checkpoint_ledger import get_ledger, input_hash, resume_enabled
+from jsonl_io import FOLLOW_INPUT, ArticleWriter, iter_articles, read_groups, step_file
+from metrics import inc, timed, vprint
+from spill_store import article_content
+from story_index import STORY_BATCH, get_story_index, story_clusters_enabled, with_stories
+
 # ================================
 # 0. .env에서 HF 토큰 읽기
 # ================================
 load_dotenv()  # .env 파일 로드
 
 HF_TOKEN = os.getenv("huggingface_api_token")  # .env에 있는 키 이름이 hf_token이라고 가정
-if not HF_TOKEN:
-    raise RuntimeError("❌ .env 파일에 hf_token 이 없습니다. hfcl_token=... 형태로 추가해 주세요.")
 
 # ================================
 # 1. 감정분석 모델 설정
 # ================================
 MODEL_NAME = "DataWizardd/finbert-sentiment-ko"
 
-print(f"📦 감정분석 모델 로딩 중: {MODEL_NAME}")
-sentiment_pipe = pipeline(
-    "text-classification",
-    model=MODEL_NAME,
-    token=HF_TOKEN,      # ✅ 여기서 HF 토큰 사용
-    top_k=None,          # return_all_scores=True 대신 권장 방식
-)
-
-# ================================
-# 2. 입출력 파일
-# ================================
-INPUT_FILE = "step3_articles_with_summary_and_groups.json"  # 3단계 결과
-OUTPUT_FILE = "step4_articles_with_sentiment.json"          # 4단계 최종 결과
+_sentiment_pipe = None
+_init_lock = threading.Lock()
 
 
-def load_step3(input_file: str):
+def get_sentiment_pipe():
     """
-    step3 결과 파일 구조:
-    {
-      "articles": [ {...}, {...}, ... ],
-      "groups": [ {...}, {...}, ... ]
-    }
+    FinBERT 파이프라인은 처음 감정분석할 때 로딩 (transformers/torch import + 모델 로딩이 수 초 걸림).
+    import 만 할 때는 transformers / HF 토큰 불필요.
     """
-    with open(input_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    global _sentiment_pipe
+    with _init_lock:
+        if _sentiment_pipe is None:
+            if not HF_TOKEN:
+                raise RuntimeError("❌ .env 파일에 hf_token 이 없습니다. hfcl_token=... 형태로 추가해 주세요.")
 
-    articles = data.get("articles", [])
-    groups = data.get("groups", [])
+            from transformers import pipeline
 
-    print(f"📥 기사 개수: {len(articles)}")
-    print(f"📥 그룹 개수: {len(groups)}")
+            print(f"📦 감정분석 모델 로딩 중: {MODEL_NAME}")
+            with timed("model_load_seconds", model="finbert"):
+                _sentiment_pipe = pipeline(
+                    "text-classification",
+                    model=MODEL_NAME,
+                    token=HF_TOKEN,      # ✅ 여기서 HF 토큰 사용
+                    top_k=None,          # return_all_scores=True 대신 권장 방식
+                )
+        return _sentiment_pipe
 
-    return articles, groups
+
+# ================================
+# 2. 입출력 파일
+# ================================
+INPUT_FILE = step_file("step3_articles_with_summary_and_groups")  # 3단계 결과
+OUTPUT_FILE = step_file("step4_articles_with_sentiment")          # 4단계 최종 결과
 
 
 def compute_k_index(p_pos: float, p_neu: float, p_neg: float):
@@ -101,11 +105,16 @@ def analyze_sentiment(text: str):
     if len(snippet) > 512:
         snippet = snippet[:512]
 
+    # 모델 로딩 실패(토큰 없음 등)는 기사별 오류로 삼키지 않고 바로 올림
+    sentiment_pipe = get_sentiment_pipe()
+
     try:
         # top_k=None → 모든 라벨 확률 반환
         # 결과 형태: [[{"label": "...", "score": ...}, ...]]
-        outputs = sentiment_pipe(snippet, truncation=True)[0]
+        with timed("finbert_inference_seconds"):
+            outputs = sentiment_pipe(snippet, truncation=True)[0]
     except Exception as e:
+        inc("finbert_errors_total")
         print(f"   ⚠️ 감정분석 중 오류 발생: {e}")
         return {
             "label": "ERROR",
@@ -155,70 +164,121 @@ def analyze_sentiment(text: str):
     }
 
 
-def main():
-    articles, groups = load_step3(INPUT_FILE)
+def pick_target_text(a):
+    """
+    감정분석에 넣을 텍스트 고르기: summary_ko 우선, 없으면 본문 앞 512자.
+    return: (텍스트, "summary" / "content" / "")
+    """
+    summary = (a.get("summary_ko") or "").strip()
+    if summary:
+        return summary, "summary"
+    # 본문은 요약이 없을 때만 앞부분만 꺼냄 (메모리 제한 모드면 본문 보관소에서)
+    content = article_content(a, 512 + 200).strip()
+    if content:
+        return content[:512], "content"
+    return "", ""
 
-    enriched_articles = []
 
-    print("\n=== 감정분석 시작 (KR-FinBERT 기반 0~100 지표 계산) ===")
+def analyze_article(a):
+    """
+    기사 1건 감정분석 (체크포인트 확인 → 없으면 모델 실행 → 정상 결과만 기록).
+    return: (sentiment_result, 텍스트 출처 "summary"/"content"/"", 체크포인트 재사용 여부)
+    """
+    target_text, source = pick_target_text(a)
+    url = a.get("url")
+    h = input_hash(MODEL_NAME, target_text)
 
-    for idx, a in enumerate(articles, start=1):
-        aid = a.get("id")
-        title = a.get("title")
-        summary = (a.get("summary_ko") or "").strip()
-        content = (a.get("content") or "").strip()
-
-        print("\n" + "=" * 90)
-        print(f"▶ [{idx}/{len(articles)}] ID={aid}")
-        print(f"제목: {title}")
-
-        if summary:
-            target_text = summary
-            print("   → summary_ko 기반 감정분석")
-        elif content:
-            target_text = content[:512]
-            print("   → summary_ko 없음, 본문 앞부분으로 감정분석")
-        else:
-            target_text = ""
-            print("   → 분석할 텍스트 없음, UNKNOWN 처리 예정")
-
-        sentiment_result = analyze_sentiment(target_text)
-
-        print(
-            f"   [감정분석 결과] label={sentiment_result['label']}, "
-            f"raw={sentiment_result['raw_score']:.4f}, "
-            f"index={sentiment_result['sentiment_index']:.2f}, "
-            f"zone={sentiment_result['sentiment_zone']}"
-        )
-        print(
-            f"   [확률] 긍정={sentiment_result['prob_positive']:.3f}, "
-            f"중립={sentiment_result['prob_neutral']:.3f}, "
-            f"부정={sentiment_result['prob_negative']:.3f}"
-        )
-
-        enriched = {
-            **a,
-            "sentiment_label": sentiment_result["label"],
-            "sentiment_raw_score": sentiment_result["raw_score"],
-            "sentiment_prob_positive": sentiment_result["prob_positive"],
-            "sentiment_prob_neutral": sentiment_result["prob_neutral"],
-            "sentiment_prob_negative": sentiment_result["prob_negative"],
-            "sentiment_index": sentiment_result["sentiment_index"],
-            "sentiment_zone": sentiment_result["sentiment_zone"],
-        }
-        enriched_articles.append(enriched)
+    if resume_enabled():
+        done = get_ledger().lookup(url, "score", h)
+        if done:
+            return done, source, True
+
+    sentiment_result = analyze_sentiment(target_text)
+    inc("articles_total", stage="score", source=source or "none")
+    if sentiment_result["label"] != "ERROR":
+        get_ledger().record(url, "score", h, sentiment_result)
+    return sentiment_result, source, False
 
-    output_data = {
-        "articles": enriched_articles,
-        "groups": groups,
+
+def enrich_with_sentiment(a, sentiment_result) -> dict:
+    # step4 형식: step3 필드 + sentiment_*
+    return {
+        **a,
+        "sentiment_label": sentiment_result["label"],
+        "sentiment_raw_score": sentiment_result["raw_score"],
+        "sentiment_prob_positive": sentiment_result["prob_positive"],
+        "sentiment_prob_neutral": sentiment_result["prob_neutral"],
+        "sentiment_prob_negative": sentiment_result["prob_negative"],
+        "sentiment_index": sentiment_result["sentiment_index"],
+        "sentiment_zone": sentiment_result["sentiment_zone"],
     }
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+
+def main():
+    print("\n=== 감정분석 시작 (KR-FinBERT 기반 0~100 지표 계산) ===")
+
+    # step3 결과를 한 건씩 읽고 → 감정분석 → 바로 기록 (전체를 메모리에 안 들고 있음)
+    # 스토리 클러스터를 켜면 STORY_BATCH 건씩 모아서 한 번에 임베딩한 뒤 기록
+    with ArticleWriter(OUTPUT_FILE, with_groups=True) as writer:
+        pending = []
+
+        def flush_stories():
+            # 이전 실행까지 이어지는 스토리 번호 (story_index.py)
+            for record in with_stories(pending):
+                vprint(f"   [스토리] {record.get('id')} → story_id={record['story_id']}")
+                writer.write(record)
+            pending.clear()
+
+        for idx, a in enumerate(iter_articles(INPUT_FILE, follow=FOLLOW_INPUT), start=1):
+            aid = a.get("id")
+            title = a.get("title")
+
+            vprint("\n" + "=" * 90)
+            vprint(f"▶ [{idx}] ID={aid}")
+            vprint(f"제목: {title}")
+
+            sentiment_result, source, resumed = analyze_article(a)
+            if resumed:
+                vprint("   → ⏭ 체크포인트의 감정분석 결과 재사용")
+            elif source == "summary":
+                vprint("   → summary_ko 기반 감정분석")
+            elif source == "content":
+                vprint("   → summary_ko 없음, 본문 앞부분으로 감정분석")
+            else:
+                vprint("   → 분석할 텍스트 없음, UNKNOWN 처리")
+
+            vprint(
+                f"   [감정분석 결과] label={sentiment_result['label']}, "
+                f"raw={sentiment_result['raw_score']:.4f}, "
+                f"index={sentiment_result['sentiment_index']:.2f}, "
+                f"zone={sentiment_result['sentiment_zone']}"
+            )
+            vprint(
+                f"   [확률] 긍정={sentiment_result['prob_positive']:.3f}, "
+                f"중립={sentiment_result['prob_neutral']:.3f}, "
+                f"부정={sentiment_result['prob_negative']:.3f}"
+            )
+
+            record = enrich_with_sentiment(a, sentiment_result)
+            if story_clusters_enabled():
+                pending.append(record)
+                if len(pending) >= STORY_BATCH:
+                    flush_stories()
+            else:
+                writer.write(record)
+        flush_stories()
+
+        # groups 는 step3 이 기사를 다 쓴 뒤에 확정되므로 마지막에 읽어서 그대로 넘김
+        groups = read_groups(INPUT_FILE)
+        writer.set_groups(groups)
 
     print("\n✅ 감정분석 완료 (0~100 지표 포함)")
-    print(f"   총 기사 수: {len(enriched_articles)}")
+    print(f"   총 기사 수: {writer.count}")
+    print(f"   그룹 수: {len(groups)}")
     print(f"   저장 파일: {OUTPUT_FILE}")
+    if story_clusters_enabled():
+        get_story_index().report()
+    get_ledger().report()
 
 
 if __name__ == "__main__":
@@ -1,8 +1,11 @@
 # step5_save_to_db.py
-import json
-import pymysql
 from datetime import datetime
 
+from checkpoint_ledger import get_ledger, input_hash, resume_enabled
+from jsonl_io import FOLLOW_INPUT, iter_articles, read_articles, read_groups, step_file
+from metrics import inc, timed
+from spill_store import article_content
+
 # ================================
 # 0. DB 접속 설정
 # ================================
@@ -12,10 +15,16 @@ DB_USER = "root"
 DB_PASSWORD = "changmin"
 DB_NAME = "test"   # HeidiSQL에서 쓰는 DB 이름
 
-INPUT_FILE = "step4_articles_with_sentiment.json"
+INPUT_FILE = step_file("step4_articles_with_sentiment")
+
+# 기사 이만큼 저장할 때마다 커밋 (스트리밍으로 읽을 때 트랜잭션이 끝없이 커지지 않게)
+COMMIT_EVERY = 500
 
 
 def get_connection():
+    # pymysql 은 실제로 DB 에 붙을 때만 import (step1~4 만 돌릴 때는 설치 안 돼 있어도 됨)
+    import pymysql
+
     return pymysql.connect(
         host=DB_HOST,
         port=DB_PORT,
@@ -91,9 +100,7 @@ def ensure_tables(conn):
 # 2. JSON 로드 + 날짜 파싱
 # ================================
 def load_json(path: str):
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return data.get("articles", []), data.get("groups", [])
+    return read_articles(path), read_groups(path)
 
 
 def parse_article_datetime(article) -> datetime:
@@ -132,120 +139,186 @@ def parse_article_datetime(article) -> datetime:
 # ================================
 # 3. Companies / News / Sentiments 저장
 # ================================
+NEWS_SQL = """
+INSERT INTO News (
+    title, date, full_text, url, company_id
+) VALUES (
+    %(title)s, %(date)s, %(full_text)s, %(url)s, %(company_id)s
+)
+ON DUPLICATE KEY UPDATE
+    title      = VALUES(title),
+    date       = VALUES(date),
+    full_text  = VALUES(full_text),
+    company_id = VALUES(company_id),
+    id         = LAST_INSERT_ID(id);  -- 기존 행이어도 lastrowid에 id 들어오게
+"""
+
+SENTIMENTS_SQL = """
+INSERT INTO Sentiments (
+    label, prob_pos, prob_neg, prob_neu, score, date, news_id
+) VALUES (
+    %(label)s, %(prob_pos)s, %(prob_neg)s, %(prob_neu)s,
+    %(score)s, %(date)s, %(news_id)s
+)
+ON DUPLICATE KEY UPDATE
+    label    = VALUES(label),
+    prob_pos = VALUES(prob_pos),
+    prob_neg = VALUES(prob_neg),
+    prob_neu = VALUES(prob_neu),
+    score    = VALUES(score),
+    date     = VALUES(date),
+    id       = LAST_INSERT_ID(id);
+"""
+
+
+def upsert_article(cur, a):
+    """
+    기사 1건을 Companies / News / Sentiments 에 upsert (커밋은 호출하는 쪽에서).
+    return: News.id
+    """
+    # 1) 회사 이름(= query) → Companies 테이블에 upsert
+    company_name = (a.get("query") or "").strip()
+    company_id = None
+
+    if company_name:
+        # 이미 있는지 확인
+        cur.execute(
+            "SELECT id FROM Companies WHERE name = %s",
+            (company_name,),
+        )
+        row = cur.fetchone()
+        if row:
+            company_id = row["id"]
+        else:
+            # 없으면 새로 INSERT
+            cur.execute(
+                "INSERT INTO Companies (name, sector_id) VALUES (%s, %s)",
+                (company_name, None),
+            )
+            company_id = cur.lastrowid
+
+    # 2) 기사 날짜 / 제목 / 본문 / URL 준비
+    article_dt = parse_article_datetime(a)
+
+    title = (a.get("title") or "").strip()
+    if len(title) > 500:
+        title = title[:500]
+
+    url = (a.get("url") or "").strip()
+    if len(url) > 1000:
+        url = url[:1000]
+
+    news_params = {
+        "title": title,
+        "date": article_dt,
+        "full_text": article_content(a),
+        "url": url,
+        "company_id": company_id,
+    }
+
+    # 3) News upsert (URL 기준)
+    cur.execute(NEWS_SQL, news_params)
+    news_id = cur.lastrowid  # 새로 insert든 update든 여기로 기사 PK 확보
+
+    # 4) Sentiments upsert (news_id 기준 1행)
+    sentiment_params = {
+        "label": a.get("sentiment_label") or "",
+        "prob_pos": a.get("sentiment_prob_positive") or 0.0,
+        "prob_neg": a.get("sentiment_prob_negative") or 0.0,
+        "prob_neu": a.get("sentiment_prob_neutral") or 0.0,
+        "score": a.get("sentiment_index") or 0.0,  # 0~100 지표
+        "date": article_dt,
+        "news_id": news_id,
+    }
+    cur.execute(SENTIMENTS_SQL, sentiment_params)
+    return news_id
+
+
+def save_input_hash(a) -> str:
+    """DB 에 들어가는 값들의 해시 (하나라도 바뀌면 다시 저장)"""
+    return input_hash(
+        a.get("query"), a.get("title"), a.get("pubDate"), a.get("content_ref") or a.get("content"),
+        a.get("sentiment_label"), a.get("sentiment_index"),
+        a.get("sentiment_prob_positive"), a.get("sentiment_prob_neutral"), a.get("sentiment_prob_negative"),
+    )
+
+
 def save_articles_to_erd(conn, articles):
     """
     ERD 구조에 맞춰 저장:
       - Companies(name)  : query 기준으로 upsert
       - News             : 기사 본문 / URL 저장 (URL UNIQUE)
       - Sentiments       : 감정 점수 저장 (news_id UNIQUE – 1기사 1행)
+    articles 는 리스트 대신 iterator 여도 됨 (COMMIT_EVERY 건마다 커밋).
+    커밋이 끝난 기사만 체크포인트에 기록, --resume 이면 이미 같은 값으로 저장된 기사는 건너뜀.
+    return: 저장한 기사 수
     """
-    news_sql = """
-    INSERT INTO News (
-        title, date, full_text, url, company_id
-    ) VALUES (
-        %(title)s, %(date)s, %(full_text)s, %(url)s, %(company_id)s
-    )
-    ON DUPLICATE KEY UPDATE
-        title      = VALUES(title),
-        date       = VALUES(date),
-        full_text  = VALUES(full_text),
-        company_id = VALUES(company_id),
-        id         = LAST_INSERT_ID(id);  -- 기존 행이어도 lastrowid에 id 들어오게
-    """
+    ledger = get_ledger()
+    resume = resume_enabled()
 
-    sentiments_sql = """
-    INSERT INTO Sentiments (
-        label, prob_pos, prob_neg, prob_neu, score, date, news_id
-    ) VALUES (
-        %(label)s, %(prob_pos)s, %(prob_neg)s, %(prob_neu)s,
-        %(score)s, %(date)s, %(news_id)s
-    )
-    ON DUPLICATE KEY UPDATE
-        label    = VALUES(label),
-        prob_pos = VALUES(prob_pos),
-        prob_neg = VALUES(prob_neg),
-        prob_neu = VALUES(prob_neu),
-        score    = VALUES(score),
-        date     = VALUES(date),
-        id       = LAST_INSERT_ID(id);
-    """
+    saved = 0
+    skipped = 0
+    uncommitted = []  # 아직 커밋 안 된 (url, 입력 해시)
+
+    def commit():
+        with timed("db_commit_seconds"):
+            conn.commit()
+        for url, h in uncommitted:
+            ledger.record(url, "save", h)
+        uncommitted.clear()
 
     with conn.cursor() as cur:
         for a in articles:
-            # 1) 회사 이름(= query) → Companies 테이블에 upsert
-            company_name = (a.get("query") or "").strip()
-            company_id = None
-
-            if company_name:
-                # 이미 있는지 확인
-                cur.execute(
-                    "SELECT id FROM Companies WHERE name = %s",
-                    (company_name,),
-                )
-                row = cur.fetchone()
-                if row:
-                    company_id = row["id"]
-                else:
-                    # 없으면 새로 INSERT
-                    cur.execute(
-                        "INSERT INTO Companies (name, sector_id) VALUES (%s, %s)",
-                        (company_name, None),
-                    )
-                    company_id = cur.lastrowid
-
-            # 2) 기사 날짜 / 제목 / 본문 / URL 준비
-            article_dt = parse_article_datetime(a)
-
-            title = (a.get("title") or "").strip()
-            if len(title) > 500:
-                title = title[:500]
-
-            url = (a.get("url") or "").strip()
-            if len(url) > 1000:
-                url = url[:1000]
-
-            news_params = {
-                "title": title,
-                "date": article_dt,
-                "full_text": a.get("content") or "",
-                "url": url,
-                "company_id": company_id,
-            }
-
-            # 3) News upsert (URL 기준)
-            cur.execute(news_sql, news_params)
-            news_id = cur.lastrowid  # 새로 insert든 update든 여기로 기사 PK 확보
-
-            # 4) Sentiments upsert (news_id 기준 1행)
-            sentiment_params = {
-                "label": a.get("sentiment_label") or "",
-                "prob_pos": a.get("sentiment_prob_positive") or 0.0,
-                "prob_neg": a.get("sentiment_prob_negative") or 0.0,
-                "prob_neu": a.get("sentiment_prob_neutral") or 0.0,
-                "score": a.get("sentiment_index") or 0.0,  # 0~100 지표
-                "date": article_dt,
-                "news_id": news_id,
-            }
-            cur.execute(sentiments_sql, sentiment_params)
+            h = save_input_hash(a)
+            if resume and ledger.lookup(a.get("url"), "save", h) is not None:
+                skipped += 1
+                continue
 
-    conn.commit()
-    print(f"✅ ERD 테이블 저장 완료 (처리 기사 수: {len(articles)})")
+            with timed("db_upsert_seconds"):
+                upsert_article(cur, a)
+            inc("articles_total", stage="save")
+            uncommitted.append((a.get("url"), h))
+
+            saved += 1
+            if saved % COMMIT_EVERY == 0:
+                commit()
+
+    commit()
+    print(f"✅ ERD 테이블 저장 완료 (처리 기사 수: {saved})")
+    if skipped:
+        print(f"   ⏭ 체크포인트 기준 이미 저장된 기사: {skipped}건")
+    return saved
 
 
 # ================================
 # 4. main
 # ================================
 def main():
-    articles, groups = load_json(INPUT_FILE)
-    print(f"📥 JSON 로드 완료: articles={len(articles)}, groups={len(groups)}")
+    print(f"📥 입력 파일: {INPUT_FILE}")
+
+    unfinished = []  # 본문 크롤링 / LLM 요약 실패 → step1 인덱스 / 커서에서 빼서 다음 실행에 다시
+
+    def track_unfinished(articles):
+        for a in articles:
+            if not article_content(a, 1) or not a.get("summary_ko"):
+                unfinished.append({k: a.get(k) for k in ("url", "query", "pubDate")})
+            yield a
 
     conn = get_connection()
     try:
         ensure_tables(conn)
-        save_articles_to_erd(conn, articles)
+        # 기사를 한 건씩 읽으면서 바로 저장 (전체를 메모리에 올리지 않음)
+        saved = save_articles_to_erd(conn, track_unfinished(iter_articles(INPUT_FILE, follow=FOLLOW_INPUT)))
     finally:
         conn.close()
 
+    print(f"📥 저장한 기사: {saved}건, groups={len(read_groups(INPUT_FILE))}")
+
+    # 순차 모드: DB 저장까지 끝났으니 step1 이 미뤄 둔 중복 제거 인덱스 / 커서 반영
+    from step1_naver_articles import finalize_pending_commit
+
+    finalize_pending_commit(unfinished=unfinished)
+
     print("🎉 DB 저장 전체 완료! (Companies / News / Sentiments)")
 
 
@@ -0,0 +1,411 @@
+# story_index.py
+"""
+실행 간에 이어지는 스토리 클러스터 (문장 임베딩 + 디스크 벡터 인덱스)
+
+step3 의 groups 는 한 실행 안의 기사끼리만 묶어서, 사흘에 걸쳐 이어지는 사건이 그룹 3개로 나뉨.
+STORY_CLUSTERS=1 (또는 run_pipeline.py --story-clusters) 이면 step4 에서 기사마다 story_id 를 붙임 (STORY_BATCH 건씩 묶어서 임베딩):
+
+- 임베딩: 로컬 CPU 문장 임베딩 모델(EMBED_MODEL, mean pooling + 정규화)로 제목 + 요약(없으면 본문 앞부분)
+- 벡터 저장: VECTORS_FILE 에 float16 memmap 으로 이어 붙임 (768차원 기준 기사당 1.5KB, 메모리에 다 안 올림)
+- 근사 최근접 검색: 랜덤 초평면 SimHash 를 TABLES 개 테이블 × BITS 비트로 (버킷은 SQLite),
+  테이블마다 가장 애매한 비트 PROBES 개를 뒤집은 버킷도 조회 (multi-probe)
+  → 후보 벡터만 읽어서 코사인 계산, 전체 기사 수보다 훨씬 적게 비교
+- 배정: 가장 비슷한 기사의 코사인이 STORY_SIMILARITY 이상이면 그 기사의 스토리, 아니면 새 스토리
+- ID 안정성: story_id 는 SQLite AUTOINCREMENT (지운 번호도 재사용 안 함), 한 번 배정된 URL 은
+  다시 처리해도(--resume, 재실행) 임베딩 없이 같은 story_id
+- 오래된 기사: WINDOW_DAYS 가 지나면 검색 대상에서 빠짐 (URL → story_id 기록은 남음),
+  빠진 벡터가 많아지면 열 때 벡터 파일을 다시 씀 (compaction)
+
+모델 / 차원을 바꾸면 기존 인덱스와 섞을 수 없으므로 오류 → 파일을 지우거나 경로를 바꿔서 새로 시작.
+합성 벡터 벤치마크: benchmarks/bench_story_index.py
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # 스토리 클러스터를 켤 때만 필요 (torch 설치 시 같이 설치됨)
+    np = None
+
+from metrics import inc, timed
+from spill_store import article_content
+
+STORY_DB_FILE = "story_index.sqlite3"
+VECTORS_FILE = "story_vectors.f16"
+
+EMBED_MODEL = "snunlp/KR-SBERT-V40K-klueNLI-augSTS"
+EMBED_MAX_TOKENS = 128      # 제목 + 요약이면 충분
+EMBED_TEXT_CHARS = 400      # 요약이 없을 때 쓰는 본문 앞부분 길이
+
+STORY_SIMILARITY = 0.75     # 가장 비슷한 기사의 코사인이 이 이상이면 같은 스토리
+WINDOW_DAYS = 14            # 이보다 오래된 기사는 검색 대상에서 뺌
+TABLES = 20                 # SimHash 테이블 수
+BITS = 12                   # 테이블당 비트 수 (버킷 2^BITS 개)
+PROBES = 3                  # 테이블마다 추가로 뒤집어 보는 비트 수
+HASH_SEED = 20240601        # 초평면 시드 (바꾸면 기존 버킷과 안 맞음)
+GROW_ROWS = 4096            # 벡터 파일을 늘릴 때 최소 단위 (행)
+COMPACT_MIN_DEAD = 10000    # 빠진 벡터가 이만큼 + 살아 있는 벡터 수보다 많으면 다시 씀
+EVICT_EVERY_SEC = 3600      # 오래 떠 있는 프로세스(데몬)에서 오래된 기사 정리 간격 (배정할 때 확인)
+STORY_BATCH = 32            # step4 / 파이프라인에서 임베딩 한 번에 넣는 기사 수
+
+_enabled = os.getenv("STORY_CLUSTERS") == "1"
+
+
+def story_clusters_enabled() -> bool:
+    return _enabled
+
+
+def set_story_clusters(flag: bool):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def story_text(a) -> str:
+    """임베딩에 넣을 텍스트: 제목 + summary_ko (없으면 본문 앞부분)"""
+    body = (a.get("summary_ko") or "").strip() or article_content(a, EMBED_TEXT_CHARS).strip()
+    return f"{(a.get('title') or '').strip()}\n{body[:EMBED_TEXT_CHARS]}".strip()
+
+
+# ================================
+# 1. 문장 임베딩 (로컬 CPU 모델)
+# ================================
+_embedder = None
+_init_lock = threading.Lock()
+
+
+def get_embedder():
+    """(tokenizer, model) — 처음 임베딩할 때 로딩 (transformers/torch import + 모델 로딩이 수 초 걸림)"""
+    global _embedder
+    with _init_lock:
+        if _embedder is None:
+            from transformers import AutoModel, AutoTokenizer
+
+            print(f"📦 문장 임베딩 모델 로딩 중: {EMBED_MODEL}")
+            with timed("model_load_seconds", model="story_embedder"):
+                tokenizer = AutoTokenizer.from_pretrained(EMBED_MODEL)
+                model = AutoModel.from_pretrained(EMBED_MODEL)
+                model.eval()
+            _embedder = (tokenizer, model)
+        return _embedder
+
+
+def embed_texts(texts):
+    """texts → (n, dim) float32, 행마다 L2 정규화 (코사인 = 내적)"""
+    import torch
+
+    tokenizer, model = get_embedder()
+    with timed("story_embed_seconds"), torch.no_grad():
+        batch = tokenizer(list(texts), padding=True, truncation=True, max_length=EMBED_MAX_TOKENS,
+                          return_tensors="pt")
+        hidden = model(**batch).last_hidden_state
+        mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+    return pooled.cpu().numpy().astype(np.float32)
+
+
+# ================================
+# 2. 벡터 인덱스
+# ================================
+class StoryIndex:
+    def __init__(self, db_path: str = STORY_DB_FILE, vectors_path: str = VECTORS_FILE,
+                 model_name: str = EMBED_MODEL, window_days: float = WINDOW_DAYS):
+        if np is None:
+            raise RuntimeError("❌ 스토리 클러스터에는 numpy 가 필요합니다 (pip install numpy)")
+        self.db_path = db_path
+        self.vectors_path = vectors_path
+        self.model_name = model_name
+        self.window = window_days * 24 * 60 * 60
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (
+                key   TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS stories (
+                story_id   INTEGER PRIMARY KEY AUTOINCREMENT,
+                title      TEXT,
+                first_seen REAL NOT NULL,
+                last_seen  REAL NOT NULL,
+                size       INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS articles (
+                url      TEXT PRIMARY KEY,
+                story_id INTEGER NOT NULL,
+                slot     INTEGER UNIQUE,          -- 벡터 파일 행 번호 (검색 대상에서 빠지면 NULL)
+                added_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_articles_added ON articles (added_at);
+            CREATE TABLE IF NOT EXISTS buckets (
+                bucket INTEGER NOT NULL,          -- (테이블 번호 << BITS) | SimHash 키
+                slot   INTEGER NOT NULL,
+                PRIMARY KEY (bucket, slot)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_buckets_slot ON buckets (slot);
+            """
+        )
+        self.conn.commit()
+
+        self.dim = None
+        self.vectors = None
+        self.planes = None
+        self.next_slot = int(self._meta("next_slot") or 0)
+        stored_model, stored_dim = self._meta("model"), self._meta("dim")
+        if stored_model is not None and stored_model != model_name:
+            raise RuntimeError(
+                f"❌ 스토리 인덱스는 {stored_model} 로 만들어졌습니다 (지금 {model_name}). "
+                f"{db_path} / {vectors_path} 를 지우거나 다른 경로를 쓰세요."
+            )
+        if stored_dim is not None:
+            self._open_vectors(int(stored_dim))
+
+        self.stats = {"known": 0, "joined": 0, "new": 0, "candidates": 0, "evicted": 0}
+        with self.lock:
+            self._evict_locked()
+        self.last_evict = time.time()
+
+    # ---- 내부 도우미 ----
+    def _meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _open_vectors(self, dim: int, rows: int = None):
+        """벡터 파일을 최소 rows 행 크기로 열기 (모자라면 파일을 늘림)"""
+        self.dim = dim
+        row_bytes = dim * 2
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        capacity = size // row_bytes
+        wanted = max(capacity, rows or 0, GROW_ROWS)
+        if wanted > capacity:
+            wanted = max(wanted, capacity * 2)
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(wanted * row_bytes)
+        if self.vectors is not None:
+            self.vectors.flush()
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float16, mode="r+", shape=(wanted, dim))
+        if self.planes is None:
+            rng = np.random.default_rng(HASH_SEED)
+            self.planes = rng.standard_normal((TABLES * BITS, dim)).astype(np.float32)
+
+    def _probe_buckets(self, vec):
+        """조회할 버킷 — 테이블마다 원래 버킷 + 경계에 가장 가까운 비트 PROBES 개를 하나씩 뒤집은 버킷"""
+        proj = (self.planes @ vec).reshape(TABLES, BITS)
+        weights = 1 << np.arange(BITS)
+        buckets = []
+        for t in range(TABLES):
+            bucket = (t << BITS) | int(weights[proj[t] > 0].sum())
+            buckets.append(bucket)
+            buckets.extend(bucket ^ (1 << int(b)) for b in np.argsort(np.abs(proj[t]))[:PROBES])
+        return buckets
+
+    def _buckets(self, vec):
+        """벡터가 들어가는 버킷 (테이블마다 1개)"""
+        proj = (self.planes @ vec).reshape(TABLES, BITS) > 0
+        weights = 1 << np.arange(BITS)
+        return [(t << BITS) | int(weights[proj[t]].sum()) for t in range(TABLES)]
+
+    def _nearest_locked(self, vec):
+        """가장 비슷한 (story_id, 코사인), 후보가 없으면 (None, 0.0)"""
+        buckets = self._probe_buckets(vec)
+        marks = ",".join("?" * len(buckets))
+        rows = self.conn.execute(
+            f"SELECT slot, story_id FROM articles WHERE slot IN (SELECT slot FROM buckets WHERE bucket IN ({marks}))",
+            buckets,
+        ).fetchall()
+        self.stats["candidates"] += len(rows)
+        if not rows:
+            return None, 0.0
+        slots = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        order = np.argsort(slots)  # memmap 을 앞에서부터 읽게
+        sims = self.vectors[slots[order]].astype(np.float32) @ vec
+        best = int(np.argmax(sims))
+        return rows[int(order[best])][1], float(sims[best])
+
+    def _add_locked(self, url, story_id, vec, now):
+        slot = self.next_slot
+        if slot >= self.vectors.shape[0]:
+            self._open_vectors(self.dim, slot + 1)
+        self.vectors[slot] = vec.astype(np.float16)
+        self.next_slot = slot + 1
+        self.conn.execute(
+            "INSERT OR REPLACE INTO articles (url, story_id, slot, added_at) VALUES (?, ?, ?, ?)",
+            (url, story_id, slot, now),
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO buckets (bucket, slot) VALUES (?, ?)", [(b, slot) for b in self._buckets(vec)]
+        )
+
+    # ---- 공개 API ----
+    def lookup(self, urls) -> dict:
+        """{url: story_id} (이미 배정된 것만)"""
+        urls = [u for u in dict.fromkeys(urls) if u]
+        found = {}
+        with self.lock:
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                found.update(self.conn.execute(
+                    f"SELECT url, story_id FROM articles WHERE url IN ({marks})", chunk
+                ).fetchall())
+        return found
+
+    def assign_vectors(self, items):
+        """
+        items: [(url, title, 정규화된 벡터)] → 같은 순서의 story_id 리스트.
+        같은 묶음 안의 앞 기사에도 붙을 수 있음 (하나씩 배정하고 바로 인덱스에 추가).
+        """
+        items = list(items)
+        if not items:
+            return []
+        now = time.time()
+        result = []
+        with self.lock:
+            if self.dim is None:
+                dim = int(len(items[0][2]))
+                self._set_meta("model", self.model_name)
+                self._set_meta("dim", dim)
+                self._open_vectors(dim)
+            for url, title, vec in items:
+                vec = np.asarray(vec, dtype=np.float32)
+                row = self.conn.execute("SELECT story_id FROM articles WHERE url = ?", (url,)).fetchone() if url else None
+                if row:
+                    self.stats["known"] += 1
+                    result.append(row[0])
+                    continue
+                with timed("story_lookup_seconds"):
+                    story_id, sim = self._nearest_locked(vec)
+                if story_id is not None and sim >= STORY_SIMILARITY:
+                    self.conn.execute(
+                        "UPDATE stories SET last_seen = ?, size = size + 1 WHERE story_id = ?", (now, story_id)
+                    )
+                    self.stats["joined"] += 1
+                    inc("story_assignments_total", kind="joined")
+                else:
+                    cur = self.conn.execute(
+                        "INSERT INTO stories (title, first_seen, last_seen, size) VALUES (?, ?, ?, 1)",
+                        (title, now, now),
+                    )
+                    story_id = cur.lastrowid
+                    self.stats["new"] += 1
+                    inc("story_assignments_total", kind="new")
+                if url:
+                    self._add_locked(url, story_id, vec, now)
+                result.append(story_id)
+            # 벡터를 먼저 디스크에 쓰고 나서 SQLite 커밋 (커밋된 slot 은 항상 벡터가 있음)
+            self.vectors.flush()
+            self._set_meta("next_slot", self.next_slot)
+            self.conn.commit()
+            if now - self.last_evict >= EVICT_EVERY_SEC:
+                self._evict_locked()
+                self.last_evict = now
+        return result
+
+    def assign_articles(self, articles):
+        """기사 레코드들 → story_id 리스트 (이미 배정된 URL 은 임베딩 안 함)"""
+        articles = list(articles)
+        known = self.lookup(a.get("url") for a in articles)
+        result = [known.get(a.get("url")) for a in articles]
+        # URL 이 없는 기사는 서로 다른 기사이므로 URL 이 아니라 순서(index)로 결과를 맞춤
+        todo = [i for i, a in enumerate(articles) if result[i] is None]
+        if todo:
+            vecs = embed_texts([story_text(articles[i]) for i in todo])
+            story_ids = self.assign_vectors(
+                (articles[i].get("url"), articles[i].get("title"), v) for i, v in zip(todo, vecs)
+            )
+            for i, story_id in zip(todo, story_ids):
+                result[i] = story_id
+        with self.lock:
+            self.stats["known"] += len(articles) - len(todo)
+        return result
+
+    def _evict_locked(self):
+        """WINDOW_DAYS 지난 기사는 검색 대상에서 빼고, 빠진 벡터가 많으면 벡터 파일을 다시 씀"""
+        cutoff = time.time() - self.window
+        old = self.conn.execute(
+            "SELECT slot FROM articles WHERE added_at < ? AND slot IS NOT NULL", (cutoff,)
+        ).fetchall()
+        if old:
+            self.conn.executemany("DELETE FROM buckets WHERE slot = ?", old)
+            self.conn.execute("UPDATE articles SET slot = NULL WHERE added_at < ? AND slot IS NOT NULL", (cutoff,))
+            self.stats["evicted"] += len(old)
+        live = self.conn.execute("SELECT COUNT(*) FROM articles WHERE slot IS NOT NULL").fetchone()[0]
+        if self.vectors is not None and self.next_slot - live > max(live, COMPACT_MIN_DEAD):
+            self._compact_locked()
+        self.conn.commit()
+
+    def _compact_locked(self):
+        """살아 있는 벡터만 앞으로 당겨서 다시 쓰고 slot / 버킷을 새 번호로"""
+        rows = self.conn.execute("SELECT url, slot FROM articles WHERE slot IS NOT NULL ORDER BY slot").fetchall()
+        tmp_path = self.vectors_path + ".tmp"
+        new = np.memmap(tmp_path, dtype=np.float16, mode="w+", shape=(max(len(rows), GROW_ROWS), self.dim))
+        for new_slot, (_, old_slot) in enumerate(rows):
+            new[new_slot] = self.vectors[old_slot]
+        new.flush()
+        del new
+        self.vectors = None
+        os.replace(tmp_path, self.vectors_path)
+        self._open_vectors(self.dim)
+
+        self.conn.execute("DELETE FROM buckets")
+        self.conn.execute("UPDATE articles SET slot = -1 - slot WHERE slot IS NOT NULL")  # UNIQUE 충돌 피하기
+        for new_slot, (url, _) in enumerate(rows):
+            self.conn.execute("UPDATE articles SET slot = ? WHERE url = ?", (new_slot, url))
+            vec = self.vectors[new_slot].astype(np.float32)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO buckets (bucket, slot) VALUES (?, ?)", [(b, new_slot) for b in self._buckets(vec)]
+            )
+        self.next_slot = len(rows)
+        self._set_meta("next_slot", self.next_slot)
+        print(f"🧹 스토리 벡터 파일 정리: {len(rows)}개만 남김")
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM articles WHERE slot IS NOT NULL").fetchone()[0]
+
+    def report(self):
+        st = self.stats
+        looked_up = st["joined"] + st["new"]
+        if not looked_up and not st["known"]:
+            return
+        avg = st["candidates"] / looked_up if looked_up else 0.0
+        stories = self.conn.execute("SELECT COUNT(*) FROM stories").fetchone()[0]
+        print(
+            f"   스토리 클러스터: 기존 스토리에 합류 {st['joined']}건, 새 스토리 {st['new']}건, "
+            f"이미 배정된 기사 {st['known']}건 | 비교 후보 평균 {avg:.1f}개 / 검색 대상 {len(self)}개, "
+            f"전체 스토리 {stories}개"
+        )
+
+    def close(self):
+        with self.lock:
+            if self.vectors is not None:
+                self.vectors.flush()
+            self.conn.close()
+
+
+_index = None
+
+
+def get_story_index() -> StoryIndex:
+    global _index
+    with _init_lock:
+        if _index is None:
+            _index = StoryIndex()
+        return _index
+
+
+def with_stories(records) -> list:
+    """기사 레코드 묶음에 story_id 붙여서 리턴 (임베딩은 한 번에)"""
+    records = list(records)
+    if not records:
+        return []
+    story_ids = get_story_index().assign_articles(records)
+    return [{**a, "story_id": story_id} for a, story_id in zip(records, story_ids)]
@@ -0,0 +1,145 @@
+# summary_cache.py
+"""
+LLM 요약 캐시 (SQLite, step3 용)
+
+같은 본문을 어제도 요약했는데 오늘 또 GPT 에 보내는 걸 막음 (URL 이 달라도 본문이 같으면 재사용).
+
+- 키: 정규화한 본문 앞부분(LLM 에 보내는 content_snippet) + 모델 이름 + 프롬프트 버전 의 해시
+  → 모델이나 프롬프트(step3 PROMPT_VERSION)를 바꾸면 자동으로 전부 miss
+- 본문이 비어 있는 기사는 제목만으로 요약되므로 캐시하지 않음
+- 삭제: MAX_AGE_DAYS 보다 오래된 항목, 그리고 요약 총 크기가 MAX_CACHE_BYTES 를 넘으면 가장 오래 안 쓴 것부터 (LRU)
+- 실행별 hit / miss / 저장 / 삭제 수는 stats → report()
+
+checkpoint_ledger 의 summary 기록(--resume)은 "같은 URL 을 이어서 처리" 용이고,
+이 캐시는 --resume 없이도 항상 쓰임.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+CACHE_FILE = "summary_cache.sqlite3"
+MAX_AGE_DAYS = 30
+MAX_CACHE_BYTES = 50 * 1024 * 1024  # 요약 텍스트 합계 50MB
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_snippet(text: str) -> str:
+    """공백 차이(줄바꿈 / 연속 공백)는 같은 본문으로 봄"""
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+def summary_key(snippet: str, model: str, prompt_version: str):
+    """캐시 키. 본문이 비어 있으면 None (캐시 안 함)"""
+    normalized = normalize_snippet(snippet)
+    if not normalized:
+        return None
+    h = hashlib.sha256()
+    for part in (model, prompt_version, normalized):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+class SummaryCache:
+    def __init__(self, path: str = CACHE_FILE, max_age_days: float = MAX_AGE_DAYS,
+                 max_bytes: int = MAX_CACHE_BYTES):
+        self.path = path
+        self.max_age = max_age_days * 24 * 60 * 60
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS summaries (
+                key         TEXT PRIMARY KEY,
+                summary     TEXT NOT NULL,
+                size        INTEGER NOT NULL,
+                created_at  REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_access ON summaries (last_access)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_created ON summaries (created_at)")
+        self.conn.commit()
+
+        self.stats = {"hit": 0, "miss": 0, "stored": 0, "evicted": 0}
+        with self.lock:
+            self._evict_locked()
+
+    def get_many(self, keys) -> dict:
+        """{key: summary} (있는 것만). 찾은 항목은 LRU 시각 갱신, 기사 단위로 hit / miss 집계 (키가 None 이면 miss)."""
+        requested = list(keys)
+        keys = list(dict.fromkeys(k for k in requested if k))
+        found = {}
+        now = time.time()
+        with self.lock:
+            # SQLite 변수 개수 제한(999) 안쪽으로 나눠서 조회
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, summary FROM summaries WHERE key IN ({marks}) AND created_at >= ?",
+                    (*chunk, now - self.max_age),
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self.conn.executemany(
+                    "UPDATE summaries SET last_access = ? WHERE key = ?", [(now, k) for k in found]
+                )
+                self.conn.commit()
+            hits = sum(1 for k in requested if k in found)
+            self.stats["hit"] += hits
+            self.stats["miss"] += len(requested) - hits
+        return found
+
+    def put_many(self, items):
+        """items: [(key, summary)] — 키가 없거나 요약이 빈 항목은 건너뜀"""
+        now = time.time()
+        rows = [(k, s, len(s.encode("utf-8")), now, now) for k, s in items if k and s]
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO summaries (key, summary, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.stats["stored"] += len(rows)
+            self._evict_locked()
+
+    def _evict_locked(self):
+        cur = self.conn.execute("DELETE FROM summaries WHERE created_at < ?", (time.time() - self.max_age,))
+        self.stats["evicted"] += cur.rowcount
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+        if total > self.max_bytes:
+            rows = self.conn.execute("SELECT key, size FROM summaries ORDER BY last_access ASC").fetchall()
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self.conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                self.stats["evicted"] += 1
+                total -= size
+        self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    def report(self):
+        st = self.stats
+        looked_up = st["hit"] + st["miss"]
+        if not looked_up:
+            return
+        print(
+            f"   요약 캐시: hit {st['hit']} / miss {st['miss']} (hit 률 {st['hit'] / looked_up:.0%}), "
+            f"저장 {st['stored']}, 삭제 {st['evicted']}, 항목 {len(self)}개"
+        )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,191 @@
+# text_compress.py
+"""
+LLM 에 보내기 전 기사 본문 사전 압축 (추출식, 로컬)
+
+step3 는 본문 앞 MAX_CONTENT_CHARS 글자만 보내는데, 앞부분을 기자 서명 / 사진 설명 / 저작권 문구가
+차지하면 정작 중요한 문장이 잘림. 여기서:
+
+1) strip_boilerplate: 한국 뉴스에 흔한 상투 문구 제거
+   - 줄 전체 (BOILERPLATE_LINE_CHARS 이하이고 "~다." 로 끝나지 않는 줄만): 저작권 / 무단 전재 문구,
+     ▶ ☞ 관련 기사·구독 안내, "사진=" 이 든 사진 설명, 기자 이메일만 있는 줄
+   - 줄 안: "(서울=연합뉴스) 홍길동 기자 =", "[이데일리 홍길동 기자]" 같은 머리 서명, "(사진=...)", 이메일 주소,
+     긴 줄 끝에 붙은 저작권 문구
+2) TextRank: 문장끼리 글자 2-gram 겹침으로 유사도 그래프를 만들고 PageRank
+   (앞 문장 / 제목과 겹치는 문장에 가중치 → 리드와 제목에 관련된 문장 유지)
+3) 점수 높은 문장부터 예산(토큰 수, measure 로 셈)에 들어가는 만큼 골라서 원래 순서대로 이어 붙임
+   이미 고른 문장과 거의 같은 문장(통신사 기사 재전재 등)은 건너뜀
+   원문이 예산 안이면 상투 문구만 빼고 그대로
+
+PRECOMPRESS=0 (또는 run_pipeline.py --no-precompress) 이면 예전처럼 앞부분만 자름.
+벤치마크: benchmarks/bench_text_compress.py
+"""
+
+import math
+import os
+import re
+
+MIN_SENTENCE_CHARS = 8      # 이보다 짧은 조각은 문장으로 안 봄
+MAX_SENTENCES = 60          # 이보다 긴 기사는 앞 문장들만 순위 계산 (유사도 계산이 문장 수²)
+DAMPING = 0.85
+ITERATIONS = 30
+TOLERANCE = 1e-4
+LEAD_WEIGHT = 2.0           # 첫 문장 가중치 (뒤로 갈수록 1 에 가까워짐)
+TITLE_WEIGHT = 3.0          # 제목 2-gram 을 전부 포함한 문장의 가중치 추가분 (겹치는 비율만큼)
+REDUNDANCY = 0.7            # 이미 고른 문장과 2-gram 자카드가 이 이상이면 안 고름
+
+_enabled = os.getenv("PRECOMPRESS", "1") != "0"
+
+
+def precompress_enabled() -> bool:
+    return _enabled
+
+
+def set_precompress(flag: bool):
+    global _enabled
+    _enabled = bool(flag)
+
+
+# ================================
+# 1. 상투 문구 제거
+# ================================
+_EMAIL = r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"
+
+# 저작권 문구: "<저작권자 ⓒ 뉴스, 무단전재 및 재배포 금지>", "ⓒ 뉴스 All rights reserved" 처럼
+# 저작권 표시로 시작해서 "무단/재배포 … 금지" 나 "reserved" 로 끝나는 것만 (본문의 "음원 저작권자들은" 은 안 건드림)
+_COPYRIGHT = (
+    r"(?:[<\[(]\s*저작권자|[<\[(]?\s*(?:저작권자\s*(?:\(c\)|ⓒ|©)|ⓒ|©|copyright\b))"
+    r"[^\n]{0,80}?(?:(?:무단|재배포)[^\n]{0,40}?금지|all rights reserved)\.?\s*[>\])]?"
+)
+
+# 줄 전체가 상투 문구인 경우: 줄 전체가 패턴에 맞고(fullmatch), BOILERPLATE_LINE_CHARS 이하이고,
+# "~다." 로 끝나는 문장이 아닐 때만 (▲ 로 수치를 나열하는 줄, ※ 로 시작하는 본문 문장 등은 남김)
+_BOILERPLATE_LINES = [re.compile(p, re.IGNORECASE) for p in (
+    r"\s*" + _COPYRIGHT + r"\s*",
+    r"\s*(?:무단\s*(?:전재|복제)|재배포)[^\n]*금지\.?\s*",
+    r"\s*[▶☞►▷].*(?:관련|기사|뉴스|구독|바로\s*가기|보기|제보|채널|클릭|이벤트|홈페이지|유튜브).*",   # 관련 기사 / 구독 안내
+    r".*(?:사진|그래픽|자료|제공)\s*=.*",                                                     # 사진 설명
+    r".*(?:구독\s*(?:하기|하세요)|기사\s*제보|제보\s*(?:하기|하세요)|채널\s*추가).*",
+    r"\s*(?:[가-힣]{2,4}\s*(?:기자|특파원)\s*)?" + _EMAIL + r"\s*",                          # 기자 이메일만 있는 줄
+)]
+BOILERPLATE_LINE_CHARS = 60
+_SENTENCE_LINE = re.compile(r"다[.\"'”’)]*\s*$")
+
+# 줄 안에서 지우는 부분
+_INLINE = [re.compile(p, re.IGNORECASE) for p in (
+    r"^\s*\([^()=]{1,20}=[^()]{1,20}\)\s*(?:[가-힣]{2,4}\s*(?:기자|특파원)\s*=?\s*)?",   # (서울=연합뉴스) 홍길동 기자 =
+    r"^\s*\[[^\[\]]{0,20}[가-힣]{2,4}\s*(?:기자|특파원)\]\s*",                       # [이데일리 홍길동 기자]
+    r"[\[<(]\s*(?:사진|그래픽|자료|영상)\s*[=:][^\]>)]{0,30}[\]>)]\s*",                # (사진=연합뉴스)
+    r"[▲△][^▲△\n]{0,80}?(?:사진|그래픽|자료|제공)\s*=\s*\S+\s*",                       # 본문 중간의 ▲ 사진 설명
+    _COPYRIGHT,                                                                      # 긴 줄 끝의 저작권 문구
+    r"\s*" + _EMAIL,
+    r"\s*[가-힣]{2,4}\s*(?:기자|특파원)\s*$",                                        # 끝에 붙은 서명
+)]
+_BLANK = re.compile(r"\n\s*\n+")
+
+
+def strip_boilerplate(text: str) -> str:
+    lines = []
+    for line in (text or "").splitlines():
+        if (len(line) <= BOILERPLATE_LINE_CHARS and not _SENTENCE_LINE.search(line)
+                and any(p.fullmatch(line) for p in _BOILERPLATE_LINES)):
+            continue
+        for p in _INLINE:
+            line = p.sub("", line)
+        lines.append(line.strip())
+    return _BLANK.sub("\n", "\n".join(lines)).strip()
+
+
+# ================================
+# 2. 문장 나누기 + TextRank
+# ================================
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|(?<=다\.)|\n+")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def split_sentences(text: str):
+    return [s.strip() for s in _SENTENCE_END.split(text) if s and len(s.strip()) >= MIN_SENTENCE_CHARS]
+
+
+def _bigrams(sentence: str):
+    t = _NON_WORD.sub("", sentence)
+    return {t[i:i + 2] for i in range(len(t) - 1)}
+
+
+def textrank(sentences, title: str = "", grams=None):
+    """문장별 점수 (합 1). 유사도 = 겹치는 2-gram 수 / (log|A| + log|B|) (TextRank 원 논문 방식)"""
+    n = len(sentences)
+    if n <= 2:
+        return [1.0 / n] * n if n else []
+    grams = grams or [_bigrams(s) for s in sentences]
+    logs = [math.log(len(g)) if len(g) > 1 else 1.0 for g in grams]
+    edges = [[] for _ in range(n)]   # i → [(j, 가중치)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            overlap = len(grams[i] & grams[j])
+            if overlap:
+                w = overlap / (logs[i] + logs[j])
+                edges[i].append((j, w))
+                edges[j].append((i, w))
+    out_weight = [sum(w for _, w in e) for e in edges]
+
+    # 리드 쪽 / 제목과 겹치는 문장을 조금 더 자주 "다시 시작" 하도록 (personalized PageRank)
+    title_grams = _bigrams(title)
+    prior = [
+        1.0 + (LEAD_WEIGHT - 1.0) / (1 + i)
+        + (TITLE_WEIGHT * len(title_grams & grams[i]) / len(title_grams) if title_grams else 0.0)
+        for i in range(n)
+    ]
+    total = sum(prior)
+    prior = [p / total for p in prior]
+
+    # 유사도는 대칭이라 edges[j] 가 곧 j 로 들어오는 간선 → 전이 확률을 미리 나눠 둠
+    incoming = [[(i, DAMPING * w / out_weight[i]) for i, w in e] for e in edges]
+    dangling_nodes = [i for i in range(n) if out_weight[i] == 0]
+
+    scores = list(prior)
+    for _ in range(ITERATIONS):
+        dangling = DAMPING * sum(scores[i] for i in dangling_nodes)
+        new = [
+            (1 - DAMPING + dangling) * prior[j] + sum(scores[i] * p for i, p in incoming[j])
+            for j in range(n)
+        ]
+        delta = sum(abs(a - b) for a, b in zip(new, scores))
+        scores = new
+        if delta < TOLERANCE:
+            break
+    return scores
+
+
+# ================================
+# 3. 예산에 맞춰 고르기
+# ================================
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def compress_text(text: str, budget: int, measure=len, title: str = "") -> str:
+    """
+    상투 문구를 빼고, 예산(measure 로 센 값, 기본 글자 수)에 들어가는 만큼 중요한 문장을 원래 순서대로.
+    title 을 주면 제목과 겹치는 문장을 더 우선함.
+    문장 하나도 안 들어가면 정리한 본문 앞부분을 예산만큼 자름.
+    """
+    cleaned = strip_boilerplate(text)
+    if measure(cleaned) <= budget:
+        return cleaned
+    sentences = split_sentences(cleaned)[:MAX_SENTENCES]
+    grams = [_bigrams(s) for s in sentences]
+    scores = textrank(sentences, title, grams)
+
+    chosen, used = set(), 0
+    for i in sorted(range(len(sentences)), key=lambda k: -scores[k]):
+        cost = measure(sentences[i]) + 1
+        if used + cost > budget:
+            continue
+        if any(_jaccard(grams[i], grams[j]) >= REDUNDANCY for j in chosen):
+            continue
+        chosen.add(i)
+        used += cost
+    if not chosen:
+        # 예산이 글자 수가 아니어도 대략 맞도록 비율로 자름
+        return cleaned[:max(1, len(cleaned) * budget // max(1, measure(cleaned)))]
+    return " ".join(sentences[i] for i in sorted(chosen))
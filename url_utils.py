@@ -0,0 +1,96 @@
+# url_utils.py
+"""
+기사 URL 정규화 (중복 제거 / 캐시 키용)
+
+같은 기사인데 문자열만 다른 경우를 하나로 모음:
+  - http/https, 대소문자 호스트, 기본 포트, #fragment
+  - www. / m. / mobile. 같은 모바일·데스크톱 호스트
+  - utm_* 같은 추적용 쿼리 파라미터, 쿼리 파라미터 순서
+  - 네이버 뉴스의 여러 URL 형태 (mnews/article, read.naver?oid=&aid= 등)
+"""
+
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 기사 식별과 상관없는 추적/유입 경로용 파라미터
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "igshid", "yclid",
+    "ref", "ref_src", "referrer", "from", "cmpid", "cmp", "rcode", "outlink",
+    "sns", "share", "mobile", "nv", "nclick",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+MOBILE_HOST_PREFIXES = ("www.", "m.", "mobile.")
+
+NAVER_NEWS_HOSTS = {
+    "n.news.naver.com", "news.naver.com", "m.news.naver.com",
+    "m.entertain.naver.com", "entertain.naver.com",
+    "m.sports.naver.com", "sports.naver.com", "sports.news.naver.com",
+}
+NAVER_ARTICLE_PATH = re.compile(r"/(?:mnews/)?article/(\d{3})/(\d{10})")
+
+
+def _canonical_naver(host: str, path: str, query: str):
+    """네이버 뉴스 URL이면 https://n.news.naver.com/article/{oid}/{aid} 로 통일. 아니면 None."""
+    if host not in NAVER_NEWS_HOSTS:
+        return None
+    m = NAVER_ARTICLE_PATH.search(path)
+    if m:
+        oid, aid = m.groups()
+    else:
+        params = dict(parse_qsl(query))
+        oid, aid = params.get("oid"), params.get("aid")
+        if not (oid and aid):
+            return None
+    return f"https://n.news.naver.com/article/{oid}/{aid}"
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    기사 URL → 정규화된 URL 문자열.
+    파싱이 안 되는 값은 앞뒤 공백만 제거해서 그대로 돌려줌.
+    """
+    if not url:
+        return ""
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    if not parts.netloc:
+        return url
+
+    host = (parts.hostname or "").lower().rstrip(".")
+    path = parts.path or "/"
+
+    naver = _canonical_naver(host, path, parts.query)
+    if naver:
+        return naver
+
+    for prefix in MOBILE_HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") >= 2:
+            host = host[len(prefix):]
+            break
+
+    port = parts.port
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/")
+
+    params = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    params.sort()
+
+    return urlunsplit(("https", host, path, urlencode(params), ""))
+
+
+def url_hash(url: str) -> int:
+    """정규화 URL → 부호 있는 64비트 정수 (SQLite INTEGER PRIMARY KEY 에 그대로 들어가는 크기)"""
+    digest = hashlib.sha1(canonicalize_url(url).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
@@ -0,0 +1,426 @@
+# work_queue.py
+"""
+작업 큐 모드 (run_pipeline.py --mode worker)
+
+KOSPI/KOSDAQ 전 종목처럼 키워드가 많으면 한 프로세스로 한 바퀴 도는 데 너무 오래 걸림.
+키워드 목록을 SHARD_SIZE 개씩 샤드로 나눠 MariaDB 의 QueryShards 테이블에 넣어두고,
+여러 워커(프로세스 / 서버)가 샤드를 하나씩 가져가서 pipeline_stream.run_pipelined 로 처리 → 같은 News / Sentiments 에 저장.
+
+- 샤드 가져가기: 조건부 UPDATE (pending 이거나 lease 가 끝난 running 행만) → 바뀐 행이 1개면 내 것
+  (SELECT ... FOR UPDATE SKIP LOCKED 없이도 되는 방식이라 MariaDB 버전 상관없음)
+- lease: 처리하는 동안 LEASE_SECONDS / 3 마다 연장. 워커가 죽으면 연장이 끊기고,
+  lease 가 끝나면 다른 워커가 다시 가져감 (MAX_ATTEMPTS 번까지, 그 다음은 failed)
+- 키워드별 step1 커서는 샤드 행에 같이 저장 → 어느 워커가 가져가도 지난번에 받은 기사 다음부터 검색
+- 기사 단위로도 ArticleClaims 에 먼저 잡은 워커만 처리
+  (여러 키워드에 같은 기사가 걸려도 크롤링 / LLM 요약은 한 번만, 저장이 끝나면 done)
+- repoll_after 를 주면 끝난 샤드도 그 시간이 지나면 다시 pending 취급 → 워커를 계속 띄워두면 주기적으로 전체 순환
+
+lease 시각은 각 워커 서버의 시계 기준이므로 서버들 시계는 NTP 로 맞춰 둘 것
+(LEASE_SECONDS 가 서버 간 시계 차이보다 충분히 커야 함).
+"""
+
+import json
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+from checkpoint_ledger import input_hash
+
+SHARD_SIZE = 10          # 샤드 하나에 넣는 키워드 수
+LEASE_SECONDS = 900      # 샤드 / 기사 lease 길이(초)
+MAX_ATTEMPTS = 3         # 같은 샤드를 이만큼 가져갔는데도 못 끝내면 failed
+IDLE_POLL = 30           # 가져갈 샤드가 없을 때 다시 확인하는 간격(초, 계속 대기할 때)
+CLAIM_CANDIDATES = 20    # 한 번에 후보로 읽는 샤드 수 (다른 워커와 겹쳐도 다음 후보로)
+MARK_DONE_CHUNK = 500
+
+
+# ================================
+# 1. 테이블
+# ================================
+CREATE_SHARDS_SQL = """
+CREATE TABLE IF NOT EXISTS QueryShards (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    shard_key CHAR(32) NOT NULL,
+    queries TEXT NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending',
+    worker_id VARCHAR(200) NULL,
+    claim_token CHAR(32) NULL,
+    lease_until DOUBLE NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    cursors MEDIUMTEXT NULL,
+    last_error TEXT NULL,
+    updated_at DOUBLE NULL,
+    UNIQUE KEY uq_shard_key (shard_key),
+    INDEX idx_status_lease (status, lease_until)
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+"""
+
+CREATE_CLAIMS_SQL = """
+CREATE TABLE IF NOT EXISTS ArticleClaims (
+    url_hash CHAR(32) NOT NULL PRIMARY KEY,
+    url VARCHAR(1000) NOT NULL,
+    worker_id VARCHAR(200) NULL,
+    claim_token CHAR(32) NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'running',
+    lease_until DOUBLE NULL,
+    updated_at DOUBLE NULL,
+    INDEX idx_claim_token (claim_token)
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+"""
+
+# pending / lease 끝난 running / (repoll_after 가 지난) done 샤드 후보
+CANDIDATES_SQL = """
+SELECT id FROM QueryShards
+WHERE attempts < %(max_attempts)s
+  AND (status = 'pending'
+       OR (status = 'running' AND lease_until < %(now)s)
+       OR (status = 'done' AND updated_at < %(repoll_before)s))
+ORDER BY attempts, id
+LIMIT %(limit)s
+"""
+
+CLAIM_SQL = """
+UPDATE QueryShards
+SET status = 'running', worker_id = %(worker)s, claim_token = %(token)s,
+    lease_until = %(lease_until)s, attempts = attempts + 1, updated_at = %(now)s
+WHERE id = %(id)s
+  AND attempts < %(max_attempts)s
+  AND (status = 'pending'
+       OR (status = 'running' AND lease_until < %(now)s)
+       OR (status = 'done' AND updated_at < %(repoll_before)s))
+"""
+
+
+class Shard:
+    def __init__(self, row: dict, token: str):
+        self.id = row["id"]
+        self.queries = json.loads(row["queries"])
+        self.cursors = json.loads(row["cursors"]) if row.get("cursors") else {}
+        self.attempts = row["attempts"]
+        self.token = token
+
+    def __repr__(self):
+        return f"Shard(id={self.id}, queries={len(self.queries)}개, attempts={self.attempts})"
+
+
+def make_shards(queries, shard_size: int = SHARD_SIZE):
+    return [queries[i:i + shard_size] for i in range(0, len(queries), shard_size)]
+
+
+class WorkQueue:
+    """
+    QueryShards / ArticleClaims 를 다루는 객체 (커넥션 1개, 메서드마다 바로 커밋).
+    lease 연장 스레드와 같이 쓰므로 모든 쿼리는 lock 을 잡고 실행.
+    """
+
+    def __init__(self, conn, worker_id: str = None, lease_seconds: float = LEASE_SECONDS,
+                 max_attempts: int = MAX_ATTEMPTS):
+        self.conn = conn
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+
+    def _execute(self, sql: str, params=None, fetch: bool = False):
+        with self.lock:
+            try:
+                with self.conn.cursor() as cur:
+                    affected = cur.execute(sql, params)
+                    rows = cur.fetchall() if fetch else None
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+        return rows if fetch else affected
+
+    def ensure_tables(self):
+        self._execute(CREATE_SHARDS_SQL)
+        self._execute(CREATE_CLAIMS_SQL)
+
+    # ---------- 샤드 등록 ----------
+    def enqueue(self, queries, shard_size: int = SHARD_SIZE, requeue: bool = False) -> dict:
+        """
+        키워드 목록을 샤드로 나눠 등록 (이미 있는 샤드는 그대로 → 여러 워커가 동시에 불러도 됨).
+        목록에서 빠진 샤드 중 아직 안 끝난 건 retired 로 바꿔서 더 이상 안 가져가게 함.
+        requeue=True 면 끝난(done / failed) 샤드도 다시 pending 으로 → 한 바퀴 새로 돌기.
+        return: {"added", "retired", "requeued"}
+        """
+        now = time.time()
+        keys = set()
+        added = 0
+        for shard in make_shards(queries, shard_size):
+            key = input_hash(*shard)
+            keys.add(key)
+            added += self._execute(
+                "INSERT IGNORE INTO QueryShards (shard_key, queries, status, attempts, updated_at) "
+                "VALUES (%s, %s, 'pending', 0, %s)",
+                (key, json.dumps(shard, ensure_ascii=False), now),
+            )
+
+        retired = 0
+        for row in self._execute("SELECT id, shard_key FROM QueryShards WHERE status <> 'retired'", fetch=True):
+            if row["shard_key"] not in keys:
+                retired += self._execute(
+                    "UPDATE QueryShards SET status = 'retired', updated_at = %s WHERE id = %s AND status <> 'running'",
+                    (now, row["id"]),
+                )
+
+        requeued = 0
+        if requeue:
+            requeued = self._execute(
+                "UPDATE QueryShards SET status = 'pending', attempts = 0, last_error = NULL, updated_at = %s "
+                "WHERE status IN ('done', 'failed')",
+                (now,),
+            )
+        return {"added": added, "retired": retired, "requeued": requeued}
+
+    # ---------- 샤드 가져가기 / lease ----------
+    def claim(self, repoll_after: float = None):
+        """처리할 샤드 하나 가져오기. 없으면 None."""
+        now = time.time()
+        # lease 가 끝났는데 이미 MAX_ATTEMPTS 번 가져간 샤드 → 계속 워커를 죽이는 샤드로 보고 포기
+        self._execute(
+            "UPDATE QueryShards SET status = 'failed', last_error = %s, updated_at = %s "
+            "WHERE status = 'running' AND lease_until < %s AND attempts >= %s",
+            (f"lease 만료 {self.max_attempts}회", now, now, self.max_attempts),
+        )
+        params = {
+            "now": now,
+            "max_attempts": self.max_attempts,
+            "repoll_before": now - repoll_after if repoll_after is not None else -1.0,
+            "limit": CLAIM_CANDIDATES,
+        }
+        for row in self._execute(CANDIDATES_SQL, params, fetch=True):
+            token = uuid.uuid4().hex
+            claimed = self._execute(CLAIM_SQL, {
+                **params,
+                "id": row["id"],
+                "worker": self.worker_id,
+                "token": token,
+                "lease_until": now + self.lease_seconds,
+            })
+            if claimed:  # 다른 워커가 먼저 가져갔으면 0 → 다음 후보
+                rows = self._execute("SELECT * FROM QueryShards WHERE id = %s", (row["id"],), fetch=True)
+                return Shard(rows[0], token)
+        return None
+
+    def renew(self, shard: Shard) -> bool:
+        """샤드 + 이 샤드로 잡은 기사들의 lease 연장. False 면 lease 를 잃음 (다른 워커가 가져감)."""
+        now = time.time()
+        lease_until = now + self.lease_seconds
+        ok = self._execute(
+            "UPDATE QueryShards SET lease_until = %s, updated_at = %s WHERE id = %s AND claim_token = %s "
+            "AND status = 'running'",
+            (lease_until, now, shard.id, shard.token),
+        )
+        self._execute(
+            "UPDATE ArticleClaims SET lease_until = %s WHERE claim_token = %s AND status = 'running'",
+            (lease_until, shard.token),
+        )
+        return bool(ok)
+
+    def complete(self, shard: Shard, cursors: dict) -> bool:
+        return bool(self._execute(
+            "UPDATE QueryShards SET status = 'done', cursors = %s, lease_until = NULL, attempts = 0, "
+            "last_error = NULL, updated_at = %s WHERE id = %s AND claim_token = %s",
+            (json.dumps({q: c for q, c in cursors.items() if c}, ensure_ascii=False), time.time(),
+             shard.id, shard.token),
+        ))
+
+    def fail(self, shard: Shard, error: str):
+        """실패: 아직 기회가 남았으면 pending 으로 돌려서 다른 워커가(또는 내가) 다시 가져가게"""
+        status = "pending" if shard.attempts < self.max_attempts else "failed"
+        self._execute(
+            "UPDATE QueryShards SET status = %s, lease_until = NULL, last_error = %s, updated_at = %s "
+            "WHERE id = %s AND claim_token = %s",
+            (status, error[:2000], time.time(), shard.id, shard.token),
+        )
+        return status
+
+    # ---------- 기사 단위 claim ----------
+    def claim_article(self, url: str, shard: Shard):
+        """
+        기사 처리 권한 가져오기. 아무도 안 잡았거나, 잡은 워커의 lease 가 끝났거나,
+        같은 샤드(재시도)에서 잡았던 기사면 True. 이미 done 이면 False.
+        다른 워커가 아직 lease 안에서 처리 중이면 None (거짓 취급이지만, 그 워커가 죽을 수 있으므로
+        run_pipelined 가 이 기사는 본 것으로 기록하지 않고 커서도 그 앞까지만 전진시킴)
+        """
+        if not url:
+            return True
+        now = time.time()
+        url_hash = input_hash(url)
+        lease_until = now + self.lease_seconds
+        if self._execute(
+            "INSERT IGNORE INTO ArticleClaims (url_hash, url, worker_id, claim_token, status, lease_until, updated_at) "
+            "VALUES (%s, %s, %s, %s, 'running', %s, %s)",
+            (url_hash, url[:1000], self.worker_id, shard.token, lease_until, now),
+        ):
+            return True
+        if self._execute(
+            "UPDATE ArticleClaims SET worker_id = %s, claim_token = %s, lease_until = %s, updated_at = %s "
+            "WHERE url_hash = %s AND status = 'running' AND (lease_until < %s OR worker_id = %s)",
+            (self.worker_id, shard.token, lease_until, now, url_hash, now, self.worker_id),
+        ):
+            return True
+        rows = self._execute("SELECT status FROM ArticleClaims WHERE url_hash = %s", (url_hash,), fetch=True)
+        return False if rows and rows[0]["status"] == "done" else None
+
+    def mark_articles_done(self, urls):
+        now = time.time()
+        hashes = [input_hash(u) for u in urls if u]
+        for i in range(0, len(hashes), MARK_DONE_CHUNK):
+            chunk = hashes[i:i + MARK_DONE_CHUNK]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            self._execute(
+                f"UPDATE ArticleClaims SET status = 'done', lease_until = NULL, updated_at = %s "
+                f"WHERE url_hash IN ({placeholders})",
+                (now, *chunk),
+            )
+
+    # ---------- 상태 ----------
+    def status_counts(self) -> dict:
+        rows = self._execute("SELECT status, COUNT(*) AS n FROM QueryShards GROUP BY status", fetch=True)
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self):
+        self.conn.close()
+
+
+class LeaseKeeper:
+    """처리하는 동안 백그라운드에서 lease 연장 (연장에 실패하면 lost=True)"""
+
+    def __init__(self, work_queue: WorkQueue, shard: Shard):
+        self.queue = work_queue
+        self.shard = shard
+        self.lost = False
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"lease-{shard.id}", daemon=True)
+
+    def _run(self):
+        while not self.stop_event.wait(self.queue.lease_seconds / 3):
+            try:
+                if not self.queue.renew(self.shard):
+                    self.lost = True
+                    print(f"⚠️ 샤드 {self.shard.id} lease 를 잃음 (다른 워커가 가져감) → 결과는 저장되지만 완료 표시는 안 함")
+                    return
+            except Exception as e:
+                print(f"⚠️ 샤드 {self.shard.id} lease 연장 실패 (다음에 다시 시도): {e}")
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop_event.set()
+        self.thread.join()
+
+
+# ================================
+# 2. 워커 루프
+# ================================
+def run_worker(queries=None, shard_size: int = SHARD_SIZE, requeue: bool = False, wait: bool = False,
+               repoll_after: float = None, max_shards: int = None, export_metrics: bool = True,
+               metrics_file: str = metrics.PROMETHEUS_FILE, report_file: str = metrics.REPORT_FILE,
+               **pipeline_options):
+    """
+    샤드를 하나씩 가져와서 처리. queries 를 주면 먼저 큐에 등록 (이미 있으면 그대로).
+    - wait=False: 가져갈 샤드가 없으면 종료 / wait=True: IDLE_POLL 초마다 다시 확인 (종료 신호까지)
+    - repoll_after 초가 지난 done 샤드는 다시 가져감 (계속 돌면서 주기적으로 새 기사 확인, wait 과 같이 씀)
+    SIGTERM / SIGINT → 지금 샤드는 끝까지 처리하고 종료.
+    샤드마다 metrics_file / report_file 에 메트릭 저장 (빈 문자열이면 그 파일은 저장 안 함).
+    return: {"shards", "failed", "articles", "saved"}
+    """
+    from pipeline_stream import PARSE_WORKERS, run_pipelined
+    from step5_save_to_db import ensure_tables, get_connection
+
+    work_queue = WorkQueue(get_connection())
+    work_queue.ensure_tables()
+    if queries:
+        result = work_queue.enqueue(queries, shard_size=shard_size, requeue=requeue)
+        print(f"🗂 키워드 {len(queries)}개 → 샤드 추가 {result['added']}개, "
+              f"제외 {result['retired']}개, 다시 대기 {result['requeued']}개")
+
+    stop = threading.Event()
+
+    def handle_signal(signum, frame):
+        if stop.is_set():
+            print("\n🛑 종료 신호 두 번째 → 즉시 종료")
+            raise SystemExit(1)
+        print(f"\n🛑 종료 신호({signal.Signals(signum).name}) → 지금 샤드를 마치고 종료합니다")
+        stop.set()
+
+    previous_handlers = {sig: signal.signal(sig, handle_signal) for sig in (signal.SIGTERM, signal.SIGINT)}
+
+    totals = {"shards": 0, "failed": 0, "articles": 0, "saved": 0}
+    process_pool = ProcessPoolExecutor(PARSE_WORKERS)
+    db_conn = get_connection()
+    try:
+        ensure_tables(db_conn)
+        print(f"👷 워커 시작: {work_queue.worker_id}")
+        while not stop.is_set() and (max_shards is None or totals["shards"] < max_shards):
+            shard = work_queue.claim(repoll_after=repoll_after)
+            if shard is None:
+                if not wait:
+                    print("📭 가져갈 샤드가 없습니다")
+                    break
+                stop.wait(IDLE_POLL)
+                continue
+
+            print(f"\n📦 샤드 {shard.id} 처리 시작 (키워드 {len(shard.queries)}개, {shard.attempts}번째 시도)")
+            saved_urls = []
+            start = time.time()
+            try:
+                with LeaseKeeper(work_queue, shard) as keeper:
+                    db_conn.ping(reconnect=True)
+                    result = run_pipelined(
+                        queries=shard.queries,
+                        db_conn=db_conn,
+                        process_pool=process_pool,
+                        cursors=shard.cursors,
+                        article_filter=lambda a: work_queue.claim_article(a.get("url"), shard),
+                        on_saved=lambda a: saved_urls.append(a.get("url")),
+                        **pipeline_options,
+                    )
+                work_queue.mark_articles_done(saved_urls)
+                if keeper.lost or not work_queue.complete(shard, shard.cursors):
+                    print(f"⚠️ 샤드 {shard.id}: 처리 중 lease 를 잃어서 완료 표시를 못 함 (다른 워커가 다시 처리)")
+                    metrics.inc("worker_shards_total", result="lease_lost")
+                else:
+                    metrics.inc("worker_shards_total", result="ok")
+                totals["articles"] += result["articles"]
+                totals["saved"] += result["saved"]
+            except Exception as e:
+                status = work_queue.fail(shard, f"{type(e).__name__}: {e}")
+                totals["failed"] += 1
+                metrics.inc("worker_shards_total", result="error")
+                print(f"❌ 샤드 {shard.id} 실패 → {status}: {e}")
+            finally:
+                totals["shards"] += 1
+                metrics.observe("worker_shard_seconds", time.time() - start)
+                if export_metrics and (metrics_file or report_file):
+                    metrics.export(metrics_file, report_file)
+    finally:
+        process_pool.shutdown()
+        db_conn.close()
+        for sig, handler in previous_handlers.items():
+            signal.signal(sig, handler)
+        print(
+            f"👋 워커 종료: 샤드 {totals['shards']}개 (실패 {totals['failed']}), "
+            f"기사 {totals['articles']}건, 저장 {totals['saved']}건"
+        )
+        try:
+            counts = work_queue.status_counts()
+            print("   큐 상태: " + ", ".join(f"{k} {v}" for k, v in sorted(counts.items())))
+        except Exception as e:
+            print(f"   큐 상태 확인 실패: {e}")
+        work_queue.close()
+    return totals